@@ -0,0 +1,119 @@
+"""
+Reference data standing in for the database during benchmarks.
+
+The normalizers read account_info and uploaded_ccfid through
+``pd.read_sql`` (account_info once, on first use), and main() builds the
+Zoho lookup maps from the companies, labs and collection-site tables.
+install_db_fixtures() answers those queries from the frames below, so the
+suite measures the pandas work and never opens a connection.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+_WORDS = [
+    "Acme",
+    "Allied",
+    "Atlas",
+    "Beacon",
+    "Cardinal",
+    "Coastal",
+    "Delta",
+    "Eagle",
+    "Frontier",
+    "Granite",
+    "Harbor",
+    "Heartland",
+    "Keystone",
+    "Liberty",
+    "Meridian",
+    "Midwest",
+    "Pinnacle",
+    "Prairie",
+    "Summit",
+    "Valley",
+]
+_KINDS = [
+    "Logistics",
+    "Construction",
+    "Foods",
+    "Staffing",
+    "Manufacturing",
+    "Transport",
+]
+
+# account_info: one row per CRM account
+ACCOUNTS = pd.DataFrame(
+    {
+        "company": [
+            f"{_WORDS[i % 20]} {_KINDS[i // 20 % 6]} {i // 120 + 1} "
+            f"{('Inc', 'LLC')[i % 2]}"
+            for i in range(300)
+        ],
+        "code": [f"A{1000 + i}" for i in range(300)],
+        "i3_code": np.arange(5000, 5300),
+        "account_id": [f"zcrm_{4_876_000_000_000_000_000 + i}" for i in range(300)],
+    }
+)
+# The A1310 account keeps its Location; make sure it is present
+ACCOUNTS.loc[0, "code"] = "A1310"
+
+SITES = pd.DataFrame(
+    {
+        "name": [
+            f"{w} Occupational Health {i}" for i, w in enumerate(np.resize(_WORDS, 500))
+        ],
+        "site_id": np.arange(20_000, 20_500),
+        "record_id": [f"zcrm_{4_876_100_000_000_000_000 + i}" for i in range(500)],
+    }
+)
+
+LAB_NAMES = {
+    "Omega Laboratories": "zcrm_4876200000000000001",
+    "Abbott Toxicology": "zcrm_4876200000000000002",
+    "Quest Diagnostics": "zcrm_4876200000000000003",
+    "Clinical Reference Laboratory": "zcrm_4876200000000000004",
+}
+
+
+def lookup_maps():
+    """(company_code, site_id, lab_name) → Zoho record id, as main() builds them."""
+    companies = dict(
+        zip(ACCOUNTS["code"], ACCOUNTS["account_id"].str.replace("zcrm_", ""))
+    )
+    sites = dict(zip(SITES["site_id"].astype(str), SITES["record_id"]))
+    labs = {k: v.replace("zcrm_", "") for k, v in LAB_NAMES.items()}
+    return companies, sites, labs
+
+
+def _fake_read_sql(uploaded: pd.Series):
+    def read_sql(sql, con=None, *args, **kwargs):
+        q = " ".join(str(sql).lower().split())
+        if "from uploaded_ccfid" in q:
+            return pd.DataFrame({"ccfid": uploaded})
+        if "from account_info" in q and "i3_code" in q:
+            return ACCOUNTS[["code", "i3_code"]].copy()
+        if "from account_info" in q:
+            return ACCOUNTS[["company", "code"]].copy()
+        raise NotImplementedError(f"no benchmark fixture for query: {q}")
+
+    return read_sql
+
+
+def install_db_fixtures(uploaded_ccfids=()) -> None:
+    """
+    Route pd.read_sql to the fixtures. Call before running any
+    normalizer, since i3screen and escreen cache account_info on first use.
+    """
+    # db.session builds its engine from config at import; it is never used
+    for var, val in (
+        ("DB_HOST", "localhost"),
+        ("DB_PORT", "5432"),
+        ("DB_USER", "bench"),
+        ("DB_PASSWORD", "bench"),
+        ("DB_NAME", "bench"),
+    ):
+        os.environ.setdefault(var, val)
+    pd.read_sql = _fake_read_sql(pd.Series(list(uploaded_ccfids), dtype=object))
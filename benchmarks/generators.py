@@ -0,0 +1,326 @@
+"""
+Synthetic portal exports for benchmarking the normalizers.
+
+Each generator returns a frame shaped like normalize.ingest.read_raw's
+output for that source: the exact raw column names the normalizer reads,
+Arrow-backed strings, and a realistic mix of values (mixed date formats,
+blank and pending rows, duplicate CCFIDs, unmapped reasons/results).
+Output is deterministic for a given seed.
+
+    python benchmarks/generators.py crl 100k --out /tmp/crl_summary_report.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fixtures import ACCOUNTS, SITES  # noqa: E402
+
+STRING_DTYPE = "string[pyarrow]"
+
+FIRST_NAMES = [
+    "James",
+    "Maria",
+    "Robert",
+    "Linda",
+    "Michael",
+    "Patricia",
+    "David",
+    "Jennifer",
+    "Jose",
+    "Elizabeth",
+    "Daniel",
+    "Susan",
+    "Thomas",
+    "Karen",
+    "Christopher",
+    "Nancy",
+    "Kevin",
+    "Lisa",
+    "Brian",
+    "Ashley",
+]
+LAST_NAMES = [
+    "Smith",
+    "Johnson",
+    "Williams",
+    "Brown",
+    "Jones",
+    "Garcia",
+    "Miller",
+    "Davis",
+    "Rodriguez",
+    "Martinez",
+    "Hernandez",
+    "Lopez",
+    "Gonzalez",
+    "Wilson",
+    "Anderson",
+    "Thomas",
+    "Taylor",
+    "Moore",
+    "Jackson",
+    "O'Neil",
+]
+REASONS = [
+    "Pre-Employment",
+    "Random",
+    "Post Accident",
+    "Reasonable Suspicion/Cause",
+    "Return To Duty",
+    "Follow-Up",
+    "Job Requirement",
+    "Other",
+    "Periodic",
+]
+REASON_WEIGHTS = [0.45, 0.25, 0.06, 0.03, 0.04, 0.05, 0.05, 0.05, 0.02]
+RESULTS = [
+    "Negative",
+    "NEG",
+    "Negative-Dilute",
+    "Positive",
+    "Cancelled",
+    "Pending",
+    "Lab Reject",
+    "Refusal",
+]
+RESULT_WEIGHTS = [0.62, 0.08, 0.08, 0.04, 0.03, 0.12, 0.01, 0.02]
+DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%Y %H:%M", "%Y-%m-%d", "%m/%d/%y"]
+
+
+def _rng(seed: int) -> np.random.Generator:
+    return np.random.default_rng(seed)
+
+
+def _pick(rnd, values, n, p=None) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rnd.choice(len(values), n, p=p)]
+
+
+def _blank(rnd, values: np.ndarray, rate: float) -> np.ndarray:
+    values = values.astype(object)
+    values[rnd.random(len(values)) < rate] = ""
+    return values
+
+
+def _dates(
+    rnd, n: int, start="2024-11-01", days=365, formats=DATE_FORMATS
+) -> np.ndarray:
+    """Timestamps spread over `days`, each rendered in one of `formats`."""
+    base = pd.Timestamp(start)
+    stamps = base + pd.to_timedelta(rnd.integers(0, days * 24 * 60, n), unit="min")
+    # Mostly the first format, the rest sprinkled in
+    weights = np.full(len(formats), 0.3 / max(len(formats) - 1, 1))
+    weights[0] = 0.7
+    which = rnd.choice(len(formats), n, p=weights / weights.sum())
+    out = np.empty(n, dtype=object)
+    for i, fmt in enumerate(formats):
+        mask = which == i
+        out[mask] = stamps[mask].strftime(fmt)
+    return out
+
+
+def _ids(rnd, n: int, prefix: str, digits: int, dup_rate=0.02) -> np.ndarray:
+    """Unique-ish IDs with a few in-batch duplicates (re-sent results)."""
+    nums = rnd.integers(0, 10**digits - n) + rnd.permutation(n)
+    ids = np.char.add(prefix, np.char.zfill(nums.astype(str), digits)).astype(object)
+    dups = np.flatnonzero(rnd.random(n) < dup_rate)
+    if len(dups) and n > 1:
+        ids[dups] = ids[rnd.integers(0, n, len(dups))]
+    return ids
+
+
+def _frame(data: dict) -> pd.DataFrame:
+    return pd.DataFrame(data).astype(STRING_DTYPE)
+
+
+def crl_export(rows: int, seed: int = 0) -> pd.DataFrame:
+    rnd = _rng(seed)
+    acct = ACCOUNTS.iloc[rnd.integers(0, len(ACCOUNTS), rows)]
+    site = SITES.iloc[rnd.integers(0, len(SITES), rows)]
+    svc_type = _pick(rnd, ["DT", "A", "PHY"], rows, p=[0.85, 0.1, 0.05])
+    ref = _ids(rnd, rows, "A", 8)
+    ref[svc_type != "DT"] = ""
+    return _frame(
+        {
+            "Status": _pick(
+                rnd,
+                [
+                    "Complete",
+                    "MRO Review",
+                    "Pending Laboratory Testing",
+                    "Pending Collection",
+                    "Collection Not Performed",
+                ],
+                rows,
+                p=[0.8, 0.08, 0.06, 0.04, 0.02],
+            ),
+            "Name": np.char.add(
+                np.char.add(_pick(rnd, LAST_NAMES, rows).astype(str), ", "),
+                _pick(rnd, FIRST_NAMES, rows).astype(str),
+            ),
+            "Reference ID": ref,
+            "Type": svc_type,
+            "Authorized ID": rnd.integers(100_000, 999_999, rows).astype(str),
+            "CCF Donor ID": _blank(
+                rnd, rnd.integers(10**8, 10**9, rows).astype(str), 0.03
+            ),
+            "Company Name": acct["company"].to_numpy(),
+            "Company": acct["company"].to_numpy(),
+            "Company Code": acct["code"].to_numpy(),
+            "Collection Date": _blank(rnd, _dates(rnd, rows), 0.01),
+            "Reviewed Date": _blank(rnd, _dates(rnd, rows, start="2024-11-03"), 0.15),
+            "MRO Result": _pick(rnd, RESULTS, rows, p=RESULT_WEIGHTS),
+            "Regulated": _pick(
+                rnd, ["Yes", "No", "DOT", ""], rows, p=[0.3, 0.6, 0.05, 0.05]
+            ),
+            "Service": _pick(
+                rnd,
+                [
+                    "Urine 10 Panel",
+                    "Urine 5 Panel DOT",
+                    "POCT Urine",
+                    "Alcohol Test",
+                    "Hair 5 Panel",
+                ],
+                rows,
+                p=[0.45, 0.3, 0.1, 0.1, 0.05],
+            ),
+            "Reason": _pick(rnd, REASONS, rows, p=REASON_WEIGHTS),
+            "Lab Code": _pick(
+                rnd,
+                ["CRL", "Quest", "Omega", "Alere", ""],
+                rows,
+                p=[0.6, 0.2, 0.08, 0.07, 0.05],
+            ),
+            "Site Name": site["name"].str.upper().to_numpy(),
+            "Site ID": np.char.add(site["site_id"].to_numpy().astype(str), ".0"),
+        }
+    )
+
+
+def i3_export(rows: int, seed: int = 0) -> pd.DataFrame:
+    rnd = _rng(seed + 1)
+    acct = ACCOUNTS.iloc[rnd.integers(0, len(ACCOUNTS), rows)]
+    site = SITES.iloc[rnd.integers(0, len(SITES), rows)]
+    return _frame(
+        {
+            "CCF / Test Number": _blank(rnd, _ids(rnd, rows, "I3", 9), 0.01),
+            "First Name": _pick(rnd, FIRST_NAMES, rows).astype(str),
+            "Last Name": np.char.upper(_pick(rnd, LAST_NAMES, rows).astype(str)),
+            "SSN/EID": rnd.integers(10**8, 10**9, rows).astype(str),
+            "Customer": acct["company"].to_numpy(),
+            "Org ID": _blank(rnd, acct["i3_code"].astype(str).to_numpy(), 0.05),
+            "Collection Date/Time": _dates(
+                rnd, rows, formats=["%m/%d/%Y %H:%M", "%m/%d/%Y", "%Y-%m-%d"]
+            ),
+            "Report Date": _blank(rnd, _dates(rnd, rows, start="2024-11-03"), 0.2),
+            "Reason For Test": _pick(rnd, REASONS, rows, p=REASON_WEIGHTS),
+            "MRO Result": _pick(rnd, RESULTS, rows, p=RESULT_WEIGHTS),
+            "Specimen Type": _pick(
+                rnd,
+                ["Urine", "Hair", "Breath Alcohol", "EBT", "Oral Fluid"],
+                rows,
+                p=[0.75, 0.08, 0.1, 0.04, 0.03],
+            ),
+            "Lab": _pick(
+                rnd,
+                ["Quest Diagnostics", "Omega", "CRL", ""],
+                rows,
+                p=[0.5, 0.1, 0.3, 0.1],
+            ),
+            "Program Description": _pick(
+                rnd, ["DOT-FMCSA", "Non-DOT", "DOT", "Company Policy"], rows
+            ),
+            "Collection Site": site["name"].to_numpy(),
+            "Collection Site ID": site["site_id"].to_numpy().astype(str),
+            "Location": _pick(rnd, ["Plant 1", "Plant 2", "TCW INC FSAT", ""], rows),
+        }
+    )
+
+
+def escreen_export(rows: int, seed: int = 0) -> pd.DataFrame:
+    rnd = _rng(seed + 2)
+    acct = ACCOUNTS.iloc[rnd.integers(0, len(ACCOUNTS), rows)]
+    # Portal company names drift from the CRM spelling, exercising fuzzy matching
+    client = acct["company"].to_numpy().astype(str)
+    drift = rnd.random(rows) < 0.3
+    client[drift] = np.char.upper(client[drift])
+    cost_center = _pick(rnd, ["", "N/A", "None"], rows, p=[0.6, 0.2, 0.2])
+    use_cc = rnd.random(rows) < 0.15
+    cost_center[use_cc] = acct["company"].to_numpy()[use_cc]
+    return _frame(
+        {
+            "Donor Name": np.char.add(
+                np.char.add(
+                    np.char.upper(_pick(rnd, LAST_NAMES, rows).astype(str)), ","
+                ),
+                np.char.upper(_pick(rnd, FIRST_NAMES, rows).astype(str)),
+            ),
+            "Client": client,
+            "Cost Center": cost_center,
+            "COC": _ids(rnd, rows, "E", 10),
+            "SSN": np.char.add("XXX-XX-", rnd.integers(1000, 9999, rows).astype(str)),
+            "Reason": _pick(rnd, REASONS, rows, p=REASON_WEIGHTS),
+            "Result": _pick(rnd, RESULTS, rows, p=RESULT_WEIGHTS),
+            "Regulation": _pick(
+                rnd, ["DOT", "Non-DOT", "DOT-FMCSA"], rows, p=[0.3, 0.65, 0.05]
+            ),
+            "Test Type": _pick(
+                rnd,
+                [
+                    "eCup 10 Panel",
+                    "Alere Urine",
+                    "Quest Urine",
+                    "Omega Hair",
+                    "EBT Alcohol",
+                ],
+                rows,
+                p=[0.35, 0.25, 0.2, 0.05, 0.15],
+            ),
+            "Collection Date/Time": _dates(
+                rnd, rows, formats=["%m/%d/%Y %H:%M", "%m/%d/%Y"]
+            ),
+            "Final Verification Date/Time": _blank(
+                rnd,
+                _dates(rnd, rows, start="2024-11-03", formats=["%m/%d/%Y %H:%M"]),
+                0.2,
+            ),
+            "BA Quant": _pick(
+                rnd, ["", "0", "0.000", "0.021"], rows, p=[0.85, 0.1, 0.03, 0.02]
+            ),
+        }
+    )
+
+
+GENERATORS = {"crl": crl_export, "i3": i3_export, "escreen": escreen_export}
+
+
+def parse_size(text: str) -> int:
+    """Row count from a plain number or a <n>k / <n>m size ("20k", "2.5m")."""
+    text = text.strip().lower().replace("_", "")
+    for suffix, scale in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[: -len(suffix)]) * scale)
+    return int(text)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("source", choices=sorted(GENERATORS))
+    p.add_argument("rows", help="row count, or <n>k / <n>m (20k, 1m)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", required=True, help="CSV file to write")
+    args = p.parse_args()
+
+    df = GENERATORS[args.source](parse_size(args.rows), args.seed)
+    df.to_csv(args.out, index=False)
+    print(f"wrote {len(df)} {args.source} rows → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Peak-memory benchmark for reading a raw export ahead of normalization.
+
+Compares the old path (every column as Python-object strings, then the
+normalizer's defensive ``df.copy()``) with normalize.ingest.read_raw
+(only the needed columns, Arrow-backed strings, shallow copy under
+copy-on-write). Each variant runs in a fresh process so peak RSS is not
+shared between them.
+
+    python benchmarks/ingest_memory.py --rows 200000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+import pandas as pd  # noqa: E402
+
+from normalize.ingest import INGEST_COLUMNS, read_raw  # noqa: E402
+
+# CRL exports carry ~30 columns the normalizer never looks at
+EXTRA_COLUMNS = [f"Unused Column {i}" for i in range(30)]
+
+
+def write_crl_like(path: str, rows: int) -> None:
+    rnd = random.Random(0)
+    cols = INGEST_COLUMNS["crl"] + EXTRA_COLUMNS
+    data = {c: [f"{c[:6]}-{rnd.randrange(10_000)}" for _ in range(rows)] for c in cols}
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def _rss_mb() -> float:
+    """Peak RSS of this process (VmHWM; ru_maxrss survives exec on Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _legacy(path: str):
+    df = pd.read_csv(path, dtype=str)
+    return df.copy()
+
+
+def _arrow(path: str):
+    df = read_raw("crl", path, os.path.dirname(path))
+    with pd.option_context("mode.copy_on_write", True):
+        return df.copy(deep=False)
+
+
+def _run(name: str, path: str, out: "mp.Queue") -> None:
+    before = _rss_mb()
+    df = {"legacy": _legacy, "arrow": _arrow}[name](path)
+    out.put(
+        (
+            name,
+            len(df.columns),
+            df.memory_usage(deep=True).sum() / 2**20,
+            _rss_mb() - before,
+        )
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--rows", type=int, default=200_000)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "crl_summary_report.csv")
+        write_crl_like(path, args.rows)
+        print(f"{args.rows} rows, file {os.path.getsize(path) / 2**20:.1f} MiB")
+        print(f"{'variant':<8} {'cols':>5} {'frame MiB':>10} {'peak RSS +MiB':>14}")
+
+        ctx = mp.get_context("spawn")
+        for name in ("legacy", "arrow"):
+            q = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(name, path, q))
+            proc.start()
+            result = q.get()
+            proc.join()
+            print("{:<8} {:>5} {:>10.1f} {:>14.1f}".format(*result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Microbenchmarks for the normalize stage against a recorded baseline.
+
+Times each normalizer (and, with --workers N, normalize_partitioned over N
+processes), utils.is_complete, the Zoho payload builder and encoder
+(services.zoho_payload) and utils.to_staging_rows on synthetic exports
+(benchmarks/generators.py) with database lookups served from
+benchmarks/fixtures.py. Results are
+compared with benchmarks/baseline.json; a case whose median time is more
+than --tolerance (and at least --min-delta seconds) slower than its
+baseline median is reported and fails the run. Sizes under 50k rows run
+9 times by default, others 3: at 1k a normalizer takes under a second and
+single timings swing by half of that, so small sizes mostly catch gross
+slowdowns and the large ones the rest.
+
+    python benchmarks/normalizers.py                     # 1k + 100k, compare
+    python benchmarks/normalizers.py --sizes 1m --repeat 1
+    python benchmarks/normalizers.py --save-baseline     # after an intended change
+
+Baselines are machine-specific: re-record them on the machine that checks.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir, "src"))
+sys.path.insert(0, HERE)
+
+from fixtures import install_db_fixtures, lookup_maps  # noqa: E402
+from generators import GENERATORS, parse_size  # noqa: E402
+
+install_db_fixtures()
+
+import pandas as pd  # noqa: E402
+
+from normalize.crl import normalize as norm_crl  # noqa: E402
+from normalize.escreen import normalize_escreen  # noqa: E402
+from normalize.i3screen import normalize_i3screen  # noqa: E402
+from normalize.parallel import normalize_partitioned  # noqa: E402
+from services.zoho_payload import (  # noqa: E402
+    LookupMaps,
+    build_payload,
+    encode_body,
+    record_ids,
+)
+from utils import is_complete, to_staging_rows  # noqa: E402
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+
+ROW = "{:<26} {:>6} {:>9} {:>10} {:>9} {:>8}"
+
+# Default repeats: more for small inputs, whose timings are noisier
+SMALL_ROWS, SMALL_REPEAT, REPEAT = 50_000, 9, 3
+
+NORMALIZERS = {
+    "crl": norm_crl,
+    "i3": normalize_i3screen,
+    "escreen": normalize_escreen,
+}
+
+
+def _time(fn, repeat: int):
+    """Run fn() `repeat` times; return (median, min) seconds and the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings), result
+
+
+def run_size(rows: int, repeat: int, workers: int = 1):
+    """Yield (case, rows, median, min) for every case at one input size."""
+    records = []
+    for source, norm_fn in NORMALIZERS.items():
+        raw = GENERATORS[source](rows)
+        median, best, clean = _time(lambda: norm_fn(raw), repeat)
+        yield f"normalize.{source}", rows, median, best
+        records.extend(clean.to_dict(orient="records"))
+        if workers > 1:
+            median, best, _ = _time(
+                lambda: normalize_partitioned(source, raw, workers), repeat
+            )
+            yield f"partitioned{workers}.{source}", rows, median, best
+    raw = clean = None
+
+    median, best, flags = _time(lambda: [is_complete(r) for r in records], repeat)
+    yield "utils.is_complete", len(records), median, best
+
+    complete = pd.DataFrame.from_records([r for r, ok in zip(records, flags) if ok])
+    incomplete = [r for r, ok in zip(records, flags) if not ok]
+    # At 1m rows per source the record dicts alone take gigabytes; drop them
+    # before building and encoding the payload
+    records = flags = None
+    maps = LookupMaps(*(record_ids(m) for m in lookup_maps()))
+    median, best, payload = _time(lambda: build_payload(complete, maps), repeat)
+    yield "zoho_payload.build_payload", len(complete), median, best
+    complete = None
+    median, best, _ = _time(lambda: encode_body(payload), repeat)
+    yield "zoho_payload.encode_body", len(payload), median, best
+
+    now = datetime.datetime.now()
+    median, best, _ = _time(lambda: to_staging_rows(incomplete, now), repeat)
+    yield "utils.to_staging_rows", len(incomplete), median, best
+
+
+def _load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f).get("results", {})
+
+
+def _save_baseline(results: dict) -> None:
+    merged = {**_load_baseline(), **results}
+    doc = {
+        "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": f"{platform.machine()} {os.cpu_count()} cpu",
+        "results": dict(sorted(merged.items())),
+    }
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(doc, f, indent=2)
+        f.write("\n")
+    print(f"baseline written → {BASELINE_PATH}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument(
+        "--sizes",
+        default="1k,100k",
+        help="comma-separated input sizes: row counts or <n>k / <n>m (20k, 1m)",
+    )
+    p.add_argument(
+        "--repeat",
+        type=int,
+        help=f"runs per case (default: {SMALL_REPEAT} under {SMALL_ROWS} rows, "
+        f"else {REPEAT})",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="also time normalize_partitioned with this many processes",
+    )
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown vs. baseline median time (0.25 = 25%%)",
+    )
+    p.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.5,
+        help="ignore slowdowns smaller than this many seconds (timer noise)",
+    )
+    p.add_argument("--save-baseline", action="store_true")
+    args = p.parse_args()
+
+    baseline = _load_baseline()
+    results, regressions = {}, []
+    print(ROW.format("case", "size", "rows", "median s", "min s", "vs base"))
+    for size in args.sizes.split(","):
+        n = parse_size(size)
+        repeat = args.repeat or (SMALL_REPEAT if n < SMALL_ROWS else REPEAT)
+        for case, rows, median, best in run_size(n, repeat, args.workers):
+            key = f"{case}@{size}"
+            results[key] = {
+                "rows": rows,
+                "median": round(median, 4),
+                "min": round(best, 4),
+            }
+            base = baseline.get(key)
+            delta = ""
+            if base and not args.save_baseline:
+                before = base["median"]
+                ratio = median / before if before else 1.0
+                delta = f"{ratio:.2f}x"
+                if ratio > 1 + args.tolerance and median - before > args.min_delta:
+                    regressions.append((key, before, median))
+            print(ROW.format(case, size, rows, f"{median:.4f}", f"{best:.4f}", delta))
+
+    if args.save_baseline:
+        _save_baseline(results)
+        return
+    for key, before, after in regressions:
+        print(f"REGRESSION {key}: {before:.4f}s → {after:.4f}s")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
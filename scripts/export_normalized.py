@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -9,29 +10,76 @@ from pathlib import Path
 import pandas as pd
 
 from normalize.crl import normalize as normalize_crl
+from normalize.escreen import normalize_escreen
 from normalize.i3screen import normalize_i3screen
-from scrapers.crl import scrape_crl
-from scrapers.i3 import scrape_i3
+from services.export import export_snapshots, write_parquet
+
+NORMALIZERS = {
+    "crl": normalize_crl,
+    "i3": normalize_i3screen,
+    "escreen": normalize_escreen,
+}
+
+SHEET_NAMES = {
+    "crl": "CRL_Normalized",
+    "i3": "i3_Normalized",
+    "escreen": "eScreen_Normalized",
+}
+
+OUT_DIR = Path(__file__).parent.parent / "outputs"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Export normalized data to a partitioned Parquet dataset"
+    )
+    p.add_argument(
+        "--out", default=str(OUT_DIR / "normalized"), help="Parquet dataset root"
+    )
+    p.add_argument(
+        "--scrape",
+        action="store_true",
+        help="Scrape CRL and i3 again instead of using archived snapshots",
+    )
+    p.add_argument(
+        "--all-snapshots",
+        action="store_true",
+        help="Export every archived snapshot, not just the latest per source",
+    )
+    p.add_argument(
+        "--excel",
+        action="store_true",
+        help="Also write outputs/normalized_data.xlsx with one sheet per source",
+    )
+    return p.parse_args()
 
 
 def main():
-    # 1) Scrape & normalize CRL
-    crl_raw = scrape_crl()
-    crl_clean = normalize_crl(crl_raw)
-
-    # 2) Scrape & normalize i3
-    i3_raw = scrape_i3()
-    i3_clean = normalize_i3screen(i3_raw)
-
-    # 3) Write to Excel in outputs/
-    out_dir = Path(__file__).parent.parent / "outputs"
-    out_dir.mkdir(exist_ok=True)
-    output_path = out_dir / "normalized_data.xlsx"
-    with pd.ExcelWriter(output_path) as writer:
-        crl_clean.to_excel(writer, sheet_name="CRL_Normalized", index=False)
-        i3_clean.to_excel(writer, sheet_name="i3_Normalized", index=False)
-
-    print(f"✅ Excel file created: {output_path}")
+    args = parse_args()
+
+    if args.scrape:
+        from scrapers.crl import scrape_crl
+        from scrapers.i3 import scrape_i3
+
+        frames = {
+            "crl": normalize_crl(scrape_crl()),
+            "i3": normalize_i3screen(scrape_i3()),
+        }
+        for source, df in frames.items():
+            write_parquet(df, source, args.out)
+    else:
+        frames = export_snapshots(
+            NORMALIZERS, args.out, latest_only=not args.all_snapshots
+        )
+    print(f"✅ Parquet dataset written: {args.out}")
+
+    if args.excel:
+        OUT_DIR.mkdir(exist_ok=True)
+        output_path = OUT_DIR / "normalized_data.xlsx"
+        with pd.ExcelWriter(output_path) as writer:
+            for source, df in frames.items():
+                df.to_excel(writer, sheet_name=SHEET_NAMES[source], index=False)
+        print(f"✅ Excel file created: {output_path}")
 
 
 if __name__ == "__main__":
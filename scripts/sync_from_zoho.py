@@ -21,7 +21,8 @@ def sync_uploaded_ccfids():
     for ccfid in missing:
         db.execute(
             text(
-                "INSERT INTO uploaded_ccfid (ccfid, uploaded_timestamp) VALUES (:ccfid, now())"
+                "INSERT INTO uploaded_ccfid (ccfid, uploaded_timestamp) VALUES (:ccfid, now()) "
+                "ON CONFLICT (ccfid) DO NOTHING"
             ),
             {"ccfid": ccfid},
         )
@@ -10,7 +10,7 @@ setup(
     description="CRL & i3 import pipeline and web interface",
     package_dir={"": "src"},
     packages=find_packages(where="src"),
-    py_modules=["main", "run", "config", "utils"],
+    py_modules=["main", "pipeline", "run", "worker", "config", "utils"],
     include_package_data=True,
     package_data={
         # include any .js in the scrapers package
@@ -23,6 +23,7 @@ setup(
         "console_scripts": [
             "easy-import-pipeline = main:main",
             "easy-import-web      = run:app",
+            "easy-import-worker   = worker:main",
         ],
     },
 )
@@ -5,7 +5,6 @@ from dotenv import load_dotenv, find_dotenv
 
 # auto-locate the first .env in parent directories
 env_file = find_dotenv()
-print(f"→ loading env vars from {env_file}")
 load_dotenv(env_file)
 
 # Logging config
@@ -13,6 +12,8 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
     level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
 )
+logger = logging.getLogger(__name__)
+logger.debug("Loaded env vars from %s", env_file or "(no .env found)")
 
 # 3) Database credentials (must come *after* load_dotenv)
 DB_USER     = os.getenv("DB_USER")
@@ -21,8 +22,10 @@ DB_HOST     = os.getenv("DB_HOST")
 DB_PORT     = os.getenv("DB_PORT")
 DB_NAME     = os.getenv("DB_NAME")
 
-# 4) Debug print so we can see in logs if any are missing
-print(f"→ config.py loaded → DB_USER={DB_USER!r}, DB_HOST={DB_HOST!r}, DB_PORT={DB_PORT!r}, DB_NAME={DB_NAME!r}")
+# 4) Say in the logs if any are missing
+_missing_db = [name for name in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME") if not os.getenv(name)]
+if _missing_db:
+    logger.warning("Database settings missing: %s", ", ".join(_missing_db))
 
 # 5) Now build the SQLAlchemy URL
 DATABASE_URL = (
@@ -36,8 +39,117 @@ ZOHO_CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET")
 ZOHO_REFRESH_TOKEN = os.getenv("ZOHO_REFRESH_TOKEN")
 ZOHO_API_BASE      = os.getenv("ZOHO_API_BASE")
 ZOHO_MODULE        = os.getenv("ZOHO_MODULE")
+# Request bodies of at least this many bytes are sent gzip-compressed (0 = never)
+ZOHO_GZIP_MIN_BYTES = int(os.getenv("ZOHO_GZIP_MIN_BYTES", "16384"))
+# Zoho API pacing: calls per minute by operation ("insert", "sites", "read",
+# "token"; others get 60). Background work may spend ZOHO_CREDIT_BUDGET
+# credits per run / per day in a long-running process (0 = unlimited), minus
+# ZOHO_INTERACTIVE_RESERVE, which also holds back that many of the org's
+# remaining credits for worklist pushes from the web UI.
+# These limits are kept in memory by each process. Set ZOHO_PROCESSES to the
+# number of processes calling Zoho at once (pipeline, workers, web app
+# workers) and each takes an equal share of the rates, budget and reserve.
+ZOHO_RATE_LIMITS = os.getenv("ZOHO_RATE_LIMITS", "insert=60,sites=20,read=60,token=5")
+ZOHO_CREDIT_BUDGET = int(os.getenv("ZOHO_CREDIT_BUDGET", "0"))
+ZOHO_INTERACTIVE_RESERVE = int(os.getenv("ZOHO_INTERACTIVE_RESERVE", "500"))
+ZOHO_PROCESSES = max(int(os.getenv("ZOHO_PROCESSES", "1")), 1)
 
 CRL_USER = os.getenv("CRL_USER")
 CRL_PASS = os.getenv("CRL_PASS")
 I3_USER  = os.getenv("I3_USER")
 I3_PASS  = os.getenv("I3_PASS")
+ESCREEN_USERNAME = os.getenv("ESCREEN_USERNAME")
+ESCREEN_PASSWORD = os.getenv("ESCREEN_PASSWORD")
+
+# 7) Raw export archive (content-addressed, gzip-compressed)
+DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", os.path.abspath("src/downloads"))
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(DOWNLOAD_DIR, "snapshots"))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "30"))
+
+# 8) Saved portal browser sessions (Fernet-encrypted Playwright storage_state).
+#    Generate a key with: python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+SESSION_STATE_DIR = os.getenv("SESSION_STATE_DIR", os.path.join(DOWNLOAD_DIR, "sessions"))
+SESSION_STATE_KEY = os.getenv("SESSION_STATE_KEY")
+
+# 9) Incremental scrape windows: re-request this many days before each
+#    source's watermark (results can land well after collection), or look
+#    back this far when a source has no watermark yet.
+WATERMARK_OVERLAP_DAYS = int(os.getenv("WATERMARK_OVERLAP_DAYS", "14"))
+WATERMARK_INITIAL_DAYS = int(os.getenv("WATERMARK_INITIAL_DAYS", "31"))
+
+# 10) Direct export endpoints, called with the browser session's cookies.
+#     Leave unset to always use the click-through export.
+CRL_EXPORT_URL = os.getenv("CRL_EXPORT_URL")
+I3_EXPORT_URL = os.getenv("I3_EXPORT_URL")
+
+# 11) Scraper debug artifacts (page HTML / screenshots). Written on failure,
+#     or on every run when DEBUG_ARTIFACTS is set; gzip-compressed and the
+#     oldest deleted once the store exceeds DEBUG_MAX_MB.
+DEBUG_DIR = os.getenv("DEBUG_DIR", os.path.abspath("src/debug"))
+DEBUG_ARTIFACTS = os.getenv("DEBUG_ARTIFACTS", "").lower() in ("1", "true", "yes")
+DEBUG_MAX_MB = int(os.getenv("DEBUG_MAX_MB", "50"))
+
+# 12) Per-run memory budget (MiB of peak RSS per pipeline stage; 0 = off).
+#     Over budget logs a warning, or fails the run when MEMORY_BUDGET_STRICT.
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "0"))
+MEMORY_BUDGET_STRICT = os.getenv("MEMORY_BUDGET_STRICT", "").lower() in ("1", "true", "yes")
+MEMORY_TRACE_ALLOCATIONS = os.getenv("MEMORY_TRACE_ALLOCATIONS", "").lower() in ("1", "true", "yes")
+
+# 13) Processes used to normalize large exports (1 = in-process).
+NORMALIZE_WORKERS = int(os.getenv("NORMALIZE_WORKERS", "1"))
+
+# 14) Portal accounts come from the source_accounts table; a source without
+#     any uses the credentials above. Scrapes run concurrently: at most
+#     SCRAPE_WORKERS at once, and per portal the limit in SCRAPE_PORTAL_LIMITS
+#     (e.g. "crl=2,i3=2,escreen=1"; portals not listed get 1).
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "4"))
+SCRAPE_PORTAL_LIMITS = os.getenv("SCRAPE_PORTAL_LIMITS", "")
+
+# 15) Scheduler mode (--schedule): minutes between runs of each source and
+#     the most random delay added to each run, e.g. "crl=60,i3=60,escreen=240".
+#     Sources not listed use the defaults.
+SCHEDULE_INTERVALS = os.getenv("SCHEDULE_INTERVALS", "")
+SCHEDULE_JITTER = os.getenv("SCHEDULE_JITTER", "")
+SCHEDULE_DEFAULT_MINUTES = float(os.getenv("SCHEDULE_DEFAULT_MINUTES", "1440"))
+SCHEDULE_DEFAULT_JITTER_MINUTES = float(os.getenv("SCHEDULE_DEFAULT_JITTER_MINUTES", "10"))
+
+# 16) Work queue (easy-import-pipeline --enqueue, easy-import-worker). Workers
+#     heartbeat every JOB_HEARTBEAT_SECONDS; a running job silent for
+#     JOB_STALE_SECONDS is reclaimed. Failed jobs retry after
+#     JOB_RETRY_BACKOFF_SECONDS (doubling) up to JOB_MAX_ATTEMPTS, then are dead.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "60"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+
+# 17) Zoho outbox: the pusher sends OUTBOX_BATCH_SIZE records per insert call
+#     (Zoho accepts at most 100), OUTBOX_BATCH_INTERVAL_SECONDS apart. Rejected
+#     records retry after OUTBOX_RETRY_BACKOFF_SECONDS (doubling) and are
+#     dead-lettered after OUTBOX_MAX_ATTEMPTS.
+OUTBOX_BATCH_SIZE = min(int(os.getenv("OUTBOX_BATCH_SIZE", "100")), 100)
+OUTBOX_BATCH_INTERVAL_SECONDS = float(os.getenv("OUTBOX_BATCH_INTERVAL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BACKOFF_SECONDS = float(os.getenv("OUTBOX_RETRY_BACKOFF_SECONDS", "60"))
+
+# 18) Web JSON API (/api/...): responses carry ETags from the table_versions
+#     counters and are cached in-process (the API_CACHE_ENTRIES most recently
+#     used); worklist pages hold at most API_PAGE_SIZE rows.
+API_CACHE_ENTRIES = int(os.getenv("API_CACHE_ENTRIES", "256"))
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "500"))
+
+# 19) Collection-site typeahead (/api/sites/typeahead): at most
+#     SITE_TYPEAHEAD_MAX results per query, fuzzy matches scoring at least
+#     SITE_FUZZY_CUTOFF (0-100).
+SITE_TYPEAHEAD_MAX = int(os.getenv("SITE_TYPEAHEAD_MAX", "25"))
+SITE_FUZZY_CUTOFF = float(os.getenv("SITE_FUZZY_CUTOFF", "70"))
+
+# 20) Run history: every pipeline run's stage timings are stored, and a stage
+#     is flagged when it takes RUN_REGRESSION_FACTOR times its median over the
+#     last RUN_HISTORY_WINDOW successful runs (or its rows/second drops by that
+#     factor). Needs RUN_HISTORY_MIN_RUNS earlier runs; stages shorter than
+#     RUN_REGRESSION_MIN_SECONDS are never flagged.
+RUN_HISTORY_WINDOW = int(os.getenv("RUN_HISTORY_WINDOW", "14"))
+RUN_HISTORY_MIN_RUNS = int(os.getenv("RUN_HISTORY_MIN_RUNS", "3"))
+RUN_REGRESSION_FACTOR = float(os.getenv("RUN_REGRESSION_FACTOR", "2.0"))
+RUN_REGRESSION_MIN_SECONDS = float(os.getenv("RUN_REGRESSION_MIN_SECONDS", "5"))
@@ -0,0 +1,53 @@
+"""
+Postgres advisory locks that keep two pipeline instances off one source.
+
+Locks are session-level and held on a dedicated connection for the whole
+run, so they are released when the run ends, or by Postgres when the
+process dies and its connection drops.
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import Iterable, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# First key of the two-key advisory lock form, so the pipeline's locks
+# cannot collide with advisory locks taken by other applications
+LOCK_NAMESPACE = 0x45494D50
+
+
+@contextmanager
+def source_locks(engine: Engine, sources: Iterable[str]):
+    """
+    Try to lock each of `sources` without waiting and yield the ones that
+    were locked; a source another instance holds is logged and left out.
+    """
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    locked: List[str] = []
+    try:
+        for source in sources:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:ns, hashtext(:source))"),
+                {"ns": LOCK_NAMESPACE, "source": source},
+            ).scalar()
+            if acquired:
+                locked.append(source)
+            else:
+                logger.info(
+                    "[%s] already running in another instance; skipping", source
+                )
+        yield locked
+    finally:
+        try:
+            for source in locked:
+                conn.execute(
+                    text("SELECT pg_advisory_unlock(:ns, hashtext(:source))"),
+                    {"ns": LOCK_NAMESPACE, "source": source},
+                )
+        finally:
+            # Closing the connection releases anything still held
+            conn.close()
@@ -0,0 +1,262 @@
+# src/db/migrations.py
+"""
+Versioned schema migrations.
+
+Each entry in MIGRATIONS is applied once, in order, inside a single
+transaction, and recorded in the ``schema_version`` table. Add new
+migrations to the end of the list; never edit one that has shipped.
+
+    python -m db.migrations upgrade   # apply anything pending
+    python -m db.migrations current   # print the applied version
+"""
+
+import argparse
+import logging
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from db.models import (
+    CollectionSite,
+    Company,
+    Laboratory,
+    PipelineJob,
+    PipelineRun,
+    PipelineStageRun,
+    RowFingerprint,
+    SourceAccount,
+    SourceRun,
+    SourceWatermark,
+    TableVersion,
+    UploadedCcfid,
+    WorklistStaging,
+    ZohoOutbox,
+)
+from db.session import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_xact_lock so two processes never migrate at once
+_MIGRATION_LOCK_KEY = 7_214_026
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database schema is older than this code expects."""
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _create_table(conn: Connection, model) -> None:
+    """Create a model's table and all of its declared indexes if missing."""
+    model.__table__.create(conn, checkfirst=True)
+    for index in model.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _0001_initial(conn: Connection) -> None:
+    for model in (WorklistStaging, CollectionSite, Company, Laboratory):
+        _create_table(conn, model)
+
+    # uploaded_ccfid predates the ORM and was created by hand without a key,
+    # so de-duplicate it before adding the primary key.
+    if inspect(conn).has_table(UploadedCcfid.__tablename__):
+        pk = inspect(conn).get_pk_constraint(UploadedCcfid.__tablename__)
+        if not pk.get("constrained_columns"):
+            conn.execute(text("DELETE FROM uploaded_ccfid WHERE ccfid IS NULL"))
+            conn.execute(
+                text(
+                    "DELETE FROM uploaded_ccfid a USING uploaded_ccfid b "
+                    "WHERE a.ccfid = b.ccfid AND a.ctid < b.ctid"
+                )
+            )
+            conn.execute(text("ALTER TABLE uploaded_ccfid ADD PRIMARY KEY (ccfid)"))
+    _create_table(conn, UploadedCcfid)
+
+
+def _0002_source_runs(conn: Connection) -> None:
+    _create_table(conn, SourceRun)
+
+
+def _0003_row_fingerprints(conn: Connection) -> None:
+    _create_table(conn, RowFingerprint)
+
+
+def _0004_source_watermarks(conn: Connection) -> None:
+    _create_table(conn, SourceWatermark)
+
+
+def _0005_source_accounts(conn: Connection) -> None:
+    _create_table(conn, SourceAccount)
+
+
+def _0006_pipeline_jobs(conn: Connection) -> None:
+    _create_table(conn, PipelineJob)
+
+
+def _0007_zoho_outbox(conn: Connection) -> None:
+    _create_table(conn, ZohoOutbox)
+
+
+# Tables whose writes bump table_versions (the web API's cache keys)
+VERSIONED_TABLES = (WorklistStaging, CollectionSite, Company, Laboratory)
+
+
+def _0008_table_versions(conn: Connection) -> None:
+    _create_table(conn, TableVersion)
+    conn.execute(
+        text(
+            "CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$\n"
+            "BEGIN\n"
+            "  INSERT INTO table_versions (table_name, version, changed_at)\n"
+            "  VALUES (TG_TABLE_NAME, 1, timezone('utc', now()))\n"
+            "  ON CONFLICT (table_name) DO UPDATE\n"
+            "  SET version = table_versions.version + 1,\n"
+            "      changed_at = timezone('utc', now());\n"
+            "  RETURN NULL;\n"
+            "END;\n"
+            "$$ LANGUAGE plpgsql"
+        )
+    )
+    for model in VERSIONED_TABLES:
+        table = model.__tablename__
+        conn.execute(
+            text(
+                f"CREATE TRIGGER {table}_version "
+                f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+            )
+        )
+
+
+def _0009_pipeline_runs(conn: Connection) -> None:
+    for model in (PipelineRun, PipelineStageRun):
+        _create_table(conn, model)
+
+
+def _0010_unique_outbox_ccfid(conn: Connection) -> None:
+    # Keep one record per CCFID: a sent one if any, else the newest pending,
+    # else the newest dead-lettered one
+    conn.execute(
+        text(
+            "DELETE FROM zoho_outbox WHERE id IN ("
+            " SELECT id FROM ("
+            "  SELECT id, row_number() OVER ("
+            "   PARTITION BY ccfid"
+            "   ORDER BY status = 'sent' DESC, status = 'pending' DESC, id DESC"
+            "  ) AS n FROM zoho_outbox"
+            " ) ranked WHERE n > 1"
+            ")"
+        )
+    )
+    conn.execute(text("DROP INDEX IF EXISTS ix_zoho_outbox_ccfid"))
+    conn.execute(
+        text("CREATE UNIQUE INDEX ix_zoho_outbox_ccfid ON zoho_outbox (ccfid)")
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1, "initial schema, uploaded_ccfid key and lookup indexes", _0001_initial
+    ),
+    Migration(2, "source_runs for raw export content hashes", _0002_source_runs),
+    Migration(
+        3, "row_fingerprints for per-row change detection", _0003_row_fingerprints
+    ),
+    Migration(
+        4, "source_watermarks for incremental scrape windows", _0004_source_watermarks
+    ),
+    Migration(5, "source_accounts for multi-account scraping", _0005_source_accounts),
+    Migration(6, "pipeline_jobs work queue", _0006_pipeline_jobs),
+    Migration(7, "zoho_outbox for background Zoho pushes", _0007_zoho_outbox),
+    Migration(
+        8, "table_versions change counters for API caching", _0008_table_versions
+    ),
+    Migration(9, "pipeline_runs and stage timings history", _0009_pipeline_runs),
+    Migration(10, "one zoho_outbox record per CCFID", _0010_unique_outbox_ccfid),
+]
+
+HEAD = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            " version INTEGER PRIMARY KEY,"
+            " description TEXT,"
+            " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+    )
+
+
+def _applied_version(conn: Connection) -> int:
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def current_version(bind: Optional[Engine] = None) -> int:
+    """Return the highest applied migration version (0 for an unmanaged DB)."""
+    with (bind or default_engine).connect() as conn:
+        return _applied_version(conn)
+
+
+def upgrade(bind: Optional[Engine] = None) -> int:
+    """Apply every pending migration and return the resulting version."""
+    bind = bind or default_engine
+    with bind.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(
+                text("SELECT pg_advisory_xact_lock(:k)"), {"k": _MIGRATION_LOCK_KEY}
+            )
+        _ensure_version_table(conn)
+        version = _applied_version(conn)
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            logger.info(
+                "Applying migration %04d: %s", migration.version, migration.description
+            )
+            migration.apply(conn)
+            conn.execute(
+                text(
+                    "INSERT INTO schema_version (version, description) "
+                    "VALUES (:v, :d)"
+                ),
+                {"v": migration.version, "d": migration.description},
+            )
+            version = migration.version
+    return version
+
+
+def check_schema(bind: Optional[Engine] = None) -> int:
+    """
+    Verify the database is at HEAD. Raises SchemaVersionError if migrations
+    are pending; logs a warning if the database is newer than this code.
+    """
+    version = current_version(bind)
+    if version < HEAD:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, expected {HEAD}; "
+            "run `python -m db.migrations upgrade`"
+        )
+    if version > HEAD:
+        logger.warning(
+            "Database schema version %d is newer than this code (%d)", version, HEAD
+        )
+    return version
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Manage the database schema")
+    p.add_argument("command", choices=["upgrade", "current"])
+    args = p.parse_args()
+    if args.command == "upgrade":
+        print(f"Schema at version {upgrade()}")
+    else:
+        print(f"Schema at version {current_version()} (head {HEAD})")
@@ -1,6 +1,19 @@
 # src/db/models.py
 
-from sqlalchemy import JSON, Boolean, Column, Date, DateTime, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 
 from db.session import Base
 
@@ -27,13 +40,22 @@ class WorklistStaging(Base):
     reviewed = Column(Boolean, default=False)
     uploaded_timestamp = Column(DateTime)
 
+    __table_args__ = (
+        # serves the worklist's "reviewed = false ORDER BY ccfid" query
+        Index(
+            "ix_worklist_staging_pending",
+            "ccfid",
+            postgresql_where=text("reviewed = false"),
+        ),
+    )
+
 
 class CollectionSite(Base):
     __tablename__ = "collection_sites"
 
     Record_id = Column(Text, primary_key=True)
-    Collection_Site = Column(Text)
-    Collection_Site_ID = Column(Text)
+    Collection_Site = Column(Text, index=True)
+    Collection_Site_ID = Column(Text, index=True)
 
 
 class Company(Base):
@@ -49,3 +71,176 @@ class Laboratory(Base):
 
     Record_id = Column(Text, primary_key=True)
     Laboratory = Column(Text, unique=True, index=True)
+
+
+class UploadedCcfid(Base):
+    __tablename__ = "uploaded_ccfid"
+
+    ccfid = Column(Text, primary_key=True)
+    uploaded_timestamp = Column(DateTime, index=True)
+
+
+class SourceRun(Base):
+    """One attempt to process a source's raw export, keyed by its content hash."""
+
+    __tablename__ = "source_runs"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    snapshot_path = Column(Text)
+    status = Column(Text, nullable=False, default="started")
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_source_runs_source_status", "source", "status", "started_at"),
+    )
+
+
+class RowFingerprint(Base):
+    """Last-seen content hash of a raw export row, keyed by its source identifier."""
+
+    __tablename__ = "row_fingerprints"
+
+    source = Column(Text, primary_key=True)
+    source_key = Column(Text, primary_key=True)
+    row_hash = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime)
+
+
+class SourceWatermark(Base):
+    """Latest collection date a source has been fully processed and pushed through."""
+
+    __tablename__ = "source_watermarks"
+
+    source = Column(Text, primary_key=True)
+    watermark = Column(Date, nullable=False)
+    updated_at = Column(DateTime)
+
+
+class SourceAccount(Base):
+    """
+    A portal account to scrape. The password is read from the environment
+    variable named by password_env, never stored here.
+    """
+
+    __tablename__ = "source_accounts"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(Text, nullable=False)
+    account = Column(Text, nullable=False)
+    username = Column(Text)
+    password_env = Column(Text)
+    portal_url = Column(Text)
+    export_url = Column(Text)
+    enabled = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+
+    __table_args__ = (
+        Index("ux_source_accounts_source_account", "source", "account", unique=True),
+    )
+
+
+class PipelineJob(Base):
+    """
+    A unit of pipeline work (scrape an account, normalize a snapshot)
+    claimed by workers with FOR UPDATE SKIP LOCKED.
+    """
+
+    __tablename__ = "pipeline_jobs"
+
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(Text, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # source_runs row a normalize job opened
+    run_id = Column(Integer, index=True)
+    status = Column(Text, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime, nullable=False)
+    locked_by = Column(Text)
+    heartbeat_at = Column(DateTime)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_pipeline_jobs_claim", "status", "run_after", "id"),)
+
+
+class ZohoOutbox(Base):
+    """
+    A ready-to-push Zoho record, written in the same transaction as the
+    staging rows of its batch and drained by the pusher: pending → sent, or
+    dead (with Zoho's error details) after too many failed attempts.
+    """
+
+    __tablename__ = "zoho_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    # One record per CCFID: queueing it again is a no-op (OutboxRepo.add_many)
+    ccfid = Column(Text, nullable=False, unique=True, index=True)
+    # State key of the source account the record came from
+    source = Column(Text, nullable=False)
+    record = Column(JSON, nullable=False)
+    # Raw row fingerprint to save once Zoho accepts the record
+    source_key = Column(Text)
+    row_hash = Column(BigInteger)
+    status = Column(Text, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(JSON)
+    zoho_id = Column(Text)
+    created_at = Column(DateTime)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_zoho_outbox_drain", "status", "next_attempt_at", "id"),)
+
+
+class TableVersion(Base):
+    """
+    Change counter per table, bumped by a statement-level trigger on every
+    write, so readers can tell whether cached data is stale with one lookup.
+    """
+
+    __tablename__ = "table_versions"
+
+    table_name = Column(Text, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    changed_at = Column(DateTime)
+
+
+class PipelineRun(Base):
+    """One pipeline run: its outcome, totals and any regression alerts."""
+
+    __tablename__ = "pipeline_runs"
+
+    id = Column(BigInteger, primary_key=True)
+    started_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime)
+    status = Column(Text, nullable=False, default="running")
+    sources = Column(JSON)
+    rows = Column(Integer)
+    api_calls = Column(Integer)
+    zoho_credits = Column(Integer)
+    alerts = Column(JSON)
+
+
+class PipelineStageRun(Base):
+    """Time and volume of one stage of one source (state key) in a run."""
+
+    __tablename__ = "pipeline_stage_runs"
+
+    id = Column(BigInteger, primary_key=True)
+    run_id = Column(BigInteger, nullable=False, index=True)
+    source = Column(Text, nullable=False)
+    stage = Column(Text, nullable=False)
+    seconds = Column(Float, nullable=False)
+    rows = Column(Integer)
+    rejected = Column(Integer)
+    api_calls = Column(Integer)
+
+    __table_args__ = (
+        # serves the "same stage in recent runs" lookups of the regression check
+        Index("ix_pipeline_stage_runs_trend", "source", "stage", "run_id"),
+    )
@@ -1,19 +1,35 @@
 # src/db/repository.py
-from typing import Any, Dict, List, Optional
+import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from sqlalchemy import Date, Text, any_, bindparam, case, cast, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import Session
 
-from db.models import WorklistStaging
+from db.models import (
+    PipelineJob,
+    PipelineRun,
+    PipelineStageRun,
+    RowFingerprint,
+    SourceAccount,
+    SourceRun,
+    SourceWatermark,
+    TableVersion,
+    UploadedCcfid,
+    WorklistStaging,
+    ZohoOutbox,
+)
 
 
 class WorklistStagingRepo:
     def __init__(self, db: Session):
         self.db = db
 
-    def add_many(self, rows: List[Dict[str, Any]]) -> None:
+    def add_many(self, rows: List[Dict[str, Any]], commit: bool = True) -> None:
         """Bulk-insert a list of staging dicts (expects keys matching model fields)."""
         self.db.bulk_insert_mappings(WorklistStaging, rows)
-        self.db.commit()
+        if commit:
+            self.db.commit()
 
     def get_pending(self) -> List[WorklistStaging]:
         """Return all rows where reviewed=False, ordered by ccfid."""
@@ -24,6 +40,40 @@ class WorklistStagingRepo:
             .all()
         )
 
+    def iter_pending(self, batch_size: int = 500) -> Iterator[WorklistStaging]:
+        """Stream rows where reviewed=False, ordered by ccfid, batch_size at a time."""
+        stmt = (
+            select(WorklistStaging)
+            .where(WorklistStaging.reviewed.is_(False))
+            .order_by(WorklistStaging.ccfid)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.db.scalars(stmt)
+
+    def pending_page(self, page: int, per_page: int) -> List[WorklistStaging]:
+        """One page (from 1) of the rows where reviewed=False, ordered by ccfid."""
+        stmt = (
+            select(WorklistStaging)
+            .where(WorklistStaging.reviewed.is_(False))
+            .order_by(WorklistStaging.ccfid)
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        )
+        return list(self.db.scalars(stmt))
+
+    def count_pending(self) -> int:
+        """Number of rows where reviewed=False, without loading them."""
+        stmt = (
+            select(func.count())
+            .select_from(WorklistStaging)
+            .where(WorklistStaging.reviewed.is_(False))
+        )
+        return self.db.scalar(stmt)
+
+    def ccfids(self) -> Set[str]:
+        """Every ccfid currently in staging, reviewed or not."""
+        return set(self.db.scalars(select(WorklistStaging.ccfid)))
+
     def get(self, ccfid: str) -> Optional[WorklistStaging]:
         """Fetch a single staging row by its primary key."""
         return self.db.get(WorklistStaging, ccfid)
@@ -33,22 +83,546 @@ class WorklistStagingRepo:
         Update named fields on the given ccfid.
         Returns True if row existed & was updated, False otherwise.
         """
-        row = self.get(ccfid)
-        if not row:
-            return False
-        for k, v in fields.items():
-            if hasattr(row, k):
-                setattr(row, k, v)
-        self.db.commit()
-        return True
+        return self.update_many([ccfid], **fields) > 0
+
+    def update_many(self, ccfids: Iterable[str], commit: bool = True, **fields) -> int:
+        """
+        Set the same named fields on every given ccfid in a single
+        UPDATE ... WHERE ccfid = ANY(:ids). Unknown field names are ignored.
+        Returns the number of rows updated.
+        """
+        ids = list(ccfids)
+        values = {k: v for k, v in fields.items() if k in WorklistStaging.__table__.c}
+        if not ids or not values:
+            return 0
+        stmt = (
+            update(WorklistStaging)
+            .where(
+                WorklistStaging.ccfid == any_(bindparam("ids", ids, type_=ARRAY(Text)))
+            )
+            .values(**values)
+            .execution_options(synchronize_session="fetch")
+        )
+        count = self.db.execute(stmt).rowcount
+        if commit:
+            self.db.commit()
+        return count
 
     def mark_reviewed(self, ccfid: str) -> bool:
         """Shortcut: set reviewed=True and timestamp uploaded_timestamp."""
-        return self.update(
-            ccfid, reviewed=True, uploaded_timestamp=datetime.datetime.utcnow()
+        return self.mark_reviewed_many([ccfid]) > 0
+
+    def mark_reviewed_many(self, ccfids: Iterable[str], commit: bool = True) -> int:
+        """Set reviewed=True and stamp uploaded_timestamp on every given ccfid."""
+        return self.update_many(
+            ccfids,
+            commit=commit,
+            reviewed=True,
+            uploaded_timestamp=datetime.datetime.utcnow(),
         )
 
     def clear_all(self) -> None:
         """Delete every row in staging (use with care!)."""
         self.db.query(WorklistStaging).delete()
         self.db.commit()
+
+
+class SourceRunRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def start(self, source: str, content_hash: str, snapshot_path: str) -> SourceRun:
+        """Record that processing of a snapshot has begun."""
+        run = SourceRun(
+            source=source,
+            content_hash=content_hash,
+            snapshot_path=snapshot_path,
+            status="started",
+            started_at=datetime.datetime.utcnow(),
+        )
+        self.db.add(run)
+        self.db.commit()
+        return run
+
+    def finish(self, run: SourceRun, status: str) -> None:
+        """Close out a run as 'success' or 'failed'."""
+        run.status = status
+        run.finished_at = datetime.datetime.utcnow()
+        self.db.commit()
+
+    def last_success_hash(self, source: str) -> Optional[str]:
+        """Content hash of the source's most recent successful run, if any."""
+        stmt = (
+            select(SourceRun.content_hash)
+            .where(SourceRun.source == source, SourceRun.status == "success")
+            .order_by(SourceRun.started_at.desc())
+            .limit(1)
+        )
+        return self.db.scalar(stmt)
+
+    def has_succeeded(self, source: str, content_hash: str) -> bool:
+        """True if this exact content was ever processed successfully."""
+        stmt = select(SourceRun.id).where(
+            SourceRun.source == source,
+            SourceRun.content_hash == content_hash,
+            SourceRun.status == "success",
+        )
+        return self.db.scalar(stmt.limit(1)) is not None
+
+
+class RowFingerprintRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load(self, source: str, keys: Iterable[str]) -> Dict[str, int]:
+        """Stored row hashes for the given source keys (missing keys are omitted)."""
+        ids = list(keys)
+        if not ids:
+            return {}
+        stmt = select(RowFingerprint.source_key, RowFingerprint.row_hash).where(
+            RowFingerprint.source == source,
+            RowFingerprint.source_key == any_(bindparam("ids", ids, type_=ARRAY(Text))),
+        )
+        return dict(self.db.execute(stmt).all())
+
+    def save(
+        self,
+        source: str,
+        hashes: Dict[str, int],
+        chunk_size: int = 5000,
+        commit: bool = True,
+    ) -> None:
+        """Upsert row hashes for a source, chunk_size rows per statement."""
+        now = datetime.datetime.utcnow()
+        rows = [
+            {"source": source, "source_key": k, "row_hash": int(h), "updated_at": now}
+            for k, h in hashes.items()
+        ]
+        for i in range(0, len(rows), chunk_size):
+            stmt = insert(RowFingerprint).values(rows[i : i + chunk_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["source", "source_key"],
+                set_={
+                    "row_hash": stmt.excluded.row_hash,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            self.db.execute(stmt)
+        if commit:
+            self.db.commit()
+
+
+class WatermarkRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, source: str) -> Optional[datetime.date]:
+        """The source's watermark, or None if it has never completed a run."""
+        row = self.db.get(SourceWatermark, source)
+        return row.watermark if row else None
+
+    def advance(self, source: str, watermark: datetime.date) -> None:
+        """Move the watermark forward to `watermark`; never moves it back."""
+        stmt = insert(SourceWatermark).values(
+            source=source, watermark=watermark, updated_at=datetime.datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["source"],
+            set_={
+                "watermark": func.greatest(
+                    SourceWatermark.watermark, stmt.excluded.watermark
+                ),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        self.db.execute(stmt)
+        self.db.commit()
+
+
+class SourceAccountRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enabled(self) -> List[SourceAccount]:
+        """Enabled portal accounts, ordered by source then account."""
+        return (
+            self.db.query(SourceAccount)
+            .filter(SourceAccount.enabled.is_(True))
+            .order_by(SourceAccount.source, SourceAccount.account)
+            .all()
+        )
+
+
+class JobRepo:
+    """
+    The pipeline_jobs work queue. A job is queued → running → done, or back
+    to queued (with backoff) when it fails, until max_attempts leaves it dead.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        max_attempts: int,
+        run_id: Optional[int] = None,
+        commit: bool = True,
+    ) -> PipelineJob:
+        now = datetime.datetime.utcnow()
+        job = PipelineJob(
+            kind=kind,
+            payload=payload,
+            run_id=run_id,
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=now,
+            created_at=now,
+        )
+        self.db.add(job)
+        if commit:
+            self.db.commit()
+        return job
+
+    def claim(self, worker: str, kinds: Iterable[str]) -> Optional[PipelineJob]:
+        """
+        Lock the oldest due job of one of `kinds` and mark it running for
+        `worker`. Rows other workers hold are skipped, not waited on.
+        """
+        now = datetime.datetime.utcnow()
+        stmt = (
+            select(PipelineJob)
+            .where(
+                PipelineJob.status == "queued",
+                PipelineJob.run_after <= now,
+                PipelineJob.kind.in_(list(kinds)),
+            )
+            .order_by(PipelineJob.run_after, PipelineJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = self.db.scalar(stmt)
+        if job is None:
+            self.db.rollback()
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.locked_by = worker
+        job.heartbeat_at = now
+        job.error = None
+        self.db.commit()
+        return job
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Extend the claim; False if the job was reclaimed from `worker`."""
+        return self._update_held(
+            job_id, worker, heartbeat_at=datetime.datetime.utcnow()
+        )
+
+    def complete(
+        self, job: PipelineJob, worker: str, result: Optional[Dict] = None
+    ) -> bool:
+        """Mark a held job done; False if it was reclaimed meanwhile."""
+        return self._update_held(
+            job.id,
+            worker,
+            status="done",
+            result=result,
+            finished_at=datetime.datetime.utcnow(),
+        )
+
+    def fail(
+        self, job: PipelineJob, worker: str, error: str, backoff_seconds: float
+    ) -> Optional[str]:
+        """
+        Requeue a held job after an exponential backoff, or mark it dead once
+        its attempts are used up. Returns the new status, or None if the job
+        was reclaimed meanwhile.
+        """
+        now = datetime.datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            status, fields = "dead", {"finished_at": now}
+        else:
+            delay = backoff_seconds * 2 ** (job.attempts - 1)
+            status = "queued"
+            fields = {
+                "run_after": now + datetime.timedelta(seconds=delay),
+                "locked_by": None,
+            }
+        updated = self._update_held(
+            job.id, worker, status=status, error=error, **fields
+        )
+        return status if updated else None
+
+    def defer(self, job: PipelineJob, worker: str, delay_seconds: float) -> bool:
+        """
+        Requeue a held job that could not start yet, without counting the
+        attempt; False if it was reclaimed meanwhile.
+        """
+        run_after = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=delay_seconds
+        )
+        return self._update_held(
+            job.id,
+            worker,
+            status="queued",
+            attempts=job.attempts - 1,
+            run_after=run_after,
+            locked_by=None,
+        )
+
+    def reclaim_stale(self, stale_seconds: float) -> List[PipelineJob]:
+        """
+        Requeue running jobs whose worker stopped heartbeating (dead once out
+        of attempts). Returns the jobs that were reclaimed.
+        """
+        now = datetime.datetime.utcnow()
+        cutoff = now - datetime.timedelta(seconds=stale_seconds)
+        stmt = (
+            update(PipelineJob)
+            .where(PipelineJob.status == "running", PipelineJob.heartbeat_at < cutoff)
+            .values(
+                status=case(
+                    (PipelineJob.attempts >= PipelineJob.max_attempts, "dead"),
+                    else_="queued",
+                ),
+                locked_by=None,
+                run_after=now,
+                error="worker stopped heartbeating",
+            )
+            .returning(PipelineJob)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = list(self.db.scalars(stmt))
+        self.db.commit()
+        return jobs
+
+    def has_open(self, kind: str, key: str) -> bool:
+        """True if a `kind` job for state key `key` is queued or running."""
+        stmt = select(PipelineJob.id).where(
+            PipelineJob.kind == kind,
+            PipelineJob.payload["key"].as_string() == key,
+            PipelineJob.status.in_(["queued", "running"]),
+        )
+        return self.db.scalar(stmt.limit(1)) is not None
+
+    def _update_held(self, job_id: int, worker: str, **values) -> bool:
+        stmt = (
+            update(PipelineJob)
+            .where(
+                PipelineJob.id == job_id,
+                PipelineJob.locked_by == worker,
+                PipelineJob.status == "running",
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        updated = self.db.execute(stmt).rowcount > 0
+        self.db.commit()
+        return updated
+
+
+class OutboxRepo:
+    """
+    The zoho_outbox table. Callers own the transaction: records are added
+    alongside their staging rows, and a claimed batch stays locked until
+    the pusher commits its outcome.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_many(
+        self, rows: List[Dict[str, Any]], chunk_size: int = 5000, commit: bool = True
+    ) -> None:
+        """
+        Queue records; each dict needs ccfid, source and record. A CCFID
+        already in the outbox is left as it is, whatever its status.
+        """
+        now = datetime.datetime.utcnow()
+        rows = [
+            {
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+                **row,
+            }
+            for row in rows
+        ]
+        for i in range(0, len(rows), chunk_size):
+            stmt = insert(ZohoOutbox).values(rows[i : i + chunk_size])
+            self.db.execute(stmt.on_conflict_do_nothing(index_elements=["ccfid"]))
+        if commit:
+            self.db.commit()
+
+    def unsent_ccfids(self) -> Set[str]:
+        """
+        CCFIDs queued and not sent: pending, or dead-lettered and waiting on
+        requeue_dead(). Either way they must not be queued again.
+        """
+        stmt = select(ZohoOutbox.ccfid).where(
+            ZohoOutbox.status.in_(("pending", "dead"))
+        )
+        return set(self.db.scalars(stmt))
+
+    def claim(self, limit: int) -> List[ZohoOutbox]:
+        """
+        Lock up to `limit` due pending records, oldest first. Records another
+        pusher holds are skipped; the locks last until the next commit.
+        """
+        stmt = (
+            select(ZohoOutbox)
+            .where(
+                ZohoOutbox.status == "pending",
+                ZohoOutbox.next_attempt_at <= datetime.datetime.utcnow(),
+            )
+            .order_by(ZohoOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(self.db.scalars(stmt))
+
+    def mark_sent(self, row: ZohoOutbox, zoho_id: Optional[str]) -> None:
+        row.status = "sent"
+        row.attempts += 1
+        row.zoho_id = zoho_id
+        row.last_error = None
+        row.sent_at = datetime.datetime.utcnow()
+
+    def mark_failed(
+        self,
+        row: ZohoOutbox,
+        error: Dict[str, Any],
+        max_attempts: int,
+        backoff_seconds: float,
+    ) -> None:
+        """Retry after an exponential backoff, or dead-letter the record."""
+        row.attempts += 1
+        row.last_error = error
+        if row.attempts >= max_attempts:
+            row.status = "dead"
+        else:
+            delay = backoff_seconds * 2 ** (row.attempts - 1)
+            row.next_attempt_at = datetime.datetime.utcnow() + datetime.timedelta(
+                seconds=delay
+            )
+
+    def requeue_dead(self, ccfids: Optional[Iterable[str]] = None) -> int:
+        """Give dead records (all, or the given CCFIDs) a fresh set of attempts."""
+        stmt = update(ZohoOutbox).where(ZohoOutbox.status == "dead")
+        if ccfids is not None:
+            ids = list(ccfids)
+            stmt = stmt.where(
+                ZohoOutbox.ccfid == any_(bindparam("ids", ids, type_=ARRAY(Text)))
+            )
+        stmt = stmt.values(
+            status="pending", attempts=0, next_attempt_at=datetime.datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+        count = self.db.execute(stmt).rowcount
+        self.db.commit()
+        return count
+
+    def counts(self) -> Dict[str, int]:
+        """Number of records per status."""
+        stmt = select(ZohoOutbox.status, func.count()).group_by(ZohoOutbox.status)
+        return dict(self.db.execute(stmt).all())
+
+    def oldest_unsent_date(self, source: str) -> Optional[datetime.date]:
+        """
+        Earliest Collection_Date among the source's records that Zoho has not
+        accepted: pending, or dead-lettered and not uploaded since.
+        """
+        collected = func.nullif(ZohoOutbox.record["Collection_Date"].as_string(), "")
+        uploaded = select(UploadedCcfid.ccfid).where(
+            UploadedCcfid.ccfid == ZohoOutbox.ccfid
+        )
+        stmt = select(func.min(cast(collected, Date))).where(
+            ZohoOutbox.source == source,
+            ZohoOutbox.status.in_(("pending", "dead")),
+            ~uploaded.exists(),
+        )
+        return self.db.scalar(stmt)
+
+
+class TableVersionRepo:
+    """Read the per-table change counters kept by the table_versions triggers."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(
+        self, tables: Iterable[str]
+    ) -> Dict[str, Tuple[int, Optional[datetime.datetime]]]:
+        """(version, changed_at) per table; (0, None) for never-written tables."""
+        names = list(tables)
+        stmt = select(
+            TableVersion.table_name, TableVersion.version, TableVersion.changed_at
+        ).where(
+            TableVersion.table_name
+            == any_(bindparam("names", names, type_=ARRAY(Text)))
+        )
+        found = {name: (version, at) for name, version, at in self.db.execute(stmt)}
+        return {name: found.get(name, (0, None)) for name in names}
+
+
+class PipelineRunRepo:
+    """History of pipeline runs and their per-stage timings."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save(
+        self, run: Dict[str, Any], stages: List[Dict[str, Any]], commit: bool = True
+    ) -> PipelineRun:
+        """Store a finished run and its stage rows."""
+        row = PipelineRun(**run)
+        self.db.add(row)
+        self.db.flush()
+        self.db.bulk_insert_mappings(
+            PipelineStageRun, [{"run_id": row.id, **stage} for stage in stages]
+        )
+        if commit:
+            self.db.commit()
+        return row
+
+    def stage_history(
+        self, source: str, stage: str, before_run: int, limit: int
+    ) -> List[PipelineStageRun]:
+        """The stage's rows from the `limit` latest successful runs before a run."""
+        stmt = (
+            select(PipelineStageRun)
+            .join(PipelineRun, PipelineRun.id == PipelineStageRun.run_id)
+            .where(
+                PipelineStageRun.source == source,
+                PipelineStageRun.stage == stage,
+                PipelineStageRun.run_id < before_run,
+                PipelineRun.status == "success",
+            )
+            .order_by(PipelineStageRun.run_id.desc())
+            .limit(limit)
+        )
+        return list(self.db.scalars(stmt))
+
+    def recent(self, limit: int) -> List[PipelineRun]:
+        """The latest runs, newest first."""
+        stmt = select(PipelineRun).order_by(PipelineRun.id.desc()).limit(limit)
+        return list(self.db.scalars(stmt))
+
+    def stages_for(self, run_ids: Iterable[int]) -> List[PipelineStageRun]:
+        """Stage rows of the given runs, oldest run first."""
+        ids = list(run_ids)
+        if not ids:
+            return []
+        stmt = (
+            select(PipelineStageRun)
+            .where(PipelineStageRun.run_id.in_(ids))
+            .order_by(
+                PipelineStageRun.run_id,
+                PipelineStageRun.source,
+                PipelineStageRun.stage,
+            )
+        )
+        return list(self.db.scalars(stmt))
@@ -1,5 +1,10 @@
+import functools
+from typing import Collection, Optional
+
 import pandas as pd
 
+from db.session import engine
+
 # --- Shared Constants & Mappings ---
 REASON_MAP = {
     "pre-employment": "Pre-Employment",
@@ -64,6 +69,38 @@ MASTER_COLUMNS = [
 
 
 # --- Shared Helper Functions ---
+def copy_on_write(fn):
+    """
+    Run a normalizer under pandas copy-on-write: derived frames share the
+    input's buffers until written, so no defensive full-frame copy is needed.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(df, *args, **kwargs):
+        with pd.option_context("mode.copy_on_write", True):
+            return fn(df, *args, **kwargs)
+
+    return wrapper
+
+
+def drop_uploaded_and_duplicates(
+    result: pd.DataFrame, uploaded: Optional[Collection[str]] = None
+) -> pd.DataFrame:
+    """
+    Drop CCFIDs already in uploaded_ccfid, then in-batch duplicates (first
+    row wins), and renumber the rows. Callers normalizing many chunks pass
+    the `uploaded` CCFIDs they already hold instead of querying per chunk.
+    """
+    if uploaded is None:
+        uploaded = (
+            pd.read_sql("SELECT ccfid FROM uploaded_ccfid", con=engine)["ccfid"]
+            .dropna()
+            .unique()
+        )
+    result = result[~result["CCFID"].isin(uploaded)]
+    return result.drop_duplicates(subset=["CCFID"]).reset_index(drop=True)
+
+
 def safe_date_parse(val, out_fmt="%m/%d/%Y"):
     """
     Parse various date formats and return a string in the given out_fmt (default MM/DD/YYYY).
@@ -1,8 +1,9 @@
 import pandas as pd
 
-from db.session import engine
 from normalize.common import (
     MASTER_COLUMNS,
+    copy_on_write,
+    drop_uploaded_and_duplicates,
     map_laboratory,
     map_reason,
     map_regulation,
@@ -29,13 +30,20 @@ def resolve_reference_id_crl(row):
     return ""
 
 
-def normalize(df: pd.DataFrame) -> pd.DataFrame:
+def source_keys(df: pd.DataFrame) -> pd.Series:
+    """Per-row CCFID as normalize() would derive it, for change detection."""
+    if df.empty:
+        return pd.Series("", index=df.index, dtype=str)
+    return df.apply(resolve_reference_id_crl, axis=1).fillna("").astype(str)
+
+
+@copy_on_write
+def map_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Clean & map CRL DataFrame to the unified schema,
-    convert dates to ISO format for Zoho, then drop any
-    CCFIDs already uploaded and any duplicates.
+    Row-wise part of normalize(): filter and map to MASTER_COLUMNS, keeping
+    the input's index. Safe to run on any slice of an export.
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # 1) Filter out unwanted statuses
     drop_statuses = [
@@ -44,7 +52,9 @@ def normalize(df: pd.DataFrame) -> pd.DataFrame:
         "collection not performed",
         "physical exam - pending",
     ]
-    df = df[~df["Status"].str.lower().isin(drop_statuses)].copy()
+    df = df[~df["Status"].str.lower().isin(drop_statuses)]
+    if df.empty:
+        return pd.DataFrame(columns=MASTER_COLUMNS)
 
     # 2) Names & IDs
     df["First_Name"], df["Last_Name"] = zip(*df["Name"].apply(parse_name))
@@ -98,17 +108,14 @@ def normalize(df: pd.DataFrame) -> pd.DataFrame:
     df["Location"] = "None"
 
     # 7) Reorder to MASTER_COLUMNS schema
-    result = df.reindex(columns=MASTER_COLUMNS, fill_value="").fillna("")
-
-    # 8) Drop already-uploaded CCFIDs
-    existing = (
-        pd.read_sql("SELECT ccfid FROM uploaded_ccfid", con=engine)["ccfid"]
-        .dropna()
-        .unique()
-    )
-    result = result[~result["CCFID"].isin(existing)]
+    return df.reindex(columns=MASTER_COLUMNS, fill_value="").fillna("")
 
-    # 9) Drop any duplicates in this batch
-    result = result.drop_duplicates(subset=["CCFID"]).reset_index(drop=True)
 
-    return result
+@copy_on_write
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clean & map CRL DataFrame to the unified schema,
+    convert dates to ISO format for Zoho, then drop any
+    CCFIDs already uploaded and any duplicates.
+    """
+    return drop_uploaded_and_duplicates(map_rows(df))
@@ -1,9 +1,12 @@
+from typing import List, Tuple
+
 import pandas as pd
 from rapidfuzz import fuzz, process
 
 from db.session import engine
 from normalize.common import (
     MASTER_COLUMNS,
+    copy_on_write,
     map_laboratory,
     map_reason,
     map_regulation,
@@ -24,14 +27,32 @@ def load_crm_reference():
     return pd.read_sql(query, con=engine)
 
 
-crm_df = load_crm_reference()
-crm_names = crm_df["company"].astype(str).tolist()
-crm_codes = crm_df["code"].astype(str).tolist()
+# (crm_names, crm_codes), loaded on first use
+_crm = None
+
+
+def crm_reference() -> Tuple[List[str], List[str]]:
+    """Parallel lists of CRM account names and codes, queried once per process."""
+    global _crm
+    if _crm is None:
+        crm_df = load_crm_reference()
+        _crm = (
+            crm_df["company"].astype(str).tolist(),
+            crm_df["code"].astype(str).tolist(),
+        )
+    return _crm
+
+
+def use_crm_reference(crm: Tuple[List[str], List[str]]) -> None:
+    """Install names/codes loaded elsewhere (e.g. by a worker pool's parent)."""
+    global _crm
+    _crm = crm
 
 
 def fuzzy_code(company):
     if pd.isna(company) or not str(company).strip():
         return ""
+    crm_names, crm_codes = crm_reference()
     match, score, idx = process.extractOne(
         company, crm_names, scorer=fuzz.token_sort_ratio
     )
@@ -48,8 +69,15 @@ def find_col(possible_cols, df_columns):
     raise KeyError(f"None of {possible_cols} found in columns: {df_columns}")
 
 
+def source_keys(df: pd.DataFrame) -> pd.Series:
+    """Per-row CCFID as normalize_escreen() would derive it, for change detection."""
+    coc_col = find_col(["COC", "CCFID", "Test Number"], df.columns)
+    return df[coc_col].fillna("").astype(str)
+
+
+@copy_on_write
 def normalize_escreen(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+    df = df.copy(deep=False)
     cols = df.columns
 
     donor_col = find_col(["Donor Name", "DonorName"], cols)
@@ -89,7 +117,7 @@ def normalize_escreen(df: pd.DataFrame) -> pd.DataFrame:
 
     # 4) Result, reason, regulation, type
     df["Test_Result"] = df[result_col].apply(map_result)
-    df = df[df["Test_Result"] != ""].copy()
+    df = df[df["Test_Result"] != ""]
     df["Test_Reason"] = df[reason_col].apply(map_reason)
     df["Regulation"] = df[regulation_col].apply(map_regulation)
 
@@ -0,0 +1,64 @@
+"""
+Row-level change detection for raw exports.
+
+Each raw row is hashed with pandas' vectorized 64-bit hash and grouped by
+its source key (the CCFID the normalizer would derive). Only keys whose
+hash is new or differs from the stored one need to be normalized again.
+"""
+
+from typing import List, Optional, Set
+
+import pandas as pd
+
+
+def key_hashes(df: pd.DataFrame, keys: pd.Series) -> pd.Series:
+    """
+    Return a signed 64-bit content hash per non-blank source key. Rows that
+    share a key are combined, so the key changes if any of its rows do.
+    """
+    row_hash = pd.util.hash_pandas_object(df, index=False)
+    row_hash.index = keys.to_numpy()
+    row_hash = row_hash[row_hash.index != ""]
+    # uint64 addition wraps, which is fine for an order-independent combine
+    combined = row_hash.groupby(level=0).sum().astype("uint64")
+    return pd.Series(combined.to_numpy().view("int64"), index=combined.index)
+
+
+def combine_hashes(parts: List[pd.Series]) -> pd.Series:
+    """
+    Combine key_hashes() of consecutive chunks of one export into the hashes
+    key_hashes() would return for the whole export.
+    """
+    if not parts:
+        return pd.Series([], dtype="int64")
+    hashes = pd.concat(parts)
+    combined = (
+        pd.Series(hashes.to_numpy().view("uint64"), index=hashes.index)
+        .groupby(level=0)
+        .sum()
+        .astype("uint64")
+    )
+    return pd.Series(combined.to_numpy().view("int64"), index=combined.index)
+
+
+def changed_keys(hashes: pd.Series, stored: dict) -> Set[str]:
+    """Keys whose hash is new or differs from `stored`."""
+    previous = pd.Series(stored, dtype="Int64").reindex(hashes.index)
+    differs = (previous != hashes).fillna(True).astype(bool)
+    return set(hashes.index[differs.to_numpy()])
+
+
+def changed_mask(
+    keys: pd.Series,
+    hashes: pd.Series,
+    stored: dict,
+    changed: Optional[Set[str]] = None,
+) -> pd.Series:
+    """
+    Boolean mask over the raw rows: True where the row's key is blank, new,
+    or its hash differs from `stored`. Pass `changed` (from changed_keys())
+    to reuse it across chunks of the same export.
+    """
+    if changed is None:
+        changed = changed_keys(hashes, stored)
+    return (keys == "") | keys.isin(changed)
@@ -3,6 +3,8 @@ import pandas as pd
 from db.session import engine
 from normalize.common import (
     MASTER_COLUMNS,
+    copy_on_write,
+    drop_uploaded_and_duplicates,
     map_laboratory,
     map_reason,
     map_regulation,
@@ -27,18 +29,39 @@ def load_crm_reference() -> pd.DataFrame:
     return pd.read_sql(query, con=engine)
 
 
-# Build a lookup map: { i3_code: account_code }
-crm_df = load_crm_reference()
-crm_map = crm_df.set_index("i3_code")["code"].astype(str).to_dict()
+# Lookup map { i3_code: account_code }, loaded on first use
+_crm_map = None
 
 
-def normalize_i3screen(df: pd.DataFrame) -> pd.DataFrame:
+def crm_reference() -> dict:
+    """The { i3_code: account_code } map, queried once per process."""
+    global _crm_map
+    if _crm_map is None:
+        crm_df = load_crm_reference()
+        _crm_map = crm_df.set_index("i3_code")["code"].astype(str).to_dict()
+    return _crm_map
+
+
+def use_crm_reference(crm_map: dict) -> None:
+    """Install a map loaded elsewhere (e.g. by a worker pool's parent)."""
+    global _crm_map
+    _crm_map = crm_map
+
+
+def source_keys(df: pd.DataFrame) -> pd.Series:
+    """Per-row CCFID as normalize_i3screen() would derive it, for change detection."""
+    if "CCF / Test Number" not in df.columns:
+        return pd.Series("", index=df.index, dtype=str)
+    return df["CCF / Test Number"].fillna("").astype(str)
+
+
+@copy_on_write
+def map_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Clean & map i3Screen DataFrame to the unified schema,
-    convert dates to ISO format for Zoho, then drop any
-    already-uploaded CCFIDs and duplicates.
+    Row-wise part of normalize_i3screen(): map to MASTER_COLUMNS, keeping
+    the input's index. Safe to run on any slice of an export.
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     # 1) Basic field mappings
     df["CCFID"] = df.get("CCF / Test Number", "").fillna("")
@@ -51,7 +74,7 @@ def normalize_i3screen(df: pd.DataFrame) -> pd.DataFrame:
     df["OrgID_num"] = pd.to_numeric(df.get("Org ID", ""), errors="coerce").astype(
         "Int64"
     )
-    df["Code"] = df["OrgID_num"].map(crm_map).fillna("")
+    df["Code"] = df["OrgID_num"].map(crm_reference()).fillna("")
 
     # 3) Date and reason/result mappings with ISO conversion
     df["Collection_Date"] = (
@@ -95,16 +118,14 @@ def normalize_i3screen(df: pd.DataFrame) -> pd.DataFrame:
     )
 
     # 7) Reorder to MASTER_COLUMNS schema & fill blanks
-    result = df.reindex(columns=MASTER_COLUMNS, fill_value="").fillna("")
+    return df.reindex(columns=MASTER_COLUMNS, fill_value="").fillna("")
 
-    # 8) Drop already-uploaded CCFIDs
-    existing = (
-        pd.read_sql("SELECT ccfid FROM uploaded_ccfid", con=engine)["ccfid"]
-        .dropna()
-        .unique()
-    )
-    result = result[~result["CCFID"].isin(existing)]
 
-    # 9) Drop in-batch duplicates
-    result = result.drop_duplicates(subset=["CCFID"]).reset_index(drop=True)
-    return result
+@copy_on_write
+def normalize_i3screen(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clean & map i3Screen DataFrame to the unified schema,
+    convert dates to ISO format for Zoho, then drop any
+    already-uploaded CCFIDs and duplicates.
+    """
+    return drop_uploaded_and_duplicates(map_rows(df))
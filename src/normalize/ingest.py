@@ -0,0 +1,211 @@
+"""
+Reading raw portal exports into DataFrames ahead of normalization.
+"""
+
+import csv
+import logging
+import os
+import shutil
+import subprocess
+
+from typing import Iterator, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+logger = logging.getLogger(__name__)
+
+STRING_DTYPE = "string[pyarrow]"
+
+# pandas' default NA markers; Arrow's defaults lack "None" and "<NA>"
+NA_VALUES = pacsv.ConvertOptions().null_values + ["<NA>", "None"]
+
+# Raw export columns each normalizer reads; everything else is never loaded.
+# eScreen lists every alias normalize_escreen's find_col() accepts.
+INGEST_COLUMNS = {
+    "crl": [
+        "Status",
+        "Name",
+        "Reference ID",
+        "Type",
+        "Authorized ID",
+        "CCF Donor ID",
+        "Company Name",
+        "Company",
+        "Company Code",
+        "Collection Date",
+        "Reviewed Date",
+        "MRO Result",
+        "Regulated",
+        "Service",
+        "Reason",
+        "Lab Code",
+        "Site Name",
+        "Site ID",
+    ],
+    "i3": [
+        "CCF / Test Number",
+        "First Name",
+        "Last Name",
+        "SSN/EID",
+        "Customer",
+        "Org ID",
+        "Collection Date/Time",
+        "Report Date",
+        "Reason For Test",
+        "MRO Result",
+        "Specimen Type",
+        "Lab",
+        "Program Description",
+        "Collection Site",
+        "Collection Site ID",
+        "Location",
+    ],
+    "escreen": [
+        "Donor Name",
+        "DonorName",
+        "Client",
+        "Company",
+        "Employer",
+        "Cost Center",
+        "CostCenter",
+        "COC",
+        "CCFID",
+        "Test Number",
+        "SSN",
+        "Donor SSN",
+        "Reason",
+        "Result",
+        "Regulation",
+        "Test Type",
+        "Collection Date/Time",
+        "Collection Date",
+        "Final Verification Date/Time",
+        "MRO_Received",
+        "BA Quant",
+        "baValue",
+    ],
+}
+
+# Try to honour an override (e.g. on Windows), otherwise fall back to the 'soffice' executable on PATH
+SOFFICE_CMD = os.environ.get("SOFFICE_EXE") or shutil.which("soffice") or "soffice"
+
+
+def convert_xlsx_to_csv(xlsx_path, output_dir):
+    """
+    Converts XLSX → CSV via LibreOffice headless CLI.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        subprocess.run(
+            [
+                SOFFICE_CMD,
+                "--headless",
+                "--convert-to",
+                "csv",
+                "--outdir",
+                output_dir,
+                xlsx_path,
+            ],
+            check=True,
+        )
+    except FileNotFoundError:
+        logger.error("LibreOffice executable not found: %s", SOFFICE_CMD)
+        raise
+    except subprocess.CalledProcessError as e:
+        logger.error("LibreOffice conversion failed: %s", e)
+        raise
+
+    base = os.path.splitext(os.path.basename(xlsx_path))[0]
+    csv_path = os.path.join(output_dir, f"{base}.csv")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Expected CSV not found at {csv_path}")
+    return csv_path
+
+
+def find_escreen_header_row(csv_path):
+    """Auto-detect the header row for eScreen exports."""
+    with open(csv_path) as f:
+        for i, row in enumerate(csv.reader(f)):
+            if "Donor Name" in row and "COC" in row and "Test Type" in row:
+                return i
+    return 7  # fallback
+
+
+def _select_columns(csv_path: str, source: str, header: int) -> List[str]:
+    """Header names present in the file that the source's normalizer reads."""
+    present = pd.read_csv(csv_path, nrows=0, header=header).columns
+    wanted = {c.strip().lower() for c in INGEST_COLUMNS[source]}
+    return [c for c in present if c.strip().lower() in wanted]
+
+
+def raw_csv(source: str, path: str, workdir: str) -> Tuple[str, int]:
+    """
+    CSV path and header row for a raw export. eScreen XLSX files are
+    converted to CSV in `workdir` first, and eScreen CSVs (manual uploads)
+    read as they are; either way their header row is detected.
+    """
+    if source == "escreen":
+        if path.lower().endswith(".csv"):
+            csv_path = path
+        else:
+            csv_path = convert_xlsx_to_csv(path, workdir)
+        return csv_path, find_escreen_header_row(csv_path)
+    return path, 0
+
+
+def read_raw(source: str, path: str, workdir: str) -> pd.DataFrame:
+    """
+    Load only the columns a source's normalizer needs, as Arrow-backed
+    strings. eScreen XLSX files are converted to CSV in `workdir` first and
+    their header row detected.
+    """
+    csv_path, header = raw_csv(source, path, workdir)
+    usecols = _select_columns(csv_path, source, header)
+    try:
+        return _read_arrow(csv_path, header, usecols)
+    except (pa.ArrowInvalid, ValueError) as e:
+        # Ragged trailer rows (e.g. report totals) trip the Arrow parser
+        logger.debug("[%s] pyarrow CSV reader failed (%s); using C engine", source, e)
+        return pd.read_csv(csv_path, header=header, usecols=usecols, dtype=STRING_DTYPE)
+
+
+def _read_arrow(csv_path: str, header: int, usecols: List[str]) -> pd.DataFrame:
+    """
+    Multithreaded Arrow read with every column typed as a string up front.
+    pandas' pyarrow engine infers types and casts afterwards, which turns
+    "5141" into "5141.0" and makes values differ from the C engine's
+    (and so from read_raw_chunks()).
+    """
+    table = pacsv.read_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(skip_rows=header),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=usecols,
+            column_types={c: pa.string() for c in usecols},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+
+def read_raw_chunks(
+    source: str, csv_path: str, header: int, chunksize: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV from raw_csv() in frames of at most `chunksize` rows, with
+    the same columns and dtypes as read_raw(). The row index continues
+    across chunks, as if the whole file had been read at once.
+    """
+    usecols = _select_columns(csv_path, source, header)
+    with pd.read_csv(
+        csv_path,
+        header=header,
+        usecols=usecols,
+        dtype=STRING_DTYPE,
+        chunksize=chunksize,
+    ) as reader:
+        yield from reader
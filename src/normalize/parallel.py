@@ -0,0 +1,93 @@
+"""
+Normalize one export across several processes.
+
+The raw frame is split into contiguous partitions, each partition runs the
+source's row-wise step in a worker, and the results are concatenated in
+order. Steps that need the whole batch (dropping uploaded CCFIDs and the
+global CCFID dedupe) run once on the combined frame, so the output is the
+same as the single-process normalizer's.
+
+CRM reference data is loaded once in the parent and installed in each
+worker by the pool initializer; workers never query the database.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, Optional
+
+import numpy as np
+import pandas as pd
+
+from normalize import crl, escreen, i3screen
+from normalize.common import drop_uploaded_and_duplicates
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows per partition, process start-up outweighs the gain
+MIN_PARTITION_ROWS = 5_000
+
+# source → (row-wise step run per partition, whole-batch step run after)
+STEPS = {
+    "crl": (crl.map_rows, drop_uploaded_and_duplicates),
+    "i3": (i3screen.map_rows, drop_uploaded_and_duplicates),
+    "escreen": (escreen.normalize_escreen, None),
+}
+
+# Normalizer modules whose CRM reference is shipped to the workers
+REFERENCES = {"i3": i3screen, "escreen": escreen}
+
+
+def _mp_context():
+    # Forking a process that already runs Arrow's thread pools is unsafe;
+    # a fork server that has preloaded this module starts workers quickly.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(source: str, reference) -> None:
+    if reference is not None:
+        REFERENCES[source].use_crm_reference(reference)
+
+
+def partition(df: pd.DataFrame, parts: int):
+    """Split df into `parts` contiguous slices of near-equal length."""
+    bounds = np.linspace(0, len(df), parts + 1).astype(int)
+    return [df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def normalize_partitioned(
+    source: str,
+    df: pd.DataFrame,
+    workers: int,
+    min_rows: int = MIN_PARTITION_ROWS,
+    uploaded: Optional[Collection[str]] = None,
+) -> pd.DataFrame:
+    """
+    Normalize `df` for `source` using up to `workers` processes. Frames too
+    small to fill two partitions of `min_rows` are normalized in-process.
+    `uploaded` CCFIDs are dropped without reading uploaded_ccfid again.
+    """
+    map_fn, finish_fn = STEPS[source]
+    parts = min(workers, len(df) // max(min_rows, 1))
+    if parts < 2:
+        combined = map_fn(df)
+    else:
+        module = REFERENCES.get(source)
+        reference = module.crm_reference() if module else None
+        logger.info("[%s] normalizing %d rows in %d partitions", source, len(df), parts)
+        with ProcessPoolExecutor(
+            max_workers=parts,
+            mp_context=_mp_context(),
+            initializer=_init_worker,
+            initargs=(source, reference),
+        ) as pool:
+            results = list(pool.map(map_fn, partition(df, parts)))
+        # An all-filtered partition comes back as an untyped empty frame;
+        # leave it out so it cannot change the combined column dtypes
+        results = [r for r in results if len(r)] or results[:1]
+        combined = pd.concat(results) if len(results) > 1 else results[0]
+    return finish_fn(combined, uploaded) if finish_fn else combined
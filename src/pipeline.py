@@ -0,0 +1,550 @@
+"""
+The import pipeline: scrape each portal account, normalize the changed rows
+of its export, stage incomplete rows and queue complete ones for Zoho.
+main.py is the command line around it.
+"""
+
+import contextlib
+import datetime
+import importlib
+import logging
+import os
+import subprocess
+import tempfile
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import (
+    JOB_MAX_ATTEMPTS,
+    WATERMARK_INITIAL_DAYS,
+    WATERMARK_OVERLAP_DAYS,
+)
+from db.locks import source_locks
+from db.repository import (
+    JobRepo,
+    OutboxRepo,
+    RowFingerprintRepo,
+    SourceRunRepo,
+    WatermarkRepo,
+    WorklistStagingRepo,
+)
+from db.session import SessionLocal, engine
+from normalize.crl import normalize as norm_crl
+from normalize.crl import source_keys as crl_source_keys
+from normalize.escreen import normalize_escreen
+from normalize.escreen import source_keys as escreen_source_keys
+from normalize.fingerprint import (
+    changed_keys,
+    changed_mask,
+    combine_hashes,
+    key_hashes,
+)
+from normalize.i3screen import normalize_i3screen
+from normalize.i3screen import source_keys as i3_source_keys
+from normalize.ingest import raw_csv, read_raw, read_raw_chunks
+from normalize.parallel import normalize_partitioned
+from scrapers.accounts import env_account, load_accounts, portal_limits, scrape_all
+from scrapers.trace import StepTrace
+from services import debug_artifacts, snapshots
+from services.export import write_parquet
+from services.memory import MemoryBudgetExceeded, MemoryTracker
+from services.profiling import StageProfiler
+from services.outbox import advance_watermark, drain, queue_records
+from services.run_history import RunHistory
+from services.run_report import report
+from services.zoho import sync_collection_sites_to_crm
+from services.zoho_limits import limiter as zoho_limiter
+from services.zoho_payload import build_payload, load_lookup_maps, record_ids
+from utils import is_complete, to_staging_rows
+
+# --- Global Config & Helpers ---
+DOWNLOAD_ROOT = os.environ.get("DOWNLOAD_DIR", os.path.abspath("src/downloads"))
+os.makedirs(DOWNLOAD_ROOT, exist_ok=True)
+
+DOWNLOAD_PATHS = {
+    "crl": os.path.join(DOWNLOAD_ROOT, "crl_summary_report.csv"),
+    "i3": os.path.join(DOWNLOAD_ROOT, "i3screen_export.csv"),
+    "escreen": os.path.join(DOWNLOAD_ROOT, "DrugTestSummaryReport_Total.xlsx"),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def lazy(module, name):
+    """
+    `module.name`, imported on first call: the Playwright scrapers only load
+    when a scrape actually runs.
+    """
+
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+    call.__name__ = name
+    return call
+
+
+download_crl = lazy("scrapers.crl", "download_crl")
+download_i3 = lazy("scrapers.i3", "download_i3")
+
+
+def escreen_scraper(since=None, account=None):
+    account = account or env_account("escreen")
+    project_root = os.getenv("PROJECT_ROOT", os.getcwd())
+    escreen_js = os.path.join(project_root, "src", "scrapers", "escreen.js")
+    cwd = project_root
+
+    logger.debug("Running escreen.js at %s (cwd=%s)", escreen_js, cwd)
+    if not os.path.isfile(escreen_js):
+        raise FileNotFoundError(escreen_js)
+
+    env = dict(os.environ)
+    env["ESCREEN_USERNAME"] = account.username or ""
+    env["ESCREEN_PASSWORD"] = account.password or ""
+    if since is not None:
+        env["ESCREEN_START_DATE"] = since.strftime("%m/%d/%Y")
+
+    # escreen.js prints TRACE step lines and spools any debug dumps here; it
+    # downloads into a private dir so concurrent accounts never share a file
+    xlsx_name = os.path.basename(DOWNLOAD_PATHS["escreen"])
+    dest = account.download_path(DOWNLOAD_ROOT, xlsx_name)
+    spool_dir = tempfile.TemporaryDirectory()
+    downloads_dir = tempfile.TemporaryDirectory(dir=DOWNLOAD_ROOT)
+    with spool_dir as spool, downloads_dir as downloads:
+        env["ESCREEN_DEBUG_DIR"] = spool
+        env["ESCREEN_DOWNLOAD_DIR"] = downloads
+        result = subprocess.run(
+            ["node", escreen_js],
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        debug_artifacts.collect(account.key, spool)
+        if result.returncode == 0:
+            os.replace(os.path.join(downloads, xlsx_name), dest)
+    logger.debug("[%s] node stdout:\n%s", account.key, result.stdout)
+    logger.debug("[%s] node stderr:\n%s", account.key, result.stderr)
+    StepTrace(account.key).ingest(result.stdout)
+    result.check_returncode()
+    return dest
+
+
+SOURCES = [
+    ("crl", download_crl, norm_crl, "crl_summary_report.csv"),
+    ("i3", download_i3, normalize_i3screen, "i3screen_export.csv"),
+    ("escreen", escreen_scraper, normalize_escreen, "DrugTestSummaryReport_Total.xlsx"),
+]
+
+# Raw-row identifiers used for row-level change detection
+SOURCE_KEYS = {
+    "crl": crl_source_keys,
+    "i3": i3_source_keys,
+    "escreen": escreen_source_keys,
+}
+
+
+def scrape_since(watermark, override=None):
+    """Start of the scrape window: the watermark minus a safety overlap."""
+    if override is not None:
+        return override
+    if watermark is None:
+        return datetime.date.today() - datetime.timedelta(days=WATERMARK_INITIAL_DAYS)
+    return watermark - datetime.timedelta(days=WATERMARK_OVERLAP_DAYS)
+
+
+def should_skip(source, args):
+    if args.skip_scrape:
+        return True
+    return {
+        "crl": args.skip_crl_scrape,
+        "i3": args.skip_i3_scrape,
+        "escreen": args.skip_escreen_scrape,
+    }.get(source, False)
+
+
+def changed_batches(
+    source, key, raw_path, fingerprints, stage, force=False, chunk_size=None
+):
+    """
+    Yield (changed_df, keys, hashes, raw_rows) for the raw rows of a `source`
+    export (state kept under `key`) that need normalizing: the whole export
+    at once, or with chunk_size one chunk of at most chunk_size rows at a
+    time. Chunked exports are read twice: once
+    to hash every row key (hashes combine across chunks), then to hand over
+    the changed rows of each chunk, so only one chunk is held in memory.
+    """
+    key_fn = SOURCE_KEYS[source]
+    if not chunk_size:
+        with stage(key, "read"):
+            raw_df = read_raw(source, raw_path, DOWNLOAD_ROOT)
+        with stage(key, "detect"):
+            keys = key_fn(raw_df)
+            hashes = key_hashes(raw_df, keys)
+            if force:
+                changed_df = raw_df
+            else:
+                stored = fingerprints.load(key, hashes.index)
+                changed_df = raw_df[changed_mask(keys, hashes, stored)]
+        yield changed_df, keys, hashes, len(raw_df)
+        return
+
+    csv_path, header = raw_csv(source, raw_path, DOWNLOAD_ROOT)
+    with stage(key, "detect"):
+        parts = [
+            key_hashes(chunk, key_fn(chunk))
+            for chunk in read_raw_chunks(source, csv_path, header, chunk_size)
+        ]
+        hashes = combine_hashes(parts)
+        del parts
+        stored = {} if force else fingerprints.load(key, hashes.index)
+        changed = set(hashes.index) if force else changed_keys(hashes, stored)
+
+    chunks = read_raw_chunks(source, csv_path, header, chunk_size)
+    while True:
+        with stage(key, "read"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        keys = key_fn(chunk)
+        mask = changed_mask(keys, hashes, stored, changed)
+        yield chunk[mask], keys, hashes, len(chunk)
+
+
+def enqueue_sources(args, source_names):
+    """
+    Queue one scrape job per account of `source_names` for the workers
+    (worker.py), skipping accounts that still have one queued or running.
+    """
+    db = SessionLocal()
+    queue = JobRepo(db)
+    for account in load_accounts(db, source_names):
+        if should_skip(account.source, args):
+            continue
+        if queue.has_open("scrape", account.key):
+            logger.info(
+                "[%s] scrape job already queued; not adding another", account.key
+            )
+            continue
+        job = queue.enqueue(
+            "scrape",
+            {
+                "source": account.source,
+                "key": account.key,
+                "since": args.since.isoformat() if args.since else None,
+                "force": args.force,
+            },
+            JOB_MAX_ATTEMPTS,
+        )
+        logger.info("[%s] queued scrape job %d", account.key, job.id)
+    db.close()
+
+
+def run_pipeline(args, source_names):
+    """
+    Run the pipeline once for `source_names`. Each source is advisory-locked
+    for the run; sources another instance is still running are skipped.
+    The run and its stage timings are recorded in the run history.
+    """
+    with source_locks(engine, source_names) as locked:
+        if locked:
+            history = RunHistory(api_calls=lambda: zoho_limiter.calls)
+            try:
+                total_new = process_sources(args, locked, history)
+            except Exception:
+                record_run(args, history, "failed", locked)
+                raise
+            record_run(args, history, "success", locked, total_new)
+
+
+def record_run(args, history, status, source_names, rows=0):
+    """Save a run to the history; never fails the run itself."""
+    if args.dry_run:
+        return
+    db = SessionLocal()
+    try:
+        history.save(db, status, source_names, rows, zoho_limiter.spent)
+    except Exception:
+        db.rollback()
+        logger.exception("Could not record the run history")
+    finally:
+        db.close()
+
+
+def process_sources(args, source_names, history):
+    """Run every stage for `source_names`; returns the rows staged or queued."""
+    dry_run = args.dry_run
+
+    profiler = StageProfiler(args.profile, args.profile_top)
+    memory = MemoryTracker(
+        args.memory_budget, args.memory_strict, args.trace_allocations
+    )
+
+    @contextlib.contextmanager
+    def stage(source, name, profile=True):
+        """
+        Profile (with --profile) and account memory for one source stage.
+        Stages whose work runs in other threads pass profile=False: cProfile
+        only sees the thread that enabled it, so it would profile the wait.
+        """
+        profiled = profiler.stage(source, name) if profile else contextlib.nullcontext()
+        try:
+            with profiled, memory.stage(source, name):
+                with history.stage(source, name):
+                    yield
+        except MemoryBudgetExceeded:
+            # Strict budget: record the source run as failed, then stop
+            if run is not None:
+                runs.finish(run, "failed")
+            raise
+
+    db = SessionLocal()
+    repo = WorklistStagingRepo(db)
+    runs = SourceRunRepo(db)
+    fingerprints = RowFingerprintRepo(db)
+    watermarks = WatermarkRepo(db)
+    outbox = OutboxRepo(db)
+    now = datetime.datetime.utcnow()
+    total_new = 0
+    run = None  # source run stage() marks failed on a strict memory budget
+    zoho_limiter.start_run()
+
+    # Fetch already uploaded, staged and queued CCFIDs
+    existing_uploaded = {
+        row[0] for row in db.execute(text("SELECT ccfid FROM uploaded_ccfid"))
+    }
+    existing_ccfids = repo.ccfids()
+    queued_ccfids = outbox.unsent_ccfids()
+
+    # 4) Scrape every portal account concurrently
+    sources = {
+        name: (scrape_fn, norm_fn, default_file)
+        for name, scrape_fn, norm_fn, default_file in SOURCES
+        if name in source_names
+    }
+    accounts = load_accounts(db, sources)
+    windows = {}
+    for account in accounts:
+        windows[account.key] = scrape_since(watermarks.get(account.key), args.since)
+        logger.info("[%s] scrape window starts %s", account.key, windows[account.key])
+
+    to_scrape = [
+        account for account in accounts if not should_skip(account.source, args)
+    ]
+    scraped = {}
+    if to_scrape:
+        logger.info(
+            "Scraping %d portal accounts (up to %d at once)...",
+            len(to_scrape),
+            args.scrape_workers,
+        )
+
+        def scrape(account):
+            with history.stage(account.key, "scrape"):
+                return sources[account.source][0](windows[account.key], account)
+
+        # Scrapes run in scrape_all's thread pool: timed per account, not profiled
+        with stage("portals", "scrape", profile=False):
+            scraped = scrape_all(
+                to_scrape,
+                scrape,
+                args.scrape_workers,
+                portal_limits(args.portal_limits),
+            )
+
+    # 5) Process each account's export through the shared ledger
+    lookup_maps = None
+    reached = {}
+    for account in accounts:
+        source_name, key = account.source, account.key
+        _, norm_fn, default_file = sources[source_name]
+        logger.info("=== Running %s pipeline ===", key)
+        run = None
+
+        if key in scraped:
+            raw_path, error = scraped[key]
+            if error is not None:
+                report.record(key, scrape_error=str(error))
+                continue
+        else:
+            raw_path = account.download_path(DOWNLOAD_ROOT, default_file)
+        if not os.path.exists(raw_path):
+            logger.error("[%s] export not found at %s! Skipping", key, raw_path)
+            continue
+
+        # Archive the raw export; skip it entirely if unchanged since last success
+        with stage(key, "archive"):
+            snapshot = snapshots.archive(key, raw_path)
+        if not args.force and snapshot.sha256 == runs.last_success_hash(key):
+            logger.info(
+                "[%s] export unchanged since last successful run (%s), skipping",
+                key,
+                snapshot.sha256[:12],
+            )
+            continue
+        run = None if dry_run else runs.start(key, snapshot.sha256, snapshot.path)
+
+        batches = changed_batches(
+            source_name,
+            key,
+            raw_path,
+            fingerprints,
+            stage,
+            force=args.force,
+            chunk_size=args.chunk_size,
+        )
+
+        seen_ccfids = set()
+        max_date = None
+        for changed_df, keys, hashes, raw_rows in batches:
+            logger.info(
+                "%s: %d of %d raw rows new or changed", key, len(changed_df), raw_rows
+            )
+            history.count(key, "read", rows=raw_rows)
+            if changed_df.empty:
+                continue
+            with stage(key, "normalize"):
+                if args.normalize_workers > 1 or args.chunk_size:
+                    # Filter against the ledger read at the start of the run,
+                    # not a fresh uploaded_ccfid query per chunk
+                    clean_df = normalize_partitioned(
+                        source_name,
+                        changed_df,
+                        args.normalize_workers,
+                        uploaded=existing_uploaded,
+                    )
+                else:
+                    clean_df = norm_fn(changed_df)
+                if args.chunk_size:
+                    # Keep the first row per CCFID across chunks, as a whole-file
+                    # normalize would within its batch
+                    clean_df = clean_df[~clean_df["CCFID"].isin(seen_ccfids)]
+                    seen_ccfids.update(clean_df["CCFID"])
+            logger.info(
+                "%s: fetched %d raw rows, normalized to %d rows",
+                key,
+                raw_rows,
+                len(clean_df),
+            )
+            history.count(
+                key,
+                "normalize",
+                rows=len(clean_df),
+                rejected=len(changed_df) - len(clean_df),
+            )
+            if args.export_parquet:
+                with stage(key, "export"):
+                    write_parquet(clean_df, source_name, args.export_parquet)
+
+            # Prepare lookup ids (company and lab maps once per run)
+            with stage(key, "lookups"):
+                site_cols = ["Collection_Site", "Collection_Site_ID"]
+                if all(col in clean_df.columns for col in site_cols):
+                    site_df = clean_df[site_cols].drop_duplicates()
+                    site_id_to_recordid = sync_collection_sites_to_crm(site_df)
+                else:
+                    site_id_to_recordid = {}
+                if lookup_maps is None:
+                    lookup_maps = load_lookup_maps(db, sites=site_id_to_recordid)
+                else:
+                    lookup_maps = lookup_maps._replace(
+                        sites=record_ids(site_id_to_recordid)
+                    )
+
+            # Deduplication and filtering
+            with stage(key, "stage"):
+                pending_df = clean_df[
+                    ~clean_df["CCFID"].isin(existing_uploaded)
+                    & ~clean_df["CCFID"].isin(queued_ccfids)
+                ]
+                all_recs = pending_df.to_dict(orient="records")
+                flags = [is_complete(rec) for rec in all_recs]
+                # Complete rows stay a frame for the vectorized Zoho payload
+                complete_df = pending_df[
+                    pd.Series(flags, index=pending_df.index, dtype=bool)
+                ]
+                staging = [rec for rec, ok in zip(all_recs, flags) if not ok]
+                staging_new = [
+                    rec for rec in staging if rec.get("CCFID") not in existing_ccfids
+                ]
+
+                logger.info(
+                    "%s: %d complete (new), %d incomplete (new)",
+                    key,
+                    len(complete_df),
+                    len(staging_new),
+                )
+
+                # Stage incomplete
+                mapped = to_staging_rows(staging_new, now)
+
+                logger.info("%s: %d new records to stage", key, len(mapped))
+                if dry_run:
+                    logger.info(
+                        "[%s] [dry-run] Would queue %d rows for Zoho",
+                        key,
+                        len(complete_df),
+                    )
+                else:
+                    # Staging rows, Zoho payloads for the complete rows and the
+                    # fingerprints of everything not waiting on Zoho commit
+                    # together; the pusher fingerprints queued rows once accepted
+                    payload = build_payload(complete_df, lookup_maps)
+                    seen = hashes[hashes.index.isin(keys[changed_df.index])]
+                    repo.add_many(mapped, commit=False)
+                    queue_records(db, key, payload, seen)
+                    fingerprints.save(
+                        key,
+                        seen.drop(complete_df["CCFID"], errors="ignore").to_dict(),
+                        commit=False,
+                    )
+                    db.commit()
+                    existing_ccfids.update(row["ccfid"] for row in mapped)
+                    queued_ccfids.update(complete_df["CCFID"])
+                    total_new += len(mapped) + len(payload)
+                    history.count(key, "stage", rows=len(mapped) + len(payload))
+                    logger.info(
+                        "%s: staged %d records, queued %d for Zoho",
+                        key,
+                        len(mapped),
+                        len(payload),
+                    )
+                del pending_df, all_recs, flags, staging, mapped
+
+            # Track how far the watermark may advance once the queued rows
+            # are pushed: every row is now staged, queued or already uploaded
+            dates = pd.to_datetime(clean_df["Collection_Date"], errors="coerce")
+            if dates.notna().any():
+                max_date = (
+                    dates.max() if max_date is None else max(max_date, dates.max())
+                )
+
+        if run is not None:
+            if max_date is not None:
+                reached[key] = max_date.date()
+            runs.finish(run, "success")
+
+    # 6) Push the queued records, unless a separate pusher drains the outbox
+    run = None
+    if not dry_run and not args.no_drain:
+        if args.requeue_dead:
+            logger.info("Requeued %d dead-lettered Zoho records", outbox.requeue_dead())
+        with stage("zoho", "push"):
+            pushed = drain(db)
+        history.count("zoho", "push", rows=pushed.accepted, rejected=pushed.rejected)
+
+    # 7) Advance the watermarks, but not past rows Zoho has yet to accept
+    for key, date in reached.items():
+        advance_watermark(db, key, date)
+
+    snapshots.prune()
+    report.log_summary()
+    report.clear()
+    zoho_limiter.log_summary()
+    profiler.log_summary()
+    memory.log_summary()
+
+    logger.info("Done; total processed: %d records (dry-run=%s)", total_new, dry_run)
+    db.close()
+    return total_new
@@ -0,0 +1,160 @@
+"""
+Portal accounts and concurrent scraping across them.
+
+Accounts come from the source_accounts table. A source with no enabled
+rows falls back to the single account configured in the environment
+(CRL_USER/CRL_PASS, I3_USER/I3_PASS, ESCREEN_USERNAME/ESCREEN_PASSWORD).
+
+Every account has a state key under which its watermark, runs, row
+fingerprints, snapshots, saved browser session and report entries are kept:
+the bare source name for the environment account, so state from single-
+account runs carries over, and "<source>@<account>" for the others.
+
+scrape_all() runs one scrape per account on a thread pool per portal
+(sized by its limit), with a shared cap on scrapes in flight.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import (
+    CRL_EXPORT_URL,
+    CRL_PASS,
+    CRL_USER,
+    ESCREEN_PASSWORD,
+    ESCREEN_USERNAME,
+    I3_EXPORT_URL,
+    I3_PASS,
+    I3_USER,
+)
+from db.repository import SourceAccountRepo
+
+logger = logging.getLogger(__name__)
+
+# Label of the account configured through the environment
+ENV_ACCOUNT = "default"
+
+
+class PortalAccount(NamedTuple):
+    source: str
+    account: str
+    username: Optional[str]
+    password: Optional[str]
+    portal_url: Optional[str] = None
+    export_url: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Key for this account's pipeline state and report entries."""
+        if self.account == ENV_ACCOUNT:
+            return self.source
+        return f"{self.source}@{self.account}"
+
+    def download_path(self, directory: str, filename: str) -> str:
+        """Per-account location for a portal export named `filename`."""
+        if self.account == ENV_ACCOUNT:
+            return os.path.join(directory, filename)
+        base, ext = os.path.splitext(filename)
+        return os.path.join(directory, f"{base}.{self.account}{ext}")
+
+    def __repr__(self) -> str:
+        return f"PortalAccount({self.key!r}, username={self.username!r})"
+
+
+def env_account(source: str) -> PortalAccount:
+    """The single account configured through the environment for `source`."""
+    username, password, export_url = {
+        "crl": (CRL_USER, CRL_PASS, CRL_EXPORT_URL),
+        "i3": (I3_USER, I3_PASS, I3_EXPORT_URL),
+        "escreen": (ESCREEN_USERNAME, ESCREEN_PASSWORD, None),
+    }[source]
+    return PortalAccount(source, ENV_ACCOUNT, username, password, None, export_url)
+
+
+def load_accounts(db: Session, sources: Iterable[str]) -> List[PortalAccount]:
+    """
+    Enabled accounts for `sources`, in that order, falling back to the
+    environment account for a source that has none. Accounts whose
+    password variable is unset are skipped.
+    """
+    configured: Dict[str, List[PortalAccount]] = {}
+    for row in SourceAccountRepo(db).enabled():
+        password = os.getenv(row.password_env) if row.password_env else None
+        if row.password_env and password is None:
+            logger.error(
+                "[%s@%s] %s is not set; skipping account",
+                row.source,
+                row.account,
+                row.password_env,
+            )
+            continue
+        configured.setdefault(row.source, []).append(
+            PortalAccount(
+                row.source,
+                row.account,
+                row.username,
+                password,
+                row.portal_url,
+                row.export_url,
+            )
+        )
+
+    accounts = []
+    for source in sources:
+        accounts.extend(configured.pop(source, None) or [env_account(source)])
+    for source in configured:
+        logger.warning("Ignoring source_accounts rows for unknown source %r", source)
+    return accounts
+
+
+def portal_limits(spec: str) -> Dict[str, int]:
+    """Parse "crl=2,i3=1" into {"crl": 2, "i3": 1}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        source, _, limit = item.partition("=")
+        limits[source.strip()] = max(int(limit), 1)
+    return limits
+
+
+def scrape_all(
+    accounts: List[PortalAccount],
+    scrape: Callable[[PortalAccount], str],
+    workers: int,
+    limits: Dict[str, int],
+) -> Dict[str, Tuple[Optional[str], Optional[Exception]]]:
+    """
+    Run scrape(account) for every account: at most limits[source] (default 1)
+    at once per portal and `workers` overall. Returns {key: (result, error)};
+    one account failing does not stop the others.
+    """
+    slots = threading.BoundedSemaphore(max(workers, 1))
+
+    def run(account: PortalAccount):
+        with slots:
+            return scrape(account)
+
+    pools, futures = {}, {}
+    try:
+        for account in accounts:
+            if account.source not in pools:
+                pools[account.source] = ThreadPoolExecutor(
+                    max_workers=limits.get(account.source, 1),
+                    thread_name_prefix=f"scrape-{account.source}",
+                )
+            futures[account.key] = pools[account.source].submit(run, account)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+
+    results = {}
+    for key, future in futures.items():
+        error = future.exception()
+        if error is not None:
+            logger.error("[%s] scrape failed: %s", key, error, exc_info=error)
+        results[key] = (None if error else future.result(), error)
+    return results
@@ -0,0 +1,93 @@
+"""
+Browser provisioning for the scrapers.
+
+The CRL and i3 scrapers drive Playwright's Chromium and escreen.js drives
+Puppeteer's Chrome. install_browsers() only shells out to the installers
+when the build the installed package expects is missing from its cache, so
+a warm start pays a few stat() calls instead of two installer runs.
+"""
+
+import glob
+import importlib.util
+import json
+import logging
+import os
+import re
+import subprocess
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PUPPETEER_REVISIONS = os.path.join(
+    "node_modules", "puppeteer-core", "lib", "cjs", "puppeteer", "revisions.js"
+)
+
+
+def _playwright_chromium_dir() -> Optional[str]:
+    """Where Playwright keeps the Chromium build it expects (None if unknown)."""
+    spec = importlib.util.find_spec("playwright")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    package = os.path.join(spec.submodule_search_locations[0], "driver", "package")
+    try:
+        with open(os.path.join(package, "browsers.json")) as f:
+            browsers = json.load(f)["browsers"]
+    except (OSError, KeyError, ValueError):
+        return None
+    revision = next((b["revision"] for b in browsers if b["name"] == "chromium"), None)
+    if revision is None:
+        return None
+
+    root = os.getenv("PLAYWRIGHT_BROWSERS_PATH")
+    if root == "0":
+        root = os.path.join(package, ".local-browsers")
+    elif not root:
+        root = os.path.join(os.path.expanduser("~"), ".cache", "ms-playwright")
+    return os.path.join(root, f"chromium-{revision}")
+
+
+def playwright_chromium_installed() -> bool:
+    path = _playwright_chromium_dir()
+    return path is not None and os.path.isdir(path)
+
+
+def puppeteer_chrome_installed(project_root: str) -> bool:
+    """Whether Puppeteer's Chrome (or PUPPETEER_EXECUTABLE_PATH) is there."""
+    executable = os.getenv("PUPPETEER_EXECUTABLE_PATH")
+    if executable:
+        return os.path.isfile(executable)
+    try:
+        with open(os.path.join(project_root, PUPPETEER_REVISIONS)) as f:
+            match = re.search(r"chrome:\s*['\"]([\d.]+)['\"]", f.read())
+    except OSError:
+        return False
+    if match is None:
+        return False
+    cache = os.getenv("PUPPETEER_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "puppeteer"
+    )
+    return bool(glob.glob(os.path.join(cache, "chrome", f"*-{match.group(1)}")))
+
+
+def install_browsers() -> None:
+    """Install Playwright's Chromium and Puppeteer's Chrome if missing."""
+    if playwright_chromium_installed():
+        logger.debug("Playwright Chromium already installed")
+    else:
+        try:
+            subprocess.run(["playwright", "install", "chromium"], check=True)
+        except Exception as e:
+            logger.error("Playwright install failed: %s", e)
+
+    project_root = os.getenv("PROJECT_ROOT", os.getcwd())
+    if puppeteer_chrome_installed(project_root):
+        logger.debug("Puppeteer Chrome already installed")
+    else:
+        try:
+            subprocess.run(
+                ["npx", "puppeteer", "browsers", "install", "chrome"],
+                check=True,
+                cwd=project_root,
+            )
+        except Exception as e:
+            logger.error("Puppeteer install failed: %s", e)
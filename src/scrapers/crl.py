@@ -1,10 +1,16 @@
 import logging
 import os
+from datetime import date
+from typing import Optional
 
 import pandas as pd
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import Page, sync_playwright
 
-from config import CRL_PASS, CRL_USER
+from normalize.ingest import read_raw
+from scrapers.accounts import PortalAccount, env_account
+from scrapers.export_client import try_direct_export
+from scrapers.session import authenticate, new_context
+from scrapers.trace import StepTrace
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -14,76 +20,178 @@ DOWNLOAD_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "downloads")
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 CRL_CSV_PATH = os.path.join(DOWNLOAD_DIR, "crl_summary_report.csv")
 
+CRL_PORTAL_URL = (
+    "https://fortiersubstabusetstng.workforce.crlcorp.com/clinicportal/ng/#/"
+)
 
-def scrape_crl() -> pd.DataFrame:
-    """
-    Log in to the CRL portal, download the summary CSV, and return it as a pandas DataFrame.
-    """
-    logger.info("Starting CRL scrape...")
+# Summary Report custom date-range option and its inputs
+CRL_CUSTOM_RANGE = "Custom Range"
+CRL_START_INPUT = "#start-date"
+CRL_END_INPUT = "#end-date"
 
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=True)
-        context = browser.new_context(accept_downloads=True)
-        page = context.new_page()
-
-        # Navigate to login page
-        logger.info("Navigating to CRL login page...")
-        page.goto(
-            "https://fortiersubstabusetstng.workforce.crlcorp.com/clinicportal/ng/#/"
-        )
-
-        # Perform login
-        logger.info("Filling in credentials for %s", CRL_USER)
-        page.locator("#formBasicEmail").fill(CRL_USER)
-        page.locator("#formBasicPassword").fill(CRL_PASS)
-
-        # Debug buttons
-        buttons = page.locator("button").all_inner_texts()
-        logger.info("Login page buttons: %s", buttons)
-
-        # Now click the actual login button
-        page.get_by_role("button", name="Log In", exact=True).click()
-
-        # Wait for dashboard to load
-        logger.info("Waiting for dashboard to load...")
-        page.wait_for_url("**/clinicportal/ng/#/orders", timeout=30000)
-
-        # Navigate to Orders
-        logger.info("Navigating to Orders page...")
-        page.goto(
-            "https://fortiersubstabusetstng.workforce.crlcorp.com/clinicportal/ng/#/orders"
-        )
-
-        # Open the Reports menu
-        logger.info("Clicking 'Reports'...")
-        page.get_by_role("button", name="Reports").click()
-        page.wait_for_load_state("networkidle")
-
-        # Select Summary Report
-        logger.info("Clicking 'Summary Report'...")
-        page.get_by_role("link", name="Summary Report", exact=True).click()
-        page.wait_for_load_state("networkidle")
-
-        # Apply filters
-        logger.info("Selecting Event Date and Current Month filters...")
-        page.locator("#date-type").select_option("Event Date")
-        page.locator("#date-range").select_option("Current Month")
 
-        # Trigger CSV download
-        logger.info("Exporting CSV and waiting for download…")
-        with page.expect_download() as dl_info:
-            page.get_by_role("button", name="Export CSV").click()
-        download = dl_info.value
+def _portal_url(account: PortalAccount) -> str:
+    # Each clinic tenant has its own portal host
+    return account.portal_url or CRL_PORTAL_URL
+
+
+def _orders_url(account: PortalAccount) -> str:
+    return _portal_url(account) + "orders"
+
+
+def _login(page: Page, account: PortalAccount) -> None:
+    # Navigate to login page
+    logger.info("Navigating to CRL login page...")
+    page.goto(_portal_url(account))
+
+    # Perform login
+    logger.info("Filling in credentials for %s", account.username)
+    page.locator("#formBasicEmail").fill(account.username)
+    page.locator("#formBasicPassword").fill(account.password)
+
+    # Debug buttons
+    buttons = page.locator("button").all_inner_texts()
+    logger.info("Login page buttons: %s", buttons)
 
-        # **Save to the full-file path**, not the directory
-        download.save_as(CRL_CSV_PATH)
-        logger.info("Download complete: %s", CRL_CSV_PATH)
+    # Now click the actual login button
+    page.get_by_role("button", name="Log In", exact=True).click()
 
-        context.close()
-        browser.close()
+    # Wait for dashboard to load
+    logger.info("Waiting for dashboard to load...")
+    page.wait_for_url("**/clinicportal/ng/#/orders", timeout=30000)
 
-    logger.info("Loading CSV into DataFrame…")
-    df = pd.read_csv(CRL_CSV_PATH)
+
+def _is_logged_in(page: Page, account: PortalAccount) -> bool:
+    """True if Orders opens with the saved session instead of the login form."""
+    page.goto(_orders_url(account))
+    reports = page.get_by_role("button", name="Reports")
+    reports.or_(page.locator("#formBasicEmail")).first.wait_for(timeout=30000)
+    return reports.is_visible()
+
+
+def _apply_date_window(page: Page, since: Optional[date]) -> None:
+    """
+    Filter by Event Date from `since` to today via the portal's custom range,
+    or fall back to its "Current Month" preset when no window is given or
+    the custom range is unavailable.
+    """
+    page.locator("#date-type").select_option("Event Date")
+    options = page.locator("#date-range option").all_inner_texts()
+    if since is None or CRL_CUSTOM_RANGE not in options:
+        if since is not None and since < date.today().replace(day=1):
+            logger.warning(
+                "No custom date range on the CRL report; window from %s "
+                "narrowed to the current month",
+                since,
+            )
+        logger.info("Selecting Event Date and Current Month filters...")
+        page.locator("#date-range").select_option("Current Month")
+        return
+
+    logger.info("Selecting Event Date from %s to today...", since)
+    page.locator("#date-range").select_option(CRL_CUSTOM_RANGE)
+    page.locator(CRL_START_INPUT).fill(since.strftime("%m/%d/%Y"))
+    page.locator(CRL_END_INPUT).fill(date.today().strftime("%m/%d/%Y"))
+
+
+def _export_params(since: Optional[date]) -> dict:
+    """Query parameters for the Summary Report export endpoint."""
+    end = date.today()
+    start = since or end.replace(day=1)
+    return {
+        "dateType": "EventDate",
+        "startDate": start.isoformat(),
+        "endDate": end.isoformat(),
+        "format": "csv",
+    }
+
+
+def _click_through_export(
+    page: Page, account: PortalAccount, since: Optional[date], dest: str
+) -> None:
+    """Fallback: drive the Reports UI to the Summary Report and export it."""
+    # Navigate to Orders
+    logger.info("Navigating to Orders page...")
+    page.goto(_orders_url(account))
+
+    # Open the Reports menu
+    logger.info("Clicking 'Reports'...")
+    page.get_by_role("button", name="Reports").click()
+    page.wait_for_load_state("networkidle")
+
+    # Select Summary Report
+    logger.info("Clicking 'Summary Report'...")
+    page.get_by_role("link", name="Summary Report", exact=True).click()
+    page.wait_for_load_state("networkidle")
+
+    # Apply filters
+    _apply_date_window(page, since)
+
+    # Trigger CSV download
+    logger.info("Exporting CSV and waiting for download…")
+    with page.expect_download() as dl_info:
+        page.get_by_role("button", name="Export CSV").click()
+    download = dl_info.value
+
+    # **Save to the full-file path**, not the directory
+    download.save_as(dest)
+    logger.info("Download complete: %s", dest)
+
+
+def download_crl(
+    since: Optional[date] = None, account: Optional[PortalAccount] = None
+) -> str:
+    """
+    Log in to the CRL portal as `account` (default: the environment account,
+    reusing a saved session when possible), download the summary CSV for
+    Event Dates from `since` (default: current month), and return its path.
+    """
+    account = account or env_account("crl")
+    dest = account.download_path(DOWNLOAD_DIR, os.path.basename(CRL_CSV_PATH))
+    logger.info("Starting CRL scrape for %s...", account.key)
+
+    trace = StepTrace(account.key)
+    with sync_playwright() as pw:
+        with trace.step("launch"):
+            browser = pw.chromium.launch(headless=True)
+            context, saved = new_context(browser, account.key)
+            page = context.new_page()
+            trace.page = page
+
+        try:
+            with trace.step("login"):
+                authenticate(
+                    account.key,
+                    context,
+                    page,
+                    saved,
+                    lambda p: _is_logged_in(p, account),
+                    lambda p: _login(p, account),
+                )
+
+            with trace.step("export"):
+                params = _export_params(since)
+                if not try_direct_export(
+                    account.key, page, account.export_url, params, dest
+                ):
+                    _click_through_export(page, account, since, dest)
+            trace.snapshot("export")
+        finally:
+            context.close()
+            browser.close()
+
+    logger.info("[%s] scrape took %.1fs", account.key, trace.total_seconds)
+    return dest
+
+
+def scrape_crl(
+    since: Optional[date] = None, account: Optional[PortalAccount] = None
+) -> pd.DataFrame:
+    """download_crl(), then load the CSV as a pandas DataFrame."""
+    account = account or env_account("crl")
+    path = download_crl(since, account)
+    with StepTrace(account.key).step("load"):
+        df = read_raw("crl", path, DOWNLOAD_DIR)
     logger.info("CRL DataFrame contains %d rows", len(df))
     return df
 
@@ -9,14 +9,35 @@ puppeteer.use(StealthPlugin());
 
 // ensure download and debug dirs exist
 const BASE_DIR     = path.resolve(__dirname, '..');
-const DOWNLOAD_DIR = path.join(BASE_DIR, 'downloads');
-const DEBUG_DIR    = path.join(BASE_DIR, 'debug');
+// main.py gives each account its own download dir when scraping concurrently
+const DOWNLOAD_DIR = process.env.ESCREEN_DOWNLOAD_DIR || path.join(BASE_DIR, 'downloads');
+// Debug artifacts go to a spool dir that main.py compresses into the
+// bounded store; they are written only on failure unless DEBUG_ARTIFACTS is set.
+const DEBUG_DIR    = process.env.ESCREEN_DEBUG_DIR || path.join(BASE_DIR, 'debug');
+const DEBUG_ALWAYS = /^(1|true|yes)$/i.test(process.env.DEBUG_ARTIFACTS || '');
 for (const d of [DOWNLOAD_DIR, DEBUG_DIR]) {
   if (!fs.existsSync(d)) fs.mkdirSync(d, { recursive: true });
 }
 
 const sleep = ms => new Promise(res => setTimeout(res, ms));
 
+/**
+ * Run one scraper step, printing a machine-readable TRACE line (parsed by
+ * scrapers/trace.py) with its duration whether it succeeds or fails.
+ */
+async function step(name, fn) {
+  const start = Date.now();
+  let ok = false;
+  try {
+    const result = await fn();
+    ok = true;
+    return result;
+  } finally {
+    const seconds = (Date.now() - start) / 1000;
+    console.log('TRACE ' + JSON.stringify({ step: name, seconds, ok }));
+  }
+}
+
 /**
  * Dismiss the TrustArc banner if it appears on the given page.
  */
@@ -64,154 +85,175 @@ async function dismissTrustArc(page, timeout = 10000) {
         args: ['--start-maximized']
       };
 
+  // declared outside try so the error handler can dump the page
+  let browser, page;
   try {
-    console.log('🌐 Launching browser…', launchOpts);
-    const browser = await puppeteer.launch(launchOpts);
-    console.log('✅ Browser launched');
-
-    const page = await browser.newPage();
-    console.log('✅ New page opened');
-
-    // Debug logging
-    page.on('console', msg   => console.log(`PAGE LOG ▶ [${msg.type()}]`, msg.text()));
-    page.on('pageerror', err => console.error('PAGE ERROR ▶', err));
-    page.on('requestfailed', req => console.warn('PAGE REQ FAIL ▶', req.url(), req.failure()));
-    page.on('response', res => console.log(`PAGE RESP ${res.status()} ◀`, res.url()));
-
-    // set up downloads
-    console.log('⬇️  Configuring download behavior →', DOWNLOAD_DIR);
-    const cdp = await page.target().createCDPSession();
-    await cdp.send('Page.setDownloadBehavior', {
-      behavior: 'allow',
-      downloadPath: DOWNLOAD_DIR
+    await step('launch', async () => {
+      console.log('🌐 Launching browser…', launchOpts);
+      browser = await puppeteer.launch(launchOpts);
+      console.log('✅ Browser launched');
+
+      page = await browser.newPage();
+      console.log('✅ New page opened');
+
+      // Debug logging
+      page.on('console', msg   => console.log(`PAGE LOG ▶ [${msg.type()}]`, msg.text()));
+      page.on('pageerror', err => console.error('PAGE ERROR ▶', err));
+      page.on('requestfailed', req => console.warn('PAGE REQ FAIL ▶', req.url(), req.failure()));
+      page.on('response', res => console.log(`PAGE RESP ${res.status()} ◀`, res.url()));
+
+      // set up downloads
+      console.log('⬇️  Configuring download behavior →', DOWNLOAD_DIR);
+      const cdp = await page.target().createCDPSession();
+      await cdp.send('Page.setDownloadBehavior', {
+        behavior: 'allow',
+        downloadPath: DOWNLOAD_DIR
+      });
+      console.log('✅ Download behavior set');
     });
-    console.log('✅ Download behavior set');
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
     //   STEP 0: Navigate to landing page & dismiss TrustArc
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('🌐 Going to landing page…');
-    await page.goto('https://www.myescreen.com/', {
-      waitUntil: 'networkidle2',
-      timeout: 60000
+    await step('landing', async () => {
+      console.log('🌐 Going to landing page…');
+      await page.goto('https://www.myescreen.com/', {
+        waitUntil: 'networkidle2',
+        timeout: 60000
+      });
+      await dismissTrustArc(page);
     });
-    await dismissTrustArc(page);
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
     //   STEP 1: Login
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('🚪 Waiting for sign-in field…');
-    await page.waitForSelector('input#signInName', { timeout: 30000 });
-    await page.type('input#signInName', process.env.ESCREEN_USERNAME);
-    await page.keyboard.press('Enter');
-
-    console.log('🔐 Waiting for password field…');
-    await page.waitForSelector('input[type="password"]', { timeout: 30000 });
-    await page.type('input[type="password"]', process.env.ESCREEN_PASSWORD);
-    await page.keyboard.press('Enter');
-    await page.waitForNavigation({ waitUntil: 'networkidle2', timeout: 60000 });
-    console.log('✅ Logged in');
+    await step('login', async () => {
+      console.log('🚪 Waiting for sign-in field…');
+      await page.waitForSelector('input#signInName', { timeout: 30000 });
+      await page.type('input#signInName', process.env.ESCREEN_USERNAME);
+      await page.keyboard.press('Enter');
+
+      console.log('🔐 Waiting for password field…');
+      await page.waitForSelector('input[type="password"]', { timeout: 30000 });
+      await page.type('input[type="password"]', process.env.ESCREEN_PASSWORD);
+      await page.keyboard.press('Enter');
+      await page.waitForNavigation({ waitUntil: 'networkidle2', timeout: 60000 });
+      console.log('✅ Logged in');
+    });
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
     //   STEP 2: Open Reports menu (then dismiss banner again just in case)
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('🔎 opening Reports menu');
-    await page.waitForSelector('div.mainNavLink', { timeout: 30000 });
-    await page.evaluate(() => {
-      for (let el of document.querySelectorAll('div.mainNavLink'))
-        if (el.innerText.trim() === 'Reports') el.click();
+    await step('reports_menu', async () => {
+      console.log('🔎 opening Reports menu');
+      await page.waitForSelector('div.mainNavLink', { timeout: 30000 });
+      await page.evaluate(() => {
+        for (let el of document.querySelectorAll('div.mainNavLink'))
+          if (el.innerText.trim() === 'Reports') el.click();
+      });
+      await sleep(3000);
+      await dismissTrustArc(page);
     });
-    await sleep(3000);
-    await dismissTrustArc(page);
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
     //   STEP 3: Select Drug Test Summary Report
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('🔎 selecting Summary Report');
-    await page.waitForSelector('a[target="mainFrame"]', { timeout: 30000 });
-    await page.evaluate(() => {
-      const link = Array.from(document.querySelectorAll('a[target="mainFrame"]'))
-        .find(a => a.innerText.includes('Drug Test Summary Report'));
-      link.click();
+    await step('summary_report', async () => {
+      console.log('🔎 selecting Summary Report');
+      await page.waitForSelector('a[target="mainFrame"]', { timeout: 30000 });
+      await page.evaluate(() => {
+        const link = Array.from(document.querySelectorAll('a[target="mainFrame"]'))
+          .find(a => a.innerText.includes('Drug Test Summary Report'));
+        link.click();
+      });
+      await sleep(5000);
+      await dismissTrustArc(page);
     });
-    await sleep(5000);
-    await dismissTrustArc(page);
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
-    //   STEP 4: Click “View All” inside the iframe
+    //   STEP 4: Click “View All” inside the iframe, then re-acquire the frame
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('🔎 clicking View All in report iframe');
-    let container = await page.waitForSelector('iframe[name="mainFrame"]', { timeout: 30000 });
-    let frame = await container.contentFrame();
-    await frame.waitForSelector('input#btnViewAll', { timeout: 30000 });
-    await frame.click('input#btnViewAll');
-    await sleep(5000);
+    const frame = await step('view_all', async () => {
+      console.log('🔎 clicking View All in report iframe');
+      let container = await page.waitForSelector('iframe[name="mainFrame"]', { timeout: 30000 });
+      let frame = await container.contentFrame();
+      await frame.waitForSelector('input#btnViewAll', { timeout: 30000 });
+      await frame.click('input#btnViewAll');
+      await sleep(5000);
 
-    //
-    // ──────────────────────────────────────────────────────────────────────────────
-    //   STEP 4.5: Re-acquire the frame & debug-dump
-    // ──────────────────────────────────────────────────────────────────────────────
-    //
-    console.log('🔄 re-acquiring mainFrame');
-    container = await page.waitForSelector('iframe[name="mainFrame"]', { timeout: 30000 });
-    frame = await container.contentFrame();
+      console.log('🔄 re-acquiring mainFrame');
+      container = await page.waitForSelector('iframe[name="mainFrame"]', { timeout: 30000 });
+      frame = await container.contentFrame();
 
-    const ts = Date.now();
-    const html = await frame.content();
-    fs.writeFileSync(path.join(DEBUG_DIR, `frame-${ts}.html`), html);
-    console.log(`🐛 [DEBUG] Wrote HTML → debug/frame-${ts}.html`);
-    await container.screenshot({ path: path.join(DEBUG_DIR, `frame-${ts}.png`) });
-    console.log(`🐛 [DEBUG] Screenshot → debug/frame-${ts}.png`);
+      // Frame dump only when explicitly requested
+      if (DEBUG_ALWAYS) {
+        const ts = Date.now();
+        fs.writeFileSync(path.join(DEBUG_DIR, `frame-${ts}.html`), await frame.content());
+        await container.screenshot({ path: path.join(DEBUG_DIR, `frame-${ts}.png`) });
+        console.log(`🐛 [DEBUG] Wrote frame-${ts}.html/.png → ${DEBUG_DIR}`);
+      }
+      return frame;
+    });
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
-    //   STEP 5: Set date 20 days ago
+    //   STEP 5: Set start date (pipeline watermark window, else 20 days ago)
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('📅 setting start date…');
-    await frame.waitForSelector('input#txtStart', { timeout: 30000 });
-    const d20     = new Date(Date.now() - 20 * 24 * 60 * 60 * 1000);
-    const mm      = String(d20.getMonth() + 1).padStart(2, '0');
-    const dd      = String(d20.getDate()).padStart(2, '0');
-    const yr      = d20.getFullYear();
-    const dateStr = `${mm}/${dd}/${yr}`;
-    await frame.click('input#txtStart', { clickCount: 3 });
-    await frame.type('input#txtStart', dateStr, { delay: 50 });
-    await sleep(2000);
+    await step('start_date', async () => {
+      console.log('📅 setting start date…');
+      await frame.waitForSelector('input#txtStart', { timeout: 30000 });
+      let dateStr = process.env.ESCREEN_START_DATE;
+      if (!dateStr) {
+        const d20 = new Date(Date.now() - 20 * 24 * 60 * 60 * 1000);
+        const mm  = String(d20.getMonth() + 1).padStart(2, '0');
+        const dd  = String(d20.getDate()).padStart(2, '0');
+        const yr  = d20.getFullYear();
+        dateStr   = `${mm}/${dd}/${yr}`;
+      }
+      console.log(`📅 start date → ${dateStr}`);
+      await frame.click('input#txtStart', { clickCount: 3 });
+      await frame.type('input#txtStart', dateStr, { delay: 50 });
+      await sleep(2000);
+    });
 
     //
     // ──────────────────────────────────────────────────────────────────────────────
     //   STEP 6: Run & Download
     // ──────────────────────────────────────────────────────────────────────────────
     //
-    console.log('▶ clicking Run');
-    await frame.waitForSelector('input#cmdRun', { timeout: 30000 });
-    await frame.click('input#cmdRun');
-    await sleep(10000);
-
-    console.log('⬇️  clicking download icon');
-    await frame.waitForSelector('i.abt-icon.icon-Inbox', { timeout: 30000 });
-    await frame.click('i.abt-icon.icon-Inbox');
+    await step('run_report', async () => {
+      console.log('▶ clicking Run');
+      await frame.waitForSelector('input#cmdRun', { timeout: 30000 });
+      await frame.click('input#cmdRun');
+      await sleep(10000);
+    });
 
-    console.log('⌛ waiting for file…');
     const outPath = path.join(DOWNLOAD_DIR, 'DrugTestSummaryReport_Total.xlsx');
-    for (let i = 0; i < 30; i++) {
-      if (fs.existsSync(outPath)) break;
-      await sleep(1000);
-    }
-    if (!fs.existsSync(outPath)) {
-      throw new Error(`XLSX not found at ${outPath}`);
-    }
+    await step('download', async () => {
+      console.log('⬇️  clicking download icon');
+      await frame.waitForSelector('i.abt-icon.icon-Inbox', { timeout: 30000 });
+      await frame.click('i.abt-icon.icon-Inbox');
+
+      console.log('⌛ waiting for file…');
+      for (let i = 0; i < 30; i++) {
+        if (fs.existsSync(outPath)) break;
+        await sleep(1000);
+      }
+      if (!fs.existsSync(outPath)) {
+        throw new Error(`XLSX not found at ${outPath}`);
+      }
+    });
 
     console.log('✅ Download complete →', outPath);
     await browser.close();
@@ -220,7 +262,7 @@ async function dismissTrustArc(page, timeout = 10000) {
   } catch (err) {
     const ts = Date.now();
     console.error('❌ eScreen scraper error:', err);
-    if (typeof page !== 'undefined') {
+    if (page) {
       try {
         const shot = path.join(DEBUG_DIR, `err-${ts}.png`);
         const snapHtml = path.join(DEBUG_DIR, `err-${ts}.html`);
@@ -231,6 +273,7 @@ async function dismissTrustArc(page, timeout = 10000) {
         console.error('⚠️ Failed to capture debug artifacts', e);
       }
     }
+    if (browser) await browser.close().catch(() => {});
     process.exit(1);
   }
 })();
@@ -0,0 +1,119 @@
+"""
+Direct HTTP downloads of portal exports.
+
+Once Playwright has an authenticated page, its cookies and user agent are
+copied into a pooled requests.Session that calls the portal's export
+endpoint with the date parameters and streams the file to disk, skipping
+the report menus, filters and networkidle waits. Callers keep the
+click-through export as a fallback for when this fails.
+"""
+
+import logging
+import os
+from typing import Dict, Optional
+
+import requests
+from playwright.sync_api import Page
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.run_report import report
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 1 << 16
+
+
+class ExportError(RuntimeError):
+    """The endpoint answered, but not with an export file."""
+
+
+class ExportClient:
+    def __init__(
+        self,
+        cookies: list,
+        user_agent: Optional[str] = None,
+        pool_size: int = 4,
+        retries: int = 2,
+    ):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries, backoff_factor=1, status_forcelist=(502, 503, 504)
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        for c in cookies:
+            self.session.cookies.set(
+                c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/")
+            )
+
+    @classmethod
+    def from_page(cls, page: Page, **kwargs) -> "ExportClient":
+        """Build a client carrying an authenticated page's cookies and user agent."""
+        return cls(
+            page.context.cookies(),
+            user_agent=page.evaluate("() => navigator.userAgent"),
+            **kwargs,
+        )
+
+    def download(
+        self, url: str, params: Dict[str, str], dest: str, timeout: int = 120
+    ) -> str:
+        """Stream the export at `url` to `dest` (atomically) and return `dest`."""
+        with self.session.get(url, params=params, stream=True, timeout=timeout) as resp:
+            resp.raise_for_status()
+            # An expired session gets bounced to an HTML login page, not a 401
+            if "text/html" in resp.headers.get("Content-Type", ""):
+                raise ExportError(f"{url} returned HTML, not an export")
+            tmp = dest + ".part"
+            size = 0
+            with open(tmp, "wb") as f:
+                for chunk in resp.iter_content(_CHUNK):
+                    f.write(chunk)
+                    size += len(chunk)
+        if not size:
+            os.remove(tmp)
+            raise ExportError(f"{url} returned an empty export")
+        os.replace(tmp, dest)
+        logger.info("Downloaded %d bytes from %s → %s", size, url, dest)
+        return dest
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def try_direct_export(
+    portal: str,
+    page: Page,
+    url: Optional[str],
+    params: Dict[str, str],
+    dest: str,
+) -> bool:
+    """
+    Download `url` with the page's session into `dest`. Returns False (after
+    logging why) when no endpoint is configured or the download fails, so
+    the caller can fall back to clicking through the UI.
+    """
+    if not url:
+        return False
+    try:
+        with ExportClient.from_page(page) as client:
+            client.download(url, params, dest)
+    except (requests.RequestException, ExportError) as e:
+        logger.warning("[%s] direct export failed (%s); using click-through", portal, e)
+        report.record(portal, export="click-through")
+        return False
+    report.record(portal, export="direct")
+    return True
@@ -1,11 +1,17 @@
 import logging
 import os
+from datetime import date
+from typing import Optional
 
 import pandas as pd
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import Page, sync_playwright
 from sqlalchemy import text
 
-from config import I3_PASS, I3_USER
+from normalize.ingest import read_raw
+from scrapers.accounts import PortalAccount, env_account
+from scrapers.export_client import try_direct_export
+from scrapers.session import authenticate, new_context
+from scrapers.trace import StepTrace
 
 # Configure module-level logger
 logger = logging.getLogger(__name__)
@@ -14,59 +20,141 @@ DOWNLOAD_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "downloads")
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 I3_CSV_PATH = os.path.join(DOWNLOAD_DIR, "i3screen_export.csv")
 
+I3_LOGIN_URL = "https://i3screen.net/login/"
+# Completed Results search field used for watermark windows
+I3_START_LABEL = "Start Date"
 
-def scrape_i3() -> pd.DataFrame:
+
+def _ohs_menu(page: Page):
+    return page.get_by_role("listitem").filter(has_text="Occupational Health Screening")
+
+
+def _login_url(account: PortalAccount) -> str:
+    return account.portal_url or I3_LOGIN_URL
+
+
+def _login(page: Page, account: PortalAccount) -> None:
+    # Navigate to login page
+    logger.info("Navigating to i3Screen login page...")
+    page.goto(_login_url(account))
+
+    # Perform login
+    logger.info("Filling in credentials for %s", account.username)
+    page.get_by_role("textbox", name="Username").fill(account.username)
+    page.get_by_role("textbox", name="Password").fill(account.password)
+    page.get_by_role("button", name="Log In").click()
+
+    # Wait for dashboard to load
+    logger.info("Waiting for dashboard to load...")
+    page.wait_for_load_state("networkidle")
+
+
+def _is_logged_in(page: Page, account: PortalAccount) -> bool:
+    """Load the portal with the saved session; True if the dashboard menu shows."""
+    page.goto(_login_url(account))
+    page.wait_for_load_state("networkidle")
+    return _ohs_menu(page).first.is_visible()
+
+
+def _apply_date_window(page: Page, since: Optional[date]) -> None:
+    """Narrow the Completed Results search to `since`..today before exporting."""
+    if since is None:
+        return
+    start = page.get_by_role("textbox", name=I3_START_LABEL)
+    if not start.count():
+        logger.warning("No start-date filter on Completed Results; exporting as is")
+        return
+    logger.info("Searching completed results from %s...", since)
+    start.fill(since.strftime("%m/%d/%Y"))
+    page.get_by_role("button", name="Search").click()
+    page.wait_for_load_state("networkidle")
+
+
+def _export_params(since: Optional[date]) -> dict:
+    """Query parameters for the Completed Results export endpoint."""
+    params = {"format": "csv"}
+    if since is not None:
+        params["startDate"] = since.strftime("%m/%d/%Y")
+        params["endDate"] = date.today().strftime("%m/%d/%Y")
+    return params
+
+
+def _click_through_export(page: Page, since: Optional[date], dest: str) -> None:
+    """Fallback: open Completed Results in the UI and export the current search."""
+    # Navigate to Occupational Health Screening
+    logger.info("Opening Occupational Health Screening section...")
+    _ohs_menu(page).get_by_role("img").first.click()
+
+    # Go to Completed Results
+    logger.info("Clicking 'Completed Results'...")
+    page.get_by_role("link", name="Completed Results").click()
+    page.wait_for_load_state("networkidle")
+    _apply_date_window(page, since)
+
+    # Export CSV
+    logger.info("Triggering export...")
+    page.get_by_role("button", name="Export").click()
+    with page.expect_download() as download_info:
+        page.get_by_role("link", name="Export Current Search").click()
+    download = download_info.value
+    download.save_as(dest)
+    logger.info("Download complete: %s", dest)
+
+
+def download_i3(
+    since: Optional[date] = None, account: Optional[PortalAccount] = None
+) -> str:
     """
-    Log in to the i3Screen portal, download the completed results CSV, and return it as a pandas DataFrame.
+    Log in to the i3Screen portal as `account` (default: the environment
+    account, reusing a saved session when possible), download the completed
+    results CSV (from `since` when given), and return its path.
     """
-    logger.info("Starting i3Screen scrape...")
+    account = account or env_account("i3")
+    dest = account.download_path(DOWNLOAD_DIR, os.path.basename(I3_CSV_PATH))
+    logger.info("Starting i3Screen scrape for %s...", account.key)
 
+    trace = StepTrace(account.key)
     with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=True)
-        context = browser.new_context(accept_downloads=True)
-        page = context.new_page()
-
-        # Navigate to login page
-        logger.info("Navigating to i3Screen login page...")
-        page.goto("https://i3screen.net/login/")
-
-        # Perform login
-        logger.info("Filling in credentials for %s", I3_USER)
-        page.get_by_role("textbox", name="Username").fill(I3_USER)
-        page.get_by_role("textbox", name="Password").fill(I3_PASS)
-        page.get_by_role("button", name="Log In").click()
-
-        # Wait for dashboard to load
-        logger.info("Waiting for dashboard to load...")
-        page.wait_for_load_state("networkidle")
-
-        # Navigate to Occupational Health Screening
-        logger.info("Opening Occupational Health Screening section...")
-        page.get_by_role("listitem").filter(
-            has_text="Occupational Health Screening"
-        ).get_by_role("img").first.click()
-
-        # Go to Completed Results
-        logger.info("Clicking 'Completed Results'...")
-        page.get_by_role("link", name="Completed Results").click()
-        page.wait_for_load_state("networkidle")
-
-        # Export CSV
-        logger.info("Triggering export...")
-        page.get_by_role("button", name="Export").click()
-        with page.expect_download() as download_info:
-            page.get_by_role("link", name="Export Current Search").click()
-        download = download_info.value
-        download.save_as(I3_CSV_PATH)
-        logger.info("Download complete: %s", I3_CSV_PATH)
-
-        # Clean up
-        context.close()
-        browser.close()
-
-    # Load CSV into DataFrame
-    logger.info("Loading CSV into DataFrame...")
-    df = pd.read_csv(I3_CSV_PATH)
+        with trace.step("launch"):
+            browser = pw.chromium.launch(headless=True)
+            context, saved = new_context(browser, account.key)
+            page = context.new_page()
+            trace.page = page
+
+        try:
+            with trace.step("login"):
+                authenticate(
+                    account.key,
+                    context,
+                    page,
+                    saved,
+                    lambda p: _is_logged_in(p, account),
+                    lambda p: _login(p, account),
+                )
+
+            with trace.step("export"):
+                params = _export_params(since)
+                if not try_direct_export(
+                    account.key, page, account.export_url, params, dest
+                ):
+                    _click_through_export(page, since, dest)
+            trace.snapshot("export")
+        finally:
+            context.close()
+            browser.close()
+
+    logger.info("[%s] scrape took %.1fs", account.key, trace.total_seconds)
+    return dest
+
+
+def scrape_i3(
+    since: Optional[date] = None, account: Optional[PortalAccount] = None
+) -> pd.DataFrame:
+    """download_i3(), then load the CSV as a pandas DataFrame."""
+    account = account or env_account("i3")
+    path = download_i3(since, account)
+    with StepTrace(account.key).step("load"):
+        df = read_raw("i3", path, DOWNLOAD_DIR)
     logger.info("i3Screen DataFrame contains %d rows", len(df))
     return df
 
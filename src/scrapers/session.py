@@ -0,0 +1,119 @@
+"""
+Saved, encrypted Playwright sessions for the portal scrapers.
+
+After a full login the browser context's storage_state (cookies and local
+storage) is encrypted with SESSION_STATE_KEY and written to
+SESSION_STATE_DIR/<portal>.state. The next run loads it into the new
+context and only logs in again if the portal no longer accepts it.
+Without a key, sessions are not persisted and every run logs in.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+from playwright.sync_api import Browser, BrowserContext, Page
+
+from config import SESSION_STATE_DIR, SESSION_STATE_KEY
+from services.run_report import report
+
+logger = logging.getLogger(__name__)
+
+
+def _path(portal: str) -> str:
+    return os.path.join(SESSION_STATE_DIR, f"{portal}.state")
+
+
+def load_state(portal: str) -> Optional[dict]:
+    """Decrypt the portal's saved session, or None if absent/unreadable."""
+    if not SESSION_STATE_KEY or not os.path.exists(_path(portal)):
+        return None
+    try:
+        with open(_path(portal), "rb") as f:
+            return json.loads(Fernet(SESSION_STATE_KEY).decrypt(f.read()))
+    except (InvalidToken, ValueError) as e:
+        logger.warning("[%s] ignoring unreadable saved session: %s", portal, e)
+        return None
+
+
+def save_state(portal: str, storage_state: dict, login_seconds: float) -> None:
+    """Encrypt and persist a context's storage_state (owner-only file)."""
+    if not SESSION_STATE_KEY:
+        logger.debug("[%s] SESSION_STATE_KEY not set; not saving session", portal)
+        return
+    os.makedirs(SESSION_STATE_DIR, exist_ok=True)
+    blob = Fernet(SESSION_STATE_KEY).encrypt(
+        json.dumps(
+            {
+                "storage_state": storage_state,
+                "login_seconds": login_seconds,
+                "saved_at": time.time(),
+            }
+        ).encode()
+    )
+    tmp = _path(portal) + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, _path(portal))
+
+
+def clear_state(portal: str) -> None:
+    if os.path.exists(_path(portal)):
+        os.remove(_path(portal))
+
+
+def new_context(browser: Browser, portal: str):
+    """
+    Open a download-enabled context seeded with the portal's saved session.
+    Returns (context, saved) where saved is the decrypted record or None.
+    """
+    saved = load_state(portal)
+    context = browser.new_context(
+        accept_downloads=True,
+        storage_state=saved["storage_state"] if saved else None,
+    )
+    return context, saved
+
+
+def authenticate(
+    portal: str,
+    context: BrowserContext,
+    page: Page,
+    saved: Optional[dict],
+    is_logged_in: Callable[[Page], bool],
+    login: Callable[[Page], None],
+) -> None:
+    """
+    Reuse the saved session if `is_logged_in` accepts it, otherwise run the
+    full `login`. Records the mode and time saved in the run report.
+    """
+    start = time.monotonic()
+    if saved and is_logged_in(page):
+        elapsed = time.monotonic() - start
+        saved_secs = max(saved.get("login_seconds", 0.0) - elapsed, 0.0)
+        logger.info(
+            "[%s] reused saved session (%.1fs, ~%.1fs saved)",
+            portal,
+            elapsed,
+            saved_secs,
+        )
+        report.record(
+            portal,
+            login="reused",
+            login_seconds=elapsed,
+            login_saved_seconds=saved_secs,
+        )
+        save_state(portal, context.storage_state(), saved.get("login_seconds", elapsed))
+        return
+
+    if saved:
+        logger.info("[%s] saved session expired; logging in", portal)
+    login(page)
+    elapsed = time.monotonic() - start
+    logger.info("[%s] full login took %.1fs", portal, elapsed)
+    report.record(portal, login="full", login_seconds=elapsed, login_saved_seconds=0.0)
+    save_state(portal, context.storage_state(), elapsed)
@@ -0,0 +1,79 @@
+"""
+Structured step timing for the portal scrapers.
+
+Each scraper wraps its phases (launch, login, export, ...) in
+``trace.step(name)``. Every step logs its name and duration and adds
+``step_<name>_seconds`` to the run report; a step that raises is logged as
+failed and, when the trace has a page, its HTML and screenshot go to the
+debug-artifact store before the error propagates.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+from services import debug_artifacts
+from services.run_report import report
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the machine-readable step lines printed by escreen.js
+TRACE_PREFIX = "TRACE "
+
+
+class StepTrace:
+    def __init__(self, portal: str, page=None):
+        self.portal = portal
+        self.page = page
+        self.steps: List[Tuple[str, float, bool]] = []
+
+    def record(self, name: str, seconds: float, ok: bool = True) -> None:
+        """Log a finished step and add its duration to the run report."""
+        self.steps.append((name, seconds, ok))
+        logger.info(
+            "[%s] step %s %s in %.2fs",
+            self.portal,
+            name,
+            "done" if ok else "FAILED",
+            seconds,
+        )
+        report.add(self.portal, f"step_{name}_seconds", seconds)
+        report.add(self.portal, "scrape_seconds", seconds)
+        if not ok:
+            report.record(self.portal, failed_step=name)
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.record(name, time.monotonic() - start, ok=False)
+            if self.page is not None:
+                debug_artifacts.capture_page(self.portal, self.page, f"{name}-failure")
+            raise
+        self.record(name, time.monotonic() - start)
+
+    def snapshot(self, label: str) -> None:
+        """Dump the current page when DEBUG_ARTIFACTS asks for it."""
+        if self.page is not None and debug_artifacts.enabled():
+            debug_artifacts.capture_page(self.portal, self.page, label)
+
+    def ingest(self, output: str) -> None:
+        """Record the TRACE lines an external scraper printed to stdout."""
+        for line in output.splitlines():
+            if not line.startswith(TRACE_PREFIX):
+                continue
+            try:
+                entry = json.loads(line[len(TRACE_PREFIX) :])
+                self.record(
+                    entry["step"], float(entry["seconds"]), entry.get("ok", True)
+                )
+            except (ValueError, KeyError) as e:
+                logger.debug("[%s] bad trace line %r: %s", self.portal, line, e)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, seconds, _ in self.steps)
@@ -0,0 +1,104 @@
+"""
+Bounded store for scraper debug artifacts.
+
+Page HTML and screenshots are kept under DEBUG_DIR/<source>/ as
+<timestamp>-<label>.<ext>[.gz] (text is gzip-compressed; PNGs are already
+compressed). After every write the oldest files are deleted until the
+store fits in DEBUG_MAX_MB, so a failing portal cannot fill the disk.
+"""
+
+import gzip
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import List, Optional
+
+from config import DEBUG_ARTIFACTS, DEBUG_DIR, DEBUG_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+# Extensions that are stored as-is rather than gzipped
+_PRECOMPRESSED = {".png", ".jpg", ".jpeg", ".gz", ".zip"}
+
+
+def enabled() -> bool:
+    """True when artifacts should be kept for successful runs too."""
+    return DEBUG_ARTIFACTS
+
+
+def _dest(source: str, name: str) -> str:
+    ext = os.path.splitext(name)[1].lower()
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S.%f")[:-3]
+    dest = os.path.join(DEBUG_DIR, source, f"{stamp}-{name}")
+    return dest if ext in _PRECOMPRESSED else dest + ".gz"
+
+
+def save(source: str, name: str, data: bytes) -> str:
+    """Store `data` as artifact `name` (e.g. "crl-failure.html") and rotate."""
+    dest = _dest(source, name)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    opener = gzip.open if dest.endswith(".gz") else open
+    with opener(dest, "wb") as f:
+        f.write(data)
+    logger.info("[%s] debug artifact → %s", source, dest)
+    rotate()
+    return dest
+
+
+def collect(source: str, spool_dir: str) -> List[str]:
+    """Move files an external scraper left in `spool_dir` into the store."""
+    if not os.path.isdir(spool_dir):
+        return []
+    stored = []
+    for name in sorted(os.listdir(spool_dir)):
+        path = os.path.join(spool_dir, name)
+        if not os.path.isfile(path):
+            continue
+        dest = _dest(source, name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if dest.endswith(".gz"):
+            with open(path, "rb") as src, gzip.open(dest, "wb") as out:
+                shutil.copyfileobj(src, out)
+            os.remove(path)
+        else:
+            shutil.move(path, dest)
+        stored.append(dest)
+    if stored:
+        logger.info("[%s] collected %d debug artifact(s)", source, len(stored))
+        rotate()
+    return stored
+
+
+def capture_page(source: str, page, label: str) -> None:
+    """
+    Save a Playwright page's HTML and full-page screenshot. Never raises:
+    a broken page must not mask the error being debugged.
+    """
+    try:
+        save(source, f"{label}.html", page.content().encode())
+        save(source, f"{label}.png", page.screenshot(full_page=True))
+    except Exception as e:
+        logger.warning("[%s] could not capture debug artifacts: %s", source, e)
+
+
+def rotate(max_mb: Optional[int] = None) -> List[str]:
+    """Delete the oldest artifacts until the store fits the size cap."""
+    cap = (DEBUG_MAX_MB if max_mb is None else max_mb) * 2**20
+    files = []
+    for root, _, names in os.walk(DEBUG_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    removed = []
+    for _, size, path in sorted(files):
+        if total <= cap:
+            break
+        os.remove(path)
+        total -= size
+        removed.append(path)
+    if removed:
+        logger.info("Rotated %d debug artifact(s) out of %s", len(removed), DEBUG_DIR)
+    return removed
@@ -0,0 +1,73 @@
+"""
+Manual eScreen uploads from the web app.
+
+An uploaded export (.xlsx, or .csv saved from it) goes through the same
+steps as a scraped one: normalize_escreen(), then rows already uploaded or
+queued are dropped, incomplete rows are staged for review and complete ones
+are queued in the Zoho outbox, in one transaction. The pipeline's outbox
+drain (or a separate pusher) sends them on.
+"""
+
+import datetime
+import logging
+import os
+from typing import Dict
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db.repository import OutboxRepo, WorklistStagingRepo
+from normalize.escreen import normalize_escreen
+from normalize.ingest import read_raw
+from services.outbox import queue_records
+from services.zoho import sync_collection_sites_to_crm
+from services.zoho_payload import build_payload, load_lookup_maps
+from utils import is_complete, to_staging_rows
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "escreen_upload"
+
+
+def process_escreen_upload(db: Session, path: str) -> Dict[str, int]:
+    """
+    Stage and queue the rows of an uploaded eScreen export; returns the
+    rows normalized, queued for Zoho and staged for review.
+    """
+    raw_df = read_raw("escreen", path, os.path.dirname(path))
+    clean_df = normalize_escreen(raw_df)
+
+    uploaded = {row[0] for row in db.execute(text("SELECT ccfid FROM uploaded_ccfid"))}
+    queued = OutboxRepo(db).unsent_ccfids()
+    repo = WorklistStagingRepo(db)
+    pending_df = clean_df[~clean_df["CCFID"].isin(uploaded | queued)]
+
+    records = pending_df.to_dict(orient="records")
+    flags = [is_complete(rec) for rec in records]
+    complete_df = pending_df[pd.Series(flags, index=pending_df.index, dtype=bool)]
+    staged = repo.ccfids()
+    staging = [
+        rec
+        for rec, ok in zip(records, flags)
+        if not ok and rec.get("CCFID") not in staged
+    ]
+
+    site_df = clean_df[["Collection_Site", "Collection_Site_ID"]].drop_duplicates()
+    maps = load_lookup_maps(db, sites=sync_collection_sites_to_crm(site_df))
+    payload = build_payload(complete_df, maps)
+
+    mapped = to_staging_rows(staging, datetime.datetime.utcnow())
+    repo.add_many(mapped, commit=False)
+    queue_records(db, SOURCE, payload, pd.Series(dtype="int64"))
+    db.commit()
+
+    logger.info(
+        "[%s] %s: %d rows, %d queued for Zoho, %d staged",
+        SOURCE,
+        os.path.basename(path),
+        len(clean_df),
+        len(payload),
+        len(mapped),
+    )
+    return {"rows": len(clean_df), "queued": len(payload), "staged": len(mapped)}
@@ -0,0 +1,175 @@
+"""
+Per-stage memory accounting and a per-run memory budget.
+
+``memory.stage(source, name)`` records, for each pipeline stage:
+
+- resident set size before/after and the stage's peak RSS (VmHWM, reset
+  at stage start through /proc/self/clear_refs where the kernel allows;
+  otherwise the peak is cumulative for the process),
+- the peak RSS of child processes run during the stage (the LibreOffice
+  conversion, the eScreen node scraper) when it sets a new high for the run,
+- with ``trace_allocations``, Python allocation deltas from tracemalloc
+  (net change and peak above the starting point).
+
+Each stage is logged and the largest peak is kept in the run report. When
+a stage's peak exceeds the budget a warning is logged, or, in strict
+mode, MemoryBudgetExceeded is raised so the run fails at that stage.
+"""
+
+import logging
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from services.run_report import report
+
+logger = logging.getLogger(__name__)
+
+_MB = 2**20
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """A stage's peak memory went over the configured budget (strict mode)."""
+
+
+def _status_mb(field: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB."""
+    rss = _status_mb("VmRSS")
+    if rss is None:
+        # No procfs: ru_maxrss (KiB on Linux) is the best available proxy
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return rss
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (since the last reset)."""
+    peak = _status_mb("VmHWM")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return peak
+
+
+def children_peak_mb() -> float:
+    """Largest peak RSS of any waited-for child process, in MiB."""
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def _reset_peak() -> bool:
+    """Reset VmHWM to the current RSS (Linux >= 4.0); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class MemoryTracker:
+    def __init__(
+        self,
+        budget_mb: int = 0,
+        strict: bool = False,
+        trace_allocations: bool = False,
+    ):
+        self.budget_mb = budget_mb
+        self.strict = strict
+        self.trace_allocations = trace_allocations
+        self.stages: Dict[str, dict] = {}
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, source: str, name: str):
+        resettable = _reset_peak()
+        rss_before = rss_mb()
+        children_before = children_peak_mb()
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            py_before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            usage = {
+                "rss_before_mb": rss_before,
+                "rss_after_mb": rss_mb(),
+                "peak_rss_mb": peak_rss_mb(),
+                "peak_is_stage_local": resettable,
+            }
+            children = children_peak_mb()
+            if children > children_before:
+                usage["child_peak_mb"] = children
+            if self.trace_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                usage["py_alloc_delta_mb"] = (current - py_before) / _MB
+                usage["py_alloc_peak_mb"] = (peak - py_before) / _MB
+            self._record(source, name, usage)
+        self._check_budget(source, name, usage)
+
+    def _record(self, source: str, name: str, usage: dict) -> None:
+        # The parent waits on a child, so both are resident at the same time
+        child = usage.get("child_peak_mb")
+        usage["total_peak_mb"] = (
+            max(usage["peak_rss_mb"], usage["rss_before_mb"] + child)
+            if child
+            else usage["peak_rss_mb"]
+        )
+        # Stages repeated per chunk keep their worst pass
+        label = f"{source}.{name}"
+        if usage["total_peak_mb"] >= self.stages.get(label, {}).get(
+            "total_peak_mb", 0.0
+        ):
+            self.stages[label] = usage
+
+        parts = [
+            "rss %.0f→%.0f MiB" % (usage["rss_before_mb"], usage["rss_after_mb"]),
+            "peak %.0f MiB%s"
+            % (usage["peak_rss_mb"], "" if usage["peak_is_stage_local"] else " (run)"),
+        ]
+        if "child_peak_mb" in usage:
+            parts.append("child peak %.0f MiB" % usage["child_peak_mb"])
+        if "py_alloc_delta_mb" in usage:
+            parts.append(
+                "py alloc %+.1f MiB (peak +%.1f)"
+                % (usage["py_alloc_delta_mb"], usage["py_alloc_peak_mb"])
+            )
+        logger.info("[memory] %s.%s: %s", source, name, ", ".join(parts))
+
+        best = report.sources[source].get("mem_peak_mb", 0.0)
+        if usage["total_peak_mb"] > best:
+            report.record(
+                source, mem_peak_mb=usage["total_peak_mb"], mem_peak_stage=name
+            )
+
+    def _check_budget(self, source: str, name: str, usage: dict) -> None:
+        if not self.budget_mb or usage["total_peak_mb"] <= self.budget_mb:
+            return
+        msg = "%s.%s peaked at %.0f MiB, over the %d MiB memory budget" % (
+            source,
+            name,
+            usage["total_peak_mb"],
+            self.budget_mb,
+        )
+        report.record(source, mem_budget_exceeded=name)
+        if self.strict:
+            raise MemoryBudgetExceeded(msg)
+        logger.warning("[memory] %s", msg)
+
+    def log_summary(self) -> None:
+        """Log every stage's peak, largest first."""
+        ranked = sorted(
+            self.stages.items(), key=lambda kv: kv[1]["total_peak_mb"], reverse=True
+        )
+        for label, usage in ranked:
+            logger.info("[memory] peak %7.0f MiB  %s", usage["total_peak_mb"], label)
@@ -0,0 +1,188 @@
+"""
+Transactional outbox for Zoho pushes.
+
+The pipeline does not call Zoho itself: queue_records() adds the complete
+rows' ready-to-push payloads to zoho_outbox in the same transaction as the
+batch's staging rows, so a crash or a Zoho outage loses nothing and never
+forces a re-run. The pusher then drains the outbox:
+
+- drain_batch() locks up to OUTBOX_BATCH_SIZE due records (FOR UPDATE SKIP
+  LOCKED, so several pushers can run) and sends them in one insert call,
+- accepted records are marked sent and written to the uploaded ledger and
+  their row fingerprints saved, in the transaction that releases them,
+- rejected ones (or a whole batch whose request failed) are retried after
+  OUTBOX_RETRY_BACKOFF_SECONDS, doubling, and after OUTBOX_MAX_ATTEMPTS are
+  dead-lettered with Zoho's error details for review (requeue_dead()).
+
+drain() paces batches OUTBOX_BATCH_INTERVAL_SECONDS apart and stops early
+when the Zoho credit budget (services.zoho_limits) runs out.
+
+A source's scrape watermark only moves past rows Zoho has accepted
+(advance_watermark()): rows still pending or dead-lettered keep it at
+their collection date, so the next scrape window fetches them again.
+"""
+
+import datetime
+import logging
+import threading
+from typing import List, NamedTuple, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import (
+    OUTBOX_BATCH_INTERVAL_SECONDS,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_BACKOFF_SECONDS,
+)
+from db.repository import OutboxRepo, RowFingerprintRepo, WatermarkRepo
+from services.run_report import report
+from services.zoho import insert_records
+from services.zoho_limits import ZohoCreditsExhausted
+
+logger = logging.getLogger(__name__)
+
+
+def queue_records(
+    db: Session, source: str, payload: List[dict], hashes: pd.Series
+) -> int:
+    """
+    Add build_payload() records from `source` (a state key) to the outbox
+    without committing. `hashes` holds the raw row hashes by source key
+    (the CCFID) to fingerprint once a record is accepted.
+    """
+    rows = []
+    for record in payload:
+        ccfid = record["Name"]
+        row_hash = hashes.get(ccfid)
+        rows.append(
+            {
+                "ccfid": ccfid,
+                "source": source,
+                "record": record,
+                "source_key": ccfid if row_hash is not None else None,
+                "row_hash": int(row_hash) if row_hash is not None else None,
+            }
+        )
+    OutboxRepo(db).add_many(rows, commit=False)
+    return len(rows)
+
+
+def advance_watermark(db: Session, source: str, reached: datetime.date) -> None:
+    """
+    Move `source`'s watermark up to `reached`, but not past the oldest
+    record it still has waiting on Zoho.
+    """
+    oldest = OutboxRepo(db).oldest_unsent_date(source)
+    if oldest is not None and oldest < reached:
+        logger.info(
+            "[%s] watermark held at %s by records Zoho has not accepted",
+            source,
+            oldest,
+        )
+        reached = oldest
+    WatermarkRepo(db).advance(source, reached)
+
+
+class Pushed(NamedTuple):
+    """Records Zoho accepted and rejected in one batch or a whole drain."""
+
+    accepted: int = 0
+    rejected: int = 0
+
+    @property
+    def attempted(self) -> int:
+        return self.accepted + self.rejected
+
+
+def _error_details(result: dict) -> dict:
+    return {k: result.get(k) for k in ("code", "message", "details", "status")}
+
+
+def drain_batch(db: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> Pushed:
+    """Push one batch of due records; returns how many Zoho accepted and rejected."""
+    outbox = OutboxRepo(db)
+    rows = outbox.claim(batch_size)
+    if not rows:
+        db.rollback()
+        return Pushed()
+
+    try:
+        results = insert_records([row.record for row in rows])
+    except ZohoCreditsExhausted as e:
+        # Not the records' fault: release them untouched until credits return
+        logger.warning("Outbox paused: %s", e)
+        db.rollback()
+        return Pushed()
+    except Exception as e:
+        logger.error("Zoho push of %d outbox records failed: %s", len(rows), e)
+        results = [{"status": "error", "code": "REQUEST_FAILED", "message": repr(e)}]
+        results *= len(rows)
+
+    now = datetime.datetime.utcnow()
+    sent, fingerprints = [], {}
+    for row, result in zip(rows, results):
+        if result.get("status") == "success":
+            outbox.mark_sent(row, (result.get("details") or {}).get("id"))
+            sent.append(row.ccfid)
+            if row.row_hash is not None:
+                fingerprints.setdefault(row.source, {})[row.source_key] = row.row_hash
+            continue
+        outbox.mark_failed(
+            row,
+            _error_details(result),
+            OUTBOX_MAX_ATTEMPTS,
+            OUTBOX_RETRY_BACKOFF_SECONDS,
+        )
+        if row.status == "dead":
+            logger.error(
+                "[%s] %s dead-lettered after %d attempts: %r",
+                row.source,
+                row.ccfid,
+                row.attempts,
+                row.last_error,
+            )
+
+    if sent:
+        db.execute(
+            text(
+                "INSERT INTO uploaded_ccfid (ccfid, uploaded_timestamp) "
+                "VALUES (:ccfid, :ts) ON CONFLICT (ccfid) DO NOTHING"
+            ),
+            [{"ccfid": ccfid, "ts": now} for ccfid in sent],
+        )
+    for source, hashes in fingerprints.items():
+        RowFingerprintRepo(db).save(source, hashes, commit=False)
+    db.commit()
+    report.add("zoho", "accepted", len(sent))
+    report.add("zoho", "rejected", len(rows) - len(sent))
+    logger.info("Outbox: %d/%d records accepted by Zoho", len(sent), len(rows))
+    return Pushed(len(sent), len(rows) - len(sent))
+
+
+def drain(
+    db: Session,
+    stopping: Optional[threading.Event] = None,
+    batch_size: int = OUTBOX_BATCH_SIZE,
+) -> Pushed:
+    """
+    Push due batches until none is left (or `stopping` is set); returns how
+    many records Zoho accepted and rejected in this drain.
+    """
+    stopping = stopping or threading.Event()
+    accepted = rejected = 0
+    while not stopping.is_set():
+        batch = drain_batch(db, batch_size)
+        if not batch.attempted:
+            break
+        accepted += batch.accepted
+        rejected += batch.rejected
+        stopping.wait(OUTBOX_BATCH_INTERVAL_SECONDS)
+    counts = OutboxRepo(db).counts()
+    logger.info(
+        "Outbox: %s",
+        ", ".join(f"{n} {status}" for status, n in sorted(counts.items())) or "empty",
+    )
+    return Pushed(accepted, rejected)
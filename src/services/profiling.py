@@ -0,0 +1,83 @@
+"""
+Per-stage CPU profiles for pipeline runs (``--profile``).
+
+Each ``profiler.stage(source, name)`` block runs under cProfile and is
+written to <out_dir>/<run stamp>/<source>.<stage>.prof (standard pstats
+format: open with ``python -m pstats``, snakeviz, or diff two runs with
+pstats.Stats.add/sort_stats). A stage that runs repeatedly, e.g. once
+per chunk in streaming mode, accumulates into the same profile. The top-N
+functions by own time are logged per stage and overall at the end of the
+run. A disabled profiler's stages are no-ops, so the pipeline wraps its
+stages unconditionally. cProfile only sees the thread that enables it, so
+stages that hand their work to a thread pool (the portal scrapes) are
+timed in the run history instead of profiled.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageProfiler:
+    def __init__(self, out_dir: Optional[str] = None, top_n: int = 15):
+        self.enabled = bool(out_dir)
+        self.top_n = top_n
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self.run_dir = None
+        if self.enabled:
+            self.run_dir = os.path.join(out_dir, time.strftime("%Y%m%dT%H%M%S"))
+            os.makedirs(self.run_dir, exist_ok=True)
+            logger.info("Profiling pipeline stages into %s", self.run_dir)
+
+    @contextmanager
+    def stage(self, source: str, name: str):
+        if not self.enabled:
+            yield
+            return
+        label = f"{source}.{name}"
+        prof = self._profiles.setdefault(label, cProfile.Profile())
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            # Rewrite after every pass so a crashed run still leaves profiles
+            prof.dump_stats(self._path(label))
+
+    def _path(self, label: str) -> str:
+        return os.path.join(self.run_dir, f"{label}.prof")
+
+    def _log_stats(self, title: str, *profiles) -> None:
+        out = io.StringIO()
+        stats = pstats.Stats(*profiles, stream=out)
+        stats.strip_dirs().sort_stats(pstats.SortKey.TIME).print_stats(self.top_n)
+        logger.info(
+            "[profile] %s: %.2fs\n%s", title, stats.total_tt, _table(out.getvalue())
+        )
+
+    def log_summary(self) -> None:
+        """Log the hottest functions per stage and across the whole run."""
+        if not self._profiles:
+            return
+        for label, prof in self._profiles.items():
+            self._log_stats(f"{label} → {self._path(label)}", prof)
+        self._log_stats(
+            f"all stages ({len(self._profiles)} profiles in {self.run_dir})",
+            *self._profiles.values(),
+        )
+
+
+def _table(report: str) -> str:
+    """The function table from pstats output, without its preamble."""
+    lines = report.splitlines()
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("ncalls"):
+            return "\n".join(lines[i:]).rstrip()
+    return report.rstrip()
@@ -0,0 +1,198 @@
+"""
+Persisted run history and throughput-regression alerts.
+
+The pipeline wraps each source stage in ``history.stage(source, name)``,
+which times it and counts the Zoho API calls made meanwhile, and reports
+row counts with ``history.count(...)``: rows a stage produced and rows it
+rejected (dropped by the normalizer, refused by Zoho). save() stores the
+run in pipeline_runs and its stages in pipeline_stage_runs, then compares
+every stage with the same source and stage over the last
+RUN_HISTORY_WINDOW successful runs. A stage is flagged when its time, or
+its rows per second, is RUN_REGRESSION_FACTOR worse than the median. Alerts
+are logged as warnings and kept on the run for the /runs page.
+"""
+
+import datetime
+import logging
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import (
+    RUN_HISTORY_MIN_RUNS,
+    RUN_HISTORY_WINDOW,
+    RUN_REGRESSION_FACTOR,
+    RUN_REGRESSION_MIN_SECONDS,
+)
+from db.models import PipelineRun
+from db.repository import PipelineRunRepo
+
+logger = logging.getLogger(__name__)
+
+
+def find_regressions(
+    label: str,
+    seconds: float,
+    rows: Optional[int],
+    history: Sequence[Tuple[float, Optional[int]]],
+    factor: float = RUN_REGRESSION_FACTOR,
+    min_seconds: float = RUN_REGRESSION_MIN_SECONDS,
+    min_runs: int = RUN_HISTORY_MIN_RUNS,
+) -> List[str]:
+    """
+    Alerts for one stage given its earlier (seconds, rows): slower than
+    `factor` times the median, or under the median rows/second / `factor`.
+    """
+    if len(history) < min_runs or seconds < min_seconds:
+        return []
+    alerts = []
+    median = statistics.median(s for s, _ in history)
+    if median > 0 and seconds > factor * median:
+        alerts.append(f"{label}: took {seconds:.1f}s, median {median:.1f}s")
+
+    rates = [r / s for s, r in history if r and s > 0]
+    if rows and len(rates) >= min_runs:
+        rate, median_rate = rows / seconds, statistics.median(rates)
+        if rate < median_rate / factor:
+            alerts.append(
+                f"{label}: {rate:.0f} rows/s, median {median_rate:.0f} rows/s"
+            )
+    return alerts
+
+
+class RunHistory:
+    def __init__(
+        self,
+        api_calls: Callable[[], int] = lambda: 0,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.started_at = datetime.datetime.utcnow()
+        self.api_calls = api_calls
+        self.clock = clock
+        self.stages: Dict[Tuple[str, str], Dict[str, float]] = {}
+        # Scrapes of several accounts are timed from their own threads
+        self._lock = threading.Lock()
+
+    def _totals(self, source: str, name: str) -> Dict[str, float]:
+        return self.stages.setdefault(
+            (source, name), {"seconds": 0.0, "rows": 0, "rejected": 0, "api_calls": 0}
+        )
+
+    @contextmanager
+    def stage(self, source: str, name: str):
+        """Time a stage; repeated stages (chunks) add up."""
+        start, calls = self.clock(), self.api_calls()
+        try:
+            yield
+        finally:
+            with self._lock:
+                totals = self._totals(source, name)
+                totals["seconds"] += self.clock() - start
+                totals["api_calls"] += self.api_calls() - calls
+
+    def count(self, source: str, name: str, rows: int = 0, rejected: int = 0) -> None:
+        with self._lock:
+            totals = self._totals(source, name)
+            totals["rows"] += rows
+            totals["rejected"] += rejected
+
+    def stage_rows(self) -> List[Dict]:
+        return [
+            {
+                "source": source,
+                "stage": name,
+                "seconds": round(totals["seconds"], 3),
+                "rows": int(totals["rows"]),
+                "rejected": int(totals["rejected"]),
+                "api_calls": int(totals["api_calls"]),
+            }
+            for (source, name), totals in sorted(self.stages.items())
+        ]
+
+    def save(
+        self,
+        db: Session,
+        status: str,
+        sources: Iterable[str],
+        rows: int = 0,
+        zoho_credits: int = 0,
+    ) -> PipelineRun:
+        """Store the run and its stages, then flag regressions against history."""
+        repo = PipelineRunRepo(db)
+        stages = self.stage_rows()
+        run = repo.save(
+            {
+                "started_at": self.started_at,
+                "finished_at": datetime.datetime.utcnow(),
+                "status": status,
+                "sources": list(sources),
+                "rows": rows,
+                "api_calls": sum(stage["api_calls"] for stage in stages),
+                "zoho_credits": zoho_credits,
+            },
+            stages,
+            commit=False,
+        )
+
+        alerts = []
+        for stage in stages:
+            earlier = repo.stage_history(
+                stage["source"], stage["stage"], run.id, RUN_HISTORY_WINDOW
+            )
+            alerts += find_regressions(
+                f"{stage['source']}.{stage['stage']}",
+                stage["seconds"],
+                stage["rows"],
+                [(h.seconds, h.rows) for h in earlier],
+            )
+        run.alerts = alerts
+        db.commit()
+
+        for alert in alerts:
+            logger.warning("[regression] run %d %s", run.id, alert)
+        logger.info(
+            "Recorded run %d (%s): %d stages, %d alerts",
+            run.id,
+            status,
+            len(stages),
+            len(alerts),
+        )
+        return run
+
+
+def stage_trends(stages: Iterable) -> List[Dict]:
+    """
+    Per source and stage (from PipelineRunRepo.stages_for), its seconds and
+    rows/second run by run, oldest first, with the latest run's figures.
+    """
+    grouped: Dict[Tuple[str, str], List] = {}
+    for row in stages:
+        grouped.setdefault((row.source, row.stage), []).append(row)
+
+    trends = []
+    for (source, name), rows in sorted(grouped.items()):
+        seconds = [row.seconds for row in rows]
+        rates = [row.rows / row.seconds for row in rows if row.rows and row.seconds > 0]
+        last = rows[-1]
+        trends.append(
+            {
+                "source": source,
+                "stage": name,
+                "seconds": seconds,
+                "median_seconds": statistics.median(seconds),
+                "last_seconds": last.seconds,
+                "rates": rates,
+                "median_rate": statistics.median(rates) if rates else None,
+                "last_rate": (
+                    last.rows / last.seconds if last.rows and last.seconds > 0 else None
+                ),
+                "last_rows": last.rows,
+                "last_rejected": last.rejected,
+                "last_api_calls": last.api_calls,
+            }
+        )
+    return trends
@@ -0,0 +1,48 @@
+"""
+Per-run report of what each source did.
+
+Any stage can attach facts to a source (login mode, timings, row counts);
+main() logs the collected report when the run finishes.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class RunReport:
+    def __init__(self):
+        self.sources: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        # Scrapers for several accounts report from their own threads
+        self._lock = threading.Lock()
+
+    def record(self, source: str, **fields) -> None:
+        """Set (or overwrite) facts for a source."""
+        with self._lock:
+            self.sources[source].update(fields)
+
+    def add(self, source: str, field: str, amount: float) -> None:
+        """Accumulate a numeric fact for a source."""
+        with self._lock:
+            facts = self.sources[source]
+            facts[field] = facts.get(field, 0) + amount
+
+    def clear(self) -> None:
+        """Forget everything recorded, ready for the next run."""
+        with self._lock:
+            self.sources.clear()
+
+    def log_summary(self) -> None:
+        for source, fields in self.sources.items():
+            facts = ", ".join(
+                f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                for k, v in fields.items()
+            )
+            logger.info("[report] %s: %s", source, facts)
+
+
+# Process-wide report for the current pipeline run
+report = RunReport()
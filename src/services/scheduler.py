@@ -0,0 +1,118 @@
+"""
+Long-running scheduler for the pipeline (``easy-import-pipeline --schedule``).
+
+Each source has its own interval and jitter: after a run starts, the
+source is next due one interval later plus a random delay of up to its
+jitter, so several instances (or sources) do not hit a portal in lockstep.
+Sources that fall due together are handed to the runner as one batch, and
+the first run of every source is spread over its jitter window.
+
+Overlap protection is the runner's job (see db.locks): a source that is
+still running elsewhere is skipped and simply comes due again later.
+"""
+
+import logging
+import random
+import signal
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SourceSchedule(NamedTuple):
+    interval: float  # seconds between runs
+    jitter: float  # up to this many seconds added to each run
+
+
+def parse_minutes(spec: str) -> Dict[str, float]:
+    """Parse "crl=60,i3=30" into {"crl": 60.0, "i3": 30.0}."""
+    minutes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        source, _, value = item.partition("=")
+        minutes[source.strip()] = max(float(value), 0.0)
+    return minutes
+
+
+def build_schedules(
+    sources: Iterable[str],
+    intervals: str,
+    jitter: str,
+    default_interval: float,
+    default_jitter: float,
+) -> Dict[str, SourceSchedule]:
+    """Per-source schedules from the interval/jitter specs (in minutes)."""
+    interval_minutes, jitter_minutes = parse_minutes(intervals), parse_minutes(jitter)
+    schedules = {}
+    for source in sources:
+        interval = interval_minutes.get(source, default_interval)
+        if interval <= 0:
+            raise ValueError(f"{source}: schedule interval must be positive")
+        schedules[source] = SourceSchedule(
+            interval * 60, jitter_minutes.get(source, default_jitter) * 60
+        )
+    return schedules
+
+
+class Scheduler:
+    def __init__(
+        self,
+        schedules: Dict[str, SourceSchedule],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.schedules = schedules
+        self.clock = clock
+        self.stopping = threading.Event()
+        now = clock()
+        self.next_due = {
+            source: now + random.uniform(0, schedule.jitter)
+            for source, schedule in schedules.items()
+        }
+
+    def due(self) -> List[str]:
+        now = self.clock()
+        return [source for source, at in self.next_due.items() if at <= now]
+
+    def reschedule(self, sources: Iterable[str], started: float) -> None:
+        for source in sources:
+            schedule = self.schedules[source]
+            self.next_due[source] = (
+                started + schedule.interval + random.uniform(0, schedule.jitter)
+            )
+            logger.info(
+                "[%s] next run in %.0f min",
+                source,
+                (self.next_due[source] - self.clock()) / 60,
+            )
+
+    def stop(self, signum: Optional[int] = None, frame=None) -> None:
+        """Finish the current run, then leave run_forever()."""
+        if signum is not None:
+            logger.info("Received signal %d; stopping after the current run", signum)
+        self.stopping.set()
+
+    def run_forever(self, run: Callable[[List[str]], None]) -> None:
+        """
+        Call run(sources) for each batch of due sources until stop() (or
+        SIGTERM/SIGINT). A failing run is logged and the sources stay on
+        their schedule.
+        """
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+
+        while not self.stopping.is_set():
+            sources = self.due()
+            if not sources:
+                wait = min(self.next_due.values()) - self.clock()
+                self.stopping.wait(max(wait, 0))
+                continue
+
+            started = self.clock()
+            logger.info("Scheduled run: %s", ", ".join(sources))
+            try:
+                run(sources)
+            except Exception:
+                logger.exception("Scheduled run of %s failed", ", ".join(sources))
+            self.reschedule(sources, started)
+        logger.info("Scheduler stopped")
@@ -0,0 +1,104 @@
+"""
+In-memory typeahead index over collection sites.
+
+Each process builds the index once from collection_sites: names are folded
+(case and surrounding whitespace) and kept sorted, so prefix matches are a
+bisect plus a short scan. When fewer than `limit` names share the prefix,
+the rest are filled with rapidfuzz matches above SITE_FUZZY_CUTOFF to
+catch typos.
+
+current_index() rebuilds when the collection_sites version in
+table_versions moves (sites added by the pipeline in another process) or
+after invalidate(), which sync_collection_sites_to_crm calls when it adds
+sites itself.
+"""
+
+import bisect
+import logging
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+from sqlalchemy.orm import Session
+
+from config import SITE_FUZZY_CUTOFF
+from db.models import CollectionSite
+from db.repository import TableVersionRepo
+
+logger = logging.getLogger(__name__)
+
+
+class SiteMatch(NamedTuple):
+    site: str
+    site_id: str
+    score: float
+
+
+def _fold(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+class SiteIndex:
+    def __init__(self, sites: Iterable[Tuple[str, str]]):
+        """`sites` are (Collection_Site, Collection_Site_ID) pairs."""
+        entries = sorted(
+            {(_fold(name), name, site_id or "") for name, site_id in sites if name}
+        )
+        self.keys = [key for key, _, _ in entries]
+        self.sites = [(name, site_id) for _, name, site_id in entries]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def search(self, query: str, limit: int = 10) -> List[SiteMatch]:
+        """Up to `limit` sites: prefix matches first, then the closest typos."""
+        q = _fold(query)
+        if not q or limit <= 0:
+            return []
+
+        matches, seen = [], set()
+        i = bisect.bisect_left(self.keys, q)
+        while (
+            i < len(self.keys) and self.keys[i].startswith(q) and len(matches) < limit
+        ):
+            matches.append(SiteMatch(*self.sites[i], 100.0))
+            seen.add(i)
+            i += 1
+        if len(matches) < limit:
+            for _, score, j in process.extract(
+                q,
+                self.keys,
+                scorer=fuzz.WRatio,
+                limit=limit + len(seen),
+                score_cutoff=SITE_FUZZY_CUTOFF,
+            ):
+                if j not in seen and len(matches) < limit:
+                    matches.append(SiteMatch(*self.sites[j], score))
+        return matches
+
+
+_lock = threading.Lock()
+_index: Optional[SiteIndex] = None
+_version: Optional[int] = None
+
+
+def invalidate() -> None:
+    """Drop this process's index; the next current_index() rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def current_index(db: Session) -> SiteIndex:
+    """This process's index, rebuilt if collection_sites changed since."""
+    global _index, _version
+    table = CollectionSite.__tablename__
+    version, _ = TableVersionRepo(db).get([table])[table]
+    with _lock:
+        if _index is None or version != _version:
+            rows = db.query(
+                CollectionSite.Collection_Site, CollectionSite.Collection_Site_ID
+            ).all()
+            _index, _version = SiteIndex(rows), version
+            logger.info("Built site index: %d sites (version %d)", len(_index), version)
+        return _index
@@ -0,0 +1,118 @@
+"""
+Content-addressed archive of raw portal exports.
+
+Every downloaded file is stored once per distinct content under
+SNAPSHOT_DIR/<source>/<sha256>.<ext>.gz, so the pipeline can tell when a
+source's export is byte-for-byte identical to one it already processed.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import time
+from typing import List, NamedTuple, Optional
+
+from config import SNAPSHOT_DIR, SNAPSHOT_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 1 << 20
+
+
+class Snapshot(NamedTuple):
+    source: str
+    sha256: str
+    path: str
+
+
+def file_sha256(path: str) -> str:
+    """Stream a file through SHA-256 and return the hex digest."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def archive(source: str, path: str) -> Snapshot:
+    """
+    Hash `path` and store a gzip copy under the source's archive folder,
+    unless one with the same content already exists (then just touch it so
+    retention counts it as recent).
+    """
+    digest = file_sha256(path)
+    ext = os.path.splitext(path)[1]
+    dest_dir = os.path.join(SNAPSHOT_DIR, source)
+    dest = os.path.join(dest_dir, f"{digest}{ext}.gz")
+
+    if os.path.exists(dest):
+        os.utime(dest)
+        logger.debug("[%s] snapshot %s already archived", source, digest[:12])
+    else:
+        os.makedirs(dest_dir, exist_ok=True)
+        tmp = dest + ".tmp"
+        with open(path, "rb") as src, gzip.open(tmp, "wb") as out:
+            shutil.copyfileobj(src, out, _CHUNK)
+        os.replace(tmp, dest)
+        logger.info("[%s] archived snapshot %s → %s", source, digest[:12], dest)
+
+    return Snapshot(source, digest, dest)
+
+
+def restore(snapshot_path: str, dest: str) -> str:
+    """Decompress an archived snapshot back to `dest` and return it."""
+    with gzip.open(snapshot_path, "rb") as src, open(dest, "wb") as out:
+        shutil.copyfileobj(src, out, _CHUNK)
+    return dest
+
+
+def list_snapshots(source: str) -> List[str]:
+    """Archived snapshot paths for a source, oldest first."""
+    src_dir = os.path.join(SNAPSHOT_DIR, source)
+    if not os.path.isdir(src_dir):
+        return []
+    return sorted(
+        (os.path.join(src_dir, f) for f in os.listdir(src_dir) if f.endswith(".gz")),
+        key=os.path.getmtime,
+    )
+
+
+def original_extension(snapshot_path: str) -> str:
+    """The raw file's extension, e.g. '.csv' for '<sha>.csv.gz'."""
+    return os.path.splitext(snapshot_path[: -len(".gz")])[1]
+
+
+def prune(retention_days: Optional[int] = None) -> int:
+    """
+    Delete snapshots not touched within `retention_days`, always keeping the
+    newest one per source. Returns the number of files removed.
+    """
+    if retention_days is None:
+        retention_days = SNAPSHOT_RETENTION_DAYS
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return 0
+
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+    for source in os.listdir(SNAPSHOT_DIR):
+        src_dir = os.path.join(SNAPSHOT_DIR, source)
+        if not os.path.isdir(src_dir):
+            continue
+        files = sorted(
+            (
+                os.path.join(src_dir, f)
+                for f in os.listdir(src_dir)
+                if f.endswith(".gz")
+            ),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for old in files[1:]:
+            if os.path.getmtime(old) < cutoff:
+                os.remove(old)
+                removed += 1
+    if removed:
+        logger.info("Pruned %d snapshots older than %d days", removed, retention_days)
+    return removed
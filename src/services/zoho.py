@@ -3,7 +3,6 @@ from datetime import datetime, timedelta
 
 import pandas as pd
 import requests
-from sqlalchemy import text
 
 from config import (
     ZOHO_API_BASE,
@@ -14,13 +13,41 @@ from config import (
 )
 from db.models import CollectionSite
 from db.session import SessionLocal
+from services import site_index
+from services.zoho_limits import insert_credits, limiter
+from services.zoho_payload import encode_body
 
 logger = logging.getLogger(__name__)
 
+# Attempts per call while Zoho answers 429 Too Many Requests
+RATE_LIMITED_ATTEMPTS = 3
+
 # In-memory cache for the OAuth token
 _token_cache = {"access_token": None, "expires_at": datetime.utcnow()}
 
 
+def _request(
+    op: str,
+    method: str,
+    url: str,
+    credits: int = 1,
+    interactive: bool = False,
+    **kwargs,
+) -> requests.Response:
+    """
+    Send a Zoho request through the shared limiter (see zoho_limits): wait
+    for `op`'s rate limit, count its `credits`, and retry after Zoho's
+    Retry-After while it answers 429.
+    """
+    for _ in range(RATE_LIMITED_ATTEMPTS):
+        limiter.acquire(op, credits, interactive)
+        resp = requests.request(method, url, **kwargs)
+        limiter.observe(op, resp)
+        if resp.status_code != 429:
+            break
+    return resp
+
+
 def _get_access_token() -> str:
     """
     Refresh & cache an OAuth access token using your refresh token.
@@ -38,7 +65,8 @@ def _get_access_token() -> str:
         "grant_type": "refresh_token",
     }
 
-    resp = requests.post(auth_url, data=payload)
+    # Token refreshes cost no credits but Zoho caps them per refresh token
+    resp = _request("token", "POST", auth_url, credits=0, data=payload)
     if resp.status_code != 200:
         logger.error("Zoho token refresh failed (%d): %s", resp.status_code, resp.text)
         resp.raise_for_status()
@@ -51,106 +79,50 @@ def _get_access_token() -> str:
     return token
 
 
-def _attach_lookup_ids(
-    records, crmcode_to_recordid, site_id_to_recordid, lab_name_to_id
-):
-    """
-    Given a list of plain‐dict records (with 'CCFID', 'Code', 'Collection_Site_ID',
-    'Laboratory' as strings), return a new list where:
-     - 'Name' is set to the CCFID (Zoho primary field)
-     - Company/Collection_Site/Laboratory are replaced with {"id": bigint}
-     - All staging-only keys (CCFID, Code, Collection_Site_ID) are removed
-    Strips any leading "zcrm_" from your DB values.
-    """
-
-    def strip_zcrm(val: str) -> str:
-        return val[len("zcrm_") :] if val.startswith("zcrm_") else val
-
-    out = []
-    for rec in records:
-        r = rec.copy()
-
-        # 0) set Zoho primary Name = CCFID
-        raw_ccfid = r.get("CCFID", "").strip()
-        if raw_ccfid:
-            r["Name"] = raw_ccfid
-        # drop the staging CCFID field
-        r.pop("CCFID", None)
-
-        # 1) COMPANY lookup (zoho API field = "Company"), keyed off your local "Code"
-        raw_code = r.pop("Code", "").strip()
-        if raw_code:
-            zoho_acct_str = crmcode_to_recordid.get(raw_code)
-            if zoho_acct_str:
-                r["Company"] = {"id": int(strip_zcrm(zoho_acct_str))}
-
-        # 2) COLLECTION SITE lookup
-        raw_site = r.pop("Collection_Site_ID", "").strip()
-        if raw_site:
-            zoho_site_str = site_id_to_recordid.get(raw_site)
-            if zoho_site_str:
-                r["Collection_Site"] = {"id": int(strip_zcrm(zoho_site_str))}
-
-        # 3) LABORATORY lookup
-        raw_lab = r.get("Laboratory", "")
-        if isinstance(raw_lab, str) and raw_lab.strip():
-            zoho_lab_str = lab_name_to_id.get(raw_lab.strip())
-            if zoho_lab_str:
-                r["Laboratory"] = {"id": int(strip_zcrm(zoho_lab_str))}
-
-        out.append(r)
-    return out
-
-
-def push_records(records: list[dict]) -> list[str]:
+def insert_records(payload: list[dict], interactive: bool = False) -> list[dict]:
     """
-    Reads the three lookup tables out of your DB, attaches the Zoho IDs
-    to each record, posts to Zoho, and returns the list of CCFIDs that
-    succeeded.
+    Posts records built by zoho_payload.build_payload() (lookup ids already
+    attached) to Zoho in one insert call and returns Zoho's per-record
+    results, in payload order ({"status": "success", "details": {"id": ...}}
+    or the error code, message and details). Interactive pushes may spend
+    the credits ZOHO_INTERACTIVE_RESERVE keeps back from background work.
     """
-    if not records:
+    if not payload:
         return []
 
-    db = SessionLocal()
-    # account_info(account_code, account_id)
-    crm_map = {
-        code: rid.replace("zcrm_", "")
-        for code, rid in db.execute(
-            text("SELECT account_code, account_id FROM account_info")
-        ).all()
-    }
-    # collection_sites( Collection_Site_ID, Record_id )
-    site_map = {
-        cs.Collection_Site_ID: cs.Record_id for cs in db.query(CollectionSite).all()
-    }
-    # laboratories( Laboratory, Record_id )
-    lab_map = {
-        lab.strip(): rid.replace("zcrm_", "")
-        for rid, lab in db.execute(
-            text('SELECT "Record_id","Laboratory" FROM laboratories')
-        ).all()
-    }
-    db.close()
-
-    # swap in the lookup IDs
-    batch = _attach_lookup_ids(records, crm_map, site_map, lab_map)
-
-    # push
     token = _get_access_token()
     url = f"{ZOHO_API_BASE}/crm/v2/{ZOHO_MODULE}"
-    headers = {
-        "Authorization": f"Zoho-oauthtoken {token}",
-        "Content-Type": "application/json",
-    }
-    logger.info("Pushing %d records to Zoho…", len(batch))
-    resp = requests.post(url, json={"data": batch}, headers=headers)
+    body, headers = encode_body(payload)
+    headers["Authorization"] = f"Zoho-oauthtoken {token}"
+    logger.info("Pushing %d records to Zoho (%d bytes)…", len(payload), len(body))
+    resp = _request(
+        "insert",
+        "POST",
+        url,
+        credits=insert_credits(len(payload)),
+        interactive=interactive,
+        data=body,
+        headers=headers,
+    )
     resp.raise_for_status()
 
     data = resp.json().get("data", [])
+    if len(data) < len(payload):
+        # Every record needs an outcome; treat unanswered ones as failed
+        missing = {"status": "error", "code": "NO_RESULT", "message": "no result"}
+        data = data + [missing] * (len(payload) - len(data))
+    return data
+
+
+def push_records(payload: list[dict], interactive: bool = False) -> list[str]:
+    """
+    Posts records to Zoho (see insert_records) and returns the Names
+    (CCFIDs) of the records that succeeded.
+    """
     successes, failures = [], []
-    for orig, result in zip(records, data):
+    for orig, result in zip(payload, insert_records(payload, interactive)):
         if result.get("status") == "success":
-            successes.append(orig["Name"])  # assumes your CCFID was in Name
+            successes.append(orig["Name"])  # Name carries the CCFID
         else:
             failures.append((orig, result))
             logger.warning("Zoho rejected: %r → %r", orig, result)
@@ -159,7 +131,8 @@ def push_records(records: list[dict]) -> list[str]:
         logger.error(
             "Zoho rejected %d records; none will be marked uploaded", len(failures)
         )
-    logger.info("Zoho accepted %d/%d", len(successes), len(records))
+    if payload:
+        logger.info("Zoho accepted %d/%d", len(successes), len(payload))
     return successes
 
 
@@ -195,31 +168,33 @@ def sync_collection_sites_to_crm(site_df: pd.DataFrame) -> dict[str, str]:
     created = []
     if to_create:
         token = _get_access_token()
-        headers = {
-            "Authorization": f"Zoho-oauthtoken {token}",
-            "Content-Type": "application/json",
-        }
         url = f"{ZOHO_API_BASE}/crm/v2/Collection_Sites"
         for i in range(0, len(to_create), 100):
             batch = to_create[i : i + 100]
-            resp = requests.post(
+            body, headers = encode_body(
+                [
+                    {
+                        "Name": x["Collection_Site"],
+                        "Collection_Site_ID": x["Collection_Site_ID"],
+                    }
+                    for x in batch
+                ]
+            )
+            headers["Authorization"] = f"Zoho-oauthtoken {token}"
+            resp = _request(
+                "sites",
+                "POST",
                 url,
+                credits=insert_credits(len(batch)),
+                data=body,
                 headers=headers,
-                json={
-                    "data": [
-                        {
-                            "Name": x["Collection_Site"],
-                            "Collection_Site_ID": x["Collection_Site_ID"],
-                        }
-                        for x in batch
-                    ]
-                },
             )
             resp.raise_for_status()
             for req, zoho in zip(batch, resp.json().get("data", [])):
                 req["Record_id"] = zoho.get("details", {}).get("id", "")
                 created.append(req)
         add_collection_sites_to_db(created)
+        site_index.invalidate()
     all_sites = db.query(CollectionSite).all()
     db.close()
     return {s.Collection_Site_ID: s.Record_id for s in all_sites}
@@ -249,7 +224,7 @@ def fetch_uploaded_ccfids():
             "per_page": per_page,
             "fields": "Name",  # Only fetch Name/CCFID for efficiency
         }
-        resp = requests.get(url, headers=headers, params=params)
+        resp = _request("read", "GET", url, headers=headers, params=params)
         resp.raise_for_status()
         data = resp.json().get("data", [])
         if not data:
@@ -0,0 +1,244 @@
+"""
+Client-side pacing and API-credit budgeting for Zoho calls.
+
+Every Zoho request in services.zoho goes through ``limiter.acquire(op,
+credits)`` before it is sent and ``limiter.observe(op, response)`` after:
+
+- each operation type (insert, sites, read, token) has a token bucket of
+  ZOHO_RATE_LIMITS calls per minute, so a backfill cannot burst,
+- credits spent are counted per operation and added to the run report;
+  background calls stop (ZohoCreditsExhausted) once they would cut into
+  the last ZOHO_INTERACTIVE_RESERVE credits of ZOHO_CREDIT_BUDGET (per run,
+  or per UTC day for long-running processes) or of the org's remaining
+  credits, which are kept for interactive worklist pushes,
+- Zoho's X-RATELIMIT-* headers update the org's remaining credits and
+  reset time; background calls are spread so the credits above the reserve
+  last until the reset, and a 429 pauses the operation until Retry-After.
+
+All of this state lives in the process: two processes do not see each
+other's calls or spending. With ZOHO_PROCESSES set to how many run at once,
+each limiter takes that share of the rates, the budget and its reserve, and
+spaces background calls that many times further apart. Zoho's own counters
+(the headers above) are org-wide and are used as they come.
+"""
+
+import datetime
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import (
+    ZOHO_CREDIT_BUDGET,
+    ZOHO_INTERACTIVE_RESERVE,
+    ZOHO_PROCESSES,
+    ZOHO_RATE_LIMITS,
+)
+from services.run_report import report
+
+logger = logging.getLogger(__name__)
+
+# Calls per minute for operations missing from ZOHO_RATE_LIMITS
+DEFAULT_RATE = 60
+
+
+class ZohoCreditsExhausted(RuntimeError):
+    """A background call would spend credits reserved for interactive use."""
+
+
+def insert_credits(records: int) -> int:
+    """Zoho bills record inserts at one credit per 10 records."""
+    return max(math.ceil(records / 10), 1)
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """Parse "insert=100,read=60" into calls per minute by operation."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        op, _, rate = item.partition("=")
+        rates[op.strip()] = max(float(rate), 0.1)
+    return rates
+
+
+def _utc_today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def _reset_seconds(value: str) -> Optional[float]:
+    # Zoho sends the reset as epoch milliseconds; accept epoch seconds or a
+    # delay in seconds too
+    try:
+        reset = float(value)
+    except (TypeError, ValueError):
+        return None
+    if reset > 1e12:
+        return reset / 1000 - time.time()
+    if reset > 1e9:
+        return reset - time.time()
+    return reset
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60
+        self.capacity = max(per_minute / 6, 1.0)  # up to 10 seconds' worth at once
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def take(self) -> float:
+        """Take a token, or return how long to wait before one is available."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ZohoLimiter:
+    def __init__(
+        self,
+        rates: Dict[str, float],
+        budget: int,
+        reserve: int,
+        processes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        # This process's share of limits set for all `processes` together
+        self.processes = processes
+        self.rates = {op: rate / processes for op, rate in rates.items()}
+        self.default_rate = DEFAULT_RATE / processes
+        self.budget = budget // processes
+        self.reserve = reserve // processes
+        # The org's remaining credits are shared, so all of the reserve
+        # is held back from them
+        self.org_reserve = reserve
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+        self.usage: Dict[str, int] = {}
+        self.day = _utc_today()
+        # From Zoho's headers: org credits left and when they reset
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.paused_until: Dict[str, float] = {}
+        self.next_background = 0.0
+        # Requests let through since the process started
+        self.calls = 0
+
+    def start_run(self) -> None:
+        """Start counting credits for a new pipeline run."""
+        with self.lock:
+            self.usage.clear()
+            self.day = _utc_today()
+
+    @property
+    def spent(self) -> int:
+        return sum(self.usage.values())
+
+    def _bucket(self, op: str) -> TokenBucket:
+        if op not in self.buckets:
+            self.buckets[op] = TokenBucket(
+                self.rates.get(op, self.default_rate), self.clock
+            )
+        return self.buckets[op]
+
+    def _check_budget(self, op: str, credits: int) -> None:
+        if self.budget and self.spent + credits > self.budget - self.reserve:
+            raise ZohoCreditsExhausted(
+                f"{op}: {self.spent} of {self.budget} credits spent; "
+                f"the last {self.reserve} are reserved for interactive pushes"
+            )
+        now = self.clock()
+        if self.remaining is not None and (
+            self.reset_at is None or now < self.reset_at
+        ):
+            if self.remaining - credits < self.org_reserve:
+                raise ZohoCreditsExhausted(
+                    f"{op}: Zoho reports {self.remaining} credits left, "
+                    f"{self.org_reserve} reserved for interactive pushes"
+                )
+
+    def acquire(self, op: str, credits: int = 1, interactive: bool = False) -> None:
+        """
+        Wait for `op`'s rate limit (and any 429 pause), then count `credits`.
+        Background calls raise ZohoCreditsExhausted instead of spending the
+        reserve, and are paced to make the remaining credits last.
+        """
+        while True:
+            with self.lock:
+                today = _utc_today()
+                if today != self.day:
+                    self.usage.clear()
+                    self.day = today
+                if not interactive and credits:
+                    self._check_budget(op, credits)
+                now = self.clock()
+                wait = self.paused_until.get(op, 0.0) - now
+                if wait <= 0 and not interactive and credits:
+                    wait = self.next_background - now
+                if wait <= 0:
+                    wait = self._bucket(op).take()
+                if wait <= 0:
+                    self.usage[op] = self.usage.get(op, 0) + credits
+                    self.calls += 1
+                    if not interactive and credits:
+                        self.next_background = now + credits * self._credit_interval()
+                    break
+            self.sleep(min(wait, 60.0))
+        if credits:
+            report.add("zoho", f"credits_{op}", credits)
+
+    def _credit_interval(self) -> float:
+        """
+        Seconds per background credit that make the spare credits last,
+        with the other processes spending them too.
+        """
+        if self.remaining is None or self.reset_at is None:
+            return 0.0
+        spare = self.remaining - self.org_reserve
+        left = self.reset_at - self.clock()
+        if left <= 0:
+            return 0.0
+        return left / max(spare, 1) * self.processes
+
+    def observe(self, op: str, response) -> None:
+        """Take in Zoho's rate-limit headers (and a 429's Retry-After)."""
+        headers = response.headers
+        with self.lock:
+            remaining = headers.get("X-RATELIMIT-REMAINING")
+            if remaining is not None and remaining.strip().lstrip("-").isdigit():
+                self.remaining = int(remaining)
+            reset = _reset_seconds(headers.get("X-RATELIMIT-RESET"))
+            if reset is not None:
+                self.reset_at = self.clock() + max(reset, 0)
+            if response.status_code == 429:
+                delay = _reset_seconds(headers.get("Retry-After"))
+                if delay is None:
+                    delay = reset if reset is not None else 60.0
+                self.paused_until[op] = self.clock() + max(delay, 1.0)
+                logger.warning("Zoho rate limit hit on %s; pausing %.0fs", op, delay)
+
+    def log_summary(self) -> None:
+        if not self.usage:
+            return
+        logger.info(
+            "[zoho] credits used: %s (total %d%s)",
+            ", ".join(f"{op}={n}" for op, n in sorted(self.usage.items())),
+            self.spent,
+            f" of {self.budget}" if self.budget else "",
+        )
+
+
+# Process-wide limiter every Zoho call goes through
+limiter = ZohoLimiter(
+    parse_rates(ZOHO_RATE_LIMITS),
+    ZOHO_CREDIT_BUDGET,
+    ZOHO_INTERACTIVE_RESERVE,
+    ZOHO_PROCESSES,
+)
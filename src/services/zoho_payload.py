@@ -0,0 +1,126 @@
+"""
+Zoho insert payloads built from normalized DataFrames.
+
+Lookup fields (Company, Collection_Site, Laboratory) are sent to Zoho as
+{"id": <record id>}. LookupMaps holds those record ids as Int64 Series,
+parsed once when the maps are loaded ("zcrm_" prefix stripped); Zoho ids
+are 19 digits, so they are never routed through floats. build_payload()
+resolves every row's lookups with one reindex per field, and encode_body()
+serializes a request body with orjson, gzipping bodies of at least
+ZOHO_GZIP_MIN_BYTES.
+"""
+
+import gzip
+import logging
+from typing import Dict, List, NamedTuple, Tuple
+
+import orjson
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from config import ZOHO_GZIP_MIN_BYTES
+from db.models import CollectionSite, Company, Laboratory
+
+logger = logging.getLogger(__name__)
+
+# Staging-only columns that are not Zoho fields
+STAGING_ONLY = ["CCFID", "Code", "Collection_Site_ID"]
+
+# Zoho lookup field → normalized column holding its key
+LOOKUPS = {
+    "Company": "Code",
+    "Collection_Site": "Collection_Site_ID",
+    "Laboratory": "Laboratory",
+}
+
+
+class LookupMaps(NamedTuple):
+    companies: pd.Series  # account_code → account record id
+    sites: pd.Series  # Collection_Site_ID → collection site record id
+    labs: pd.Series  # laboratory name → laboratory record id
+
+    def for_field(self, field: str) -> pd.Series:
+        return {
+            "Company": self.companies,
+            "Collection_Site": self.sites,
+            "Laboratory": self.labs,
+        }[field]
+
+
+def record_ids(mapping: Dict[str, str]) -> pd.Series:
+    """
+    {key: stored record id} → Int64 Series indexed by the stripped key.
+    Stored ids may carry the "zcrm_" prefix; blank or malformed ids are
+    skipped with a warning.
+    """
+    ids = {}
+    for key, value in mapping.items():
+        if key is None or not value or not str(key).strip():
+            continue
+        raw = str(value).strip().removeprefix("zcrm_")
+        if not raw.isdigit():
+            logger.warning("Skipping lookup %r: bad Zoho record id %r", key, value)
+            continue
+        ids[str(key).strip()] = int(raw)
+    return pd.Series(ids, dtype="Int64")
+
+
+def load_lookup_maps(db: Session, sites: Dict[str, str] = None) -> LookupMaps:
+    """
+    Company, collection-site and laboratory ids from the database. Pass
+    `sites` (e.g. from sync_collection_sites_to_crm) to skip that query.
+    """
+    if sites is None:
+        sites = dict(
+            db.query(CollectionSite.Collection_Site_ID, CollectionSite.Record_id)
+        )
+    return LookupMaps(
+        companies=record_ids(dict(db.query(Company.account_code, Company.account_id))),
+        sites=record_ids(sites),
+        labs=record_ids(dict(db.query(Laboratory.Laboratory, Laboratory.Record_id))),
+    )
+
+
+def _keys(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str).str.strip()
+
+
+def build_payload(df: pd.DataFrame, maps: LookupMaps) -> List[dict]:
+    """
+    Zoho records for the rows of a normalized frame: Name is the CCFID,
+    lookup fields whose key resolves become {"id": ...} (unresolved ones
+    keep their text), and the staging-only columns are dropped.
+    """
+    out = df.drop(columns=[c for c in STAGING_ONLY if c in df.columns])
+    ccfid = _keys(df, "CCFID")
+    out["Name"] = ccfid.where(ccfid != "", out["Name"]) if "Name" in out else ccfid
+
+    for field, key_col in LOOKUPS.items():
+        ids = maps.for_field(field).reindex(_keys(df, key_col).to_numpy()).array
+        found = ~ids.isna()
+        if not found.any():
+            continue
+        values = (
+            out[field].to_numpy(dtype=object, copy=True)
+            if field in out
+            else pd.Series(None, index=out.index, dtype=object).to_numpy()
+        )
+        values[found] = [{"id": i} for i in ids[found].to_numpy("int64").tolist()]
+        out[field] = values
+
+    # Row dicts from per-column lists: much cheaper than to_dict("records")
+    names = list(out.columns)
+    columns = [out[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def encode_body(data: List[dict]) -> Tuple[bytes, Dict[str, str]]:
+    """The JSON request body {"data": data} and its content headers."""
+    body = orjson.dumps({"data": data}, option=orjson.OPT_SERIALIZE_NUMPY)
+    headers = {"Content-Type": "application/json"}
+    if ZOHO_GZIP_MIN_BYTES and len(body) >= ZOHO_GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
@@ -1,7 +1,33 @@
 # src/utils.py
+import datetime
+import logging
+
+import pandas as pd
 
 from normalize.common import MASTER_COLUMNS
 
+logger = logging.getLogger(__name__)
+
+# Normalized record key -> worklist_staging column
+STAGING_FIELD_MAP = {
+    "CCFID": "ccfid",
+    "First_Name": "first_name",
+    "Last_Name": "last_name",
+    "Primary_ID": "primary_id",
+    "Company": "company_name",
+    "Code": "company_code",
+    "Collection_Date": "collection_date",
+    "MRO_Received": "mro_received",
+    "Collection_Site_ID": "collection_site_id",
+    "Collection_Site": "collection_site",
+    "Laboratory": "laboratory",
+    "Location": "location",
+    "Test_Reason": "test_reason",
+    "Test_Result": "test_result",
+    "Test_Type": "test_type",
+    "Regulation": "regulation",
+}
+
 
 def is_complete(record: dict) -> bool:
 
@@ -27,3 +53,32 @@ def is_complete(record: dict) -> bool:
             return False
 
     return True
+
+
+def _parse_staging_date(val, col_name, ccfid):
+    if not (isinstance(val, str) and val.strip()):
+        return None
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.datetime.strptime(val, fmt).date()
+        except ValueError:
+            continue
+    logger.warning(f"Failed to parse {col_name}='{val}' for CCFID {ccfid}")
+    return None
+
+
+def to_staging_rows(records: list, now: datetime.datetime) -> list:
+    """Map normalized records to worklist_staging rows (unreviewed, stamped `now`)."""
+    mapped = []
+    for rec in records:
+        row = {}
+        for src_key, col_name in STAGING_FIELD_MAP.items():
+            val = rec.get(src_key)
+            if col_name in ("collection_date", "mro_received"):
+                row[col_name] = _parse_staging_date(val, col_name, rec.get("CCFID"))
+            else:
+                row[col_name] = "" if pd.isna(val) else str(val)
+        row["reviewed"] = False
+        row["uploaded_timestamp"] = now
+        mapped.append(row)
+    return mapped
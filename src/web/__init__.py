@@ -1,15 +1,29 @@
 # src/web/__init__.py
 
+import logging
+
 from flask import Flask
 
+from db.migrations import SchemaVersionError, check_schema
+
+from .api import bp as api_bp
 from .routes import bp as web_bp
 
+logger = logging.getLogger(__name__)
+
 
 def create_app():
     app = Flask(__name__, static_folder="static", template_folder="templates")
     app.register_blueprint(web_bp)
+    app.register_blueprint(api_bp)
 
     # Make Python's getattr() available in Jinja templates
     app.jinja_env.globals["getattr"] = getattr
 
+    # The pipeline owns migrations; the web app only reports a stale schema
+    try:
+        app.config["SCHEMA_VERSION"] = check_schema()
+    except SchemaVersionError as e:
+        logger.error("%s", e)
+
     return app
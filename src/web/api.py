@@ -0,0 +1,186 @@
+# web/api.py
+"""
+JSON API behind the worklist pages.
+
+    GET /api/worklist?page=1&per_page=500   unreviewed staging rows
+    GET /api/worklist/<ccfid>               one staging row
+    GET /api/reference/<name>               sites, companies or laboratories
+    GET /api/sites/typeahead?q=quest&limit=10   best-matching collection sites
+
+The typeahead answers from an in-memory index (services.site_index); the
+other endpoints carry an ETag and Last-Modified derived from the table_versions
+counters of the tables they read (kept by triggers, see db.migrations), and
+a request whose If-None-Match / If-Modified-Since still matches gets a 304
+after a single primary-key lookup. Bodies are cached in-process (web.cache)
+until those counters move.
+"""
+
+import datetime
+import hashlib
+from typing import Callable, Dict, Hashable, Sequence
+
+import orjson
+from flask import Blueprint, Response, abort, jsonify, request
+
+from config import API_CACHE_ENTRIES, API_PAGE_SIZE, SITE_TYPEAHEAD_MAX
+from db.models import CollectionSite, Company, Laboratory, WorklistStaging
+from db.repository import TableVersionRepo, WorklistStagingRepo
+from db.session import SessionLocal
+from services.site_index import current_index
+from web.cache import CachedResponse, VersionedCache
+
+bp = Blueprint("api", __name__, url_prefix="/api")
+
+cache = VersionedCache(API_CACHE_ENTRIES)
+
+STAGING = WorklistStaging.__tablename__
+
+
+def _row(item: WorklistStaging) -> Dict:
+    return {c.key: getattr(item, c.key) for c in WorklistStaging.__table__.columns}
+
+
+def _not_modified(etag: str, last_modified) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return bool(since and last_modified and last_modified <= since)
+
+
+def versioned_json(key: Hashable, tables: Sequence[str], build: Callable) -> Response:
+    """
+    Respond with build(db) as JSON, or 304 when the client's copy is still
+    current. The body is built at most once per version of `tables`.
+    """
+    db = SessionLocal()
+    try:
+        versions = TableVersionRepo(db).get(tables)
+        stamp = tuple(versions[table][0] for table in tables)
+        etag = hashlib.blake2b(repr((key, stamp)).encode(), digest_size=12).hexdigest()
+        changed = [at for _, at in versions.values() if at is not None]
+        last_modified = (
+            max(changed).replace(microsecond=0, tzinfo=datetime.timezone.utc)
+            if changed
+            else None
+        )
+
+        if _not_modified(etag, last_modified):
+            resp = Response(status=304)
+        else:
+            entry = cache.get(key, stamp)
+            if entry is None:
+                body = orjson.dumps(build(db), option=orjson.OPT_NON_STR_KEYS)
+                entry = cache.put(key, CachedResponse(stamp, etag, body))
+            resp = Response(entry.body, mimetype="application/json")
+    finally:
+        db.close()
+
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    # Browsers keep the body but revalidate it on every use
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
+
+
+@bp.errorhandler(404)
+def not_found(error):
+    return jsonify(error=error.description), 404
+
+
+@bp.route("/worklist")
+def worklist_page():
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(
+        max(request.args.get("per_page", API_PAGE_SIZE, type=int), 1), API_PAGE_SIZE
+    )
+
+    def build(db):
+        repo = WorklistStagingRepo(db)
+        return {
+            "page": page,
+            "per_page": per_page,
+            "count": repo.count_pending(),
+            "items": [_row(item) for item in repo.pending_page(page, per_page)],
+        }
+
+    return versioned_json(("worklist", page, per_page), [STAGING], build)
+
+
+@bp.route("/worklist/<string:ccfid>")
+def worklist_record(ccfid):
+    def build(db):
+        item = WorklistStagingRepo(db).get(ccfid)
+        if item is None:
+            abort(404, f"Record {ccfid} not found.")
+        return _row(item)
+
+    return versioned_json(("record", ccfid), [STAGING], build)
+
+
+def _sites(db) -> Dict:
+    rows = (
+        db.query(CollectionSite.Collection_Site, CollectionSite.Collection_Site_ID)
+        .filter(CollectionSite.Collection_Site.isnot(None))
+        .filter(CollectionSite.Collection_Site != "")
+        .distinct()
+        .order_by(CollectionSite.Collection_Site)
+        .all()
+    )
+    return {"sites": [r[0] for r in rows], "site_map": {r[0]: r[1] for r in rows}}
+
+
+def _companies(db) -> Dict:
+    rows = (
+        db.query(Company.account_code, Company.account_name)
+        .filter(Company.account_code.isnot(None))
+        .order_by(Company.account_code)
+        .all()
+    )
+    return {"companies": [{"code": code, "name": name} for code, name in rows]}
+
+
+def _laboratories(db) -> Dict:
+    rows = (
+        db.query(Laboratory.Laboratory)
+        .filter(Laboratory.Laboratory.isnot(None))
+        .order_by(Laboratory.Laboratory)
+        .all()
+    )
+    return {"laboratories": [r[0] for r in rows]}
+
+
+# name → (table, builder)
+REFERENCE_LISTS = {
+    "sites": (CollectionSite.__tablename__, _sites),
+    "companies": (Company.__tablename__, _companies),
+    "laboratories": (Laboratory.__tablename__, _laboratories),
+}
+
+
+@bp.route("/reference/<string:name>")
+def reference_list(name):
+    if name not in REFERENCE_LISTS:
+        abort(404, f"Unknown reference list {name!r}.")
+    table, build = REFERENCE_LISTS[name]
+    return versioned_json(("reference", name), [table], build)
+
+
+@bp.route("/sites/typeahead")
+def site_typeahead():
+    """Sites matching `q` (prefix, then typo-tolerant) with their site IDs."""
+    query = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", 10, type=int), 1), SITE_TYPEAHEAD_MAX)
+    db = SessionLocal()
+    try:
+        matches = current_index(db).search(query, limit)
+    finally:
+        db.close()
+    return jsonify(
+        query=query,
+        sites=[
+            {"site": m.site, "site_id": m.site_id, "score": round(m.score, 1)}
+            for m in matches
+        ],
+    )
@@ -0,0 +1,51 @@
+# web/cache.py
+"""
+In-process response cache for the JSON API.
+
+Each entry remembers the table_versions counters it was built from, and a
+lookup with other counters misses and replaces it. Any write to staging or
+the reference tables, from any process, bumps a counter, so entries go
+stale without explicit invalidation. The least recently used entries are
+evicted beyond `max_entries`.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional, Tuple
+
+
+class CachedResponse(NamedTuple):
+    versions: Tuple[int, ...]
+    etag: str
+    body: bytes
+
+
+class VersionedCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, versions: Tuple[int, ...]) -> Optional[CachedResponse]:
+        """The entry for `key` if it was built at `versions`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.versions != versions:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> CachedResponse:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,23 +1,16 @@
 # web/routes.py
 
 import datetime
-import io
 import os
 
-import pandas as pd
 from flask import Blueprint, flash, redirect, render_template, request, url_for
 from sqlalchemy import text
 from werkzeug.utils import secure_filename
 
-from src.db.models import CollectionSite, Company, Laboratory, WorklistStaging
-from src.db.session import SessionLocal
-from src.normalize.crl import normalize as norm_crl
-from src.normalize.escreen import normalize_escreen
-from src.normalize.i3screen import normalize_i3screen
-from src.scrapers.crl import scrape_crl
-from src.scrapers.i3 import scrape_i3
-from src.services.zoho import _attach_lookup_ids, push_records
-from src.utils import is_complete
+from db.repository import PipelineRunRepo, SourceRunRepo, WorklistStagingRepo
+from db.session import SessionLocal
+from services import snapshots
+from services.run_history import stage_trends
 
 bp = Blueprint("web", __name__)
 
@@ -39,21 +32,21 @@ def index():
 
 @bp.route("/worklist")
 def worklist():
-    """Show all unreviewed staging items."""
-    db = SessionLocal()
-    items = (
-        db.query(WorklistStaging)
-        .filter_by(reviewed=False)
-        .order_by(WorklistStaging.ccfid)
-        .all()
-    )
-    return render_template("worklist.html", items=items)
+    """Show all unreviewed staging items (rows load from /api/worklist)."""
+    return render_template("worklist.html")
 
 
 @bp.route("/worklist/<string:ccfid>", methods=["GET", "POST"])
 def worklist_detail(ccfid):
+    # pandas and the Zoho client load on first push, not at worker boot
+    import pandas as pd
+
+    from services.zoho import push_records
+    from services.zoho_payload import build_payload, load_lookup_maps
+
     db = SessionLocal()
-    item = db.get(WorklistStaging, ccfid)
+    repo = WorklistStagingRepo(db)
+    item = repo.get(ccfid)
     if not item:
         flash(f"Record {ccfid} not found.", "error")
         return redirect(url_for("web.worklist"))
@@ -76,11 +69,10 @@ def worklist_detail(ccfid):
             "test_result",
             "regulation",
         ]
-        for f in editable:
-            if f in request.form:
-                val = request.form[f].strip()
-                setattr(item, f, val or None)
-        db.commit()
+        edits = {
+            f: request.form[f].strip() or None for f in editable if f in request.form
+        }
+        repo.update_many([ccfid], **edits)
 
         # 2) Build the Zoho payload:
         record = {
@@ -102,39 +94,25 @@ def worklist_detail(ccfid):
             "Regulation": item.regulation,
             "Name": str(item.ccfid),
         }
-        company_map = {
-            c.account_code: c.account_id.replace("zcrm_", "")
-            for c in db.query(Company).all()
-        }
-        site_map = {
-            s.Collection_Site_ID: s.Record_id.replace("zcrm_", "")
-            for s in db.query(CollectionSite).all()
-        }
-        lab_map = {
-            l.Laboratory: l.Record_id.replace("zcrm_", "")
-            for l in db.query(Laboratory).all()
-        }
-
-        payload = _attach_lookup_ids([record], company_map, site_map, lab_map)
-
         # ISO‐format any date fields
         for df in ("Collection_Date", "MRO_Received"):
-            v = payload[0].get(df)
+            v = record.get(df)
             if isinstance(v, (datetime.date, datetime.datetime)):
-                payload[0][df] = v.isoformat()
+                record[df] = v.isoformat()
+
+        payload = build_payload(pd.DataFrame([record]), load_lookup_maps(db))
 
         # 3) Push to Zoho and only mark reviewed on success:
         try:
-            accepted = push_records(payload)
+            accepted = push_records(payload, interactive=True)
             if ccfid in accepted:
                 # Mark reviewed *now* that it really succeeded
-                item.reviewed = True
-                item.uploaded_timestamp = datetime.datetime.utcnow()
+                repo.mark_reviewed_many([ccfid], commit=False)
                 # Record in uploaded_ccfid
                 db.execute(
                     text(
                         "INSERT INTO uploaded_ccfid (ccfid, uploaded_timestamp) "
-                        "VALUES (:ccfid, :ts)"
+                        "VALUES (:ccfid, :ts) ON CONFLICT (ccfid) DO NOTHING"
                     ),
                     {"ccfid": ccfid, "ts": item.uploaded_timestamp},
                 )
@@ -151,23 +129,37 @@ def worklist_detail(ccfid):
 
         return redirect(url_for("web.worklist"))
 
-    # GET: build site autocomplete data as before
-    rows = (
-        db.query(CollectionSite.Collection_Site, CollectionSite.Collection_Site_ID)
-        .filter(CollectionSite.Collection_Site.isnot(None))
-        .filter(CollectionSite.Collection_Site != "")
-        .distinct()
-        .order_by(CollectionSite.Collection_Site)
-        .all()
-    )
-    sites = [r[0] for r in rows]
-    site_map = {r[0]: r[1] for r in rows}
+    # GET: site autocomplete data loads from /api/reference/sites
+    return render_template("worklist_detail.html", item=item)
 
-    return render_template(
-        "worklist_detail.html", item=item, sites=sites, site_map=site_map
+
+def sparkline(values, width=120, height=24):
+    """SVG polyline points for `values`, scaled to width × height."""
+    if not values:
+        return ""
+    top = max(values) or 1
+    step = width / max(len(values) - 1, 1)
+    return " ".join(
+        f"{i * step:.1f},{height - v / top * height:.1f}" for i, v in enumerate(values)
     )
 
 
+@bp.route("/runs")
+def runs():
+    """Recent pipeline runs, their regression alerts and per-stage trends."""
+    limit = min(max(request.args.get("limit", 30, type=int), 1), 200)
+    db = SessionLocal()
+    try:
+        repo = PipelineRunRepo(db)
+        recent = repo.recent(limit)
+        trends = stage_trends(repo.stages_for(run.id for run in recent))
+        return render_template(
+            "runs.html", runs=recent, trends=trends, sparkline=sparkline
+        )
+    finally:
+        db.close()
+
+
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -175,6 +167,9 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 @bp.route("/upload_escreen", methods=["GET", "POST"])
 def upload_escreen():
     if request.method == "POST":
+        # Pulls in pandas and the normalizers; only uploads need them
+        from services.escreen_upload import process_escreen_upload
+
         if "file" not in request.files:
             flash("No file part")
             return redirect(request.url)
@@ -186,10 +181,30 @@ def upload_escreen():
             filename = secure_filename(file.filename)
             filepath = os.path.join(UPLOAD_FOLDER, filename)
             file.save(filepath)
-            results = process_escreen_upload(filepath)
-            msg = f"Upload complete! {results['uploaded']} sent to CRM, {results['inserted']} staged for review."
-            if results["errors"]:
-                msg += f" Errors: {'; '.join(results['errors'])}"
-            flash(msg)
+
+            # Skip files whose exact content was already processed
+            snapshot = snapshots.archive("escreen_upload", filepath)
+            db = SessionLocal()
+            source_runs = SourceRunRepo(db)
+            if source_runs.has_succeeded("escreen_upload", snapshot.sha256):
+                db.close()
+                flash("This file was already processed; nothing new to upload.")
+                return redirect(url_for("web.upload_escreen"))
+            run = source_runs.start("escreen_upload", snapshot.sha256, snapshot.path)
+            try:
+                results = process_escreen_upload(db, filepath)
+            except Exception:
+                db.rollback()
+                source_runs.finish(run, "failed")
+                db.close()
+                raise
+            source_runs.finish(run, "success")
+            db.close()
+            # The outbox pusher (or the next pipeline run) sends the queued rows
+            flash(
+                f"Upload complete! {results['staged']} staged for review, "
+                f"{results['queued']} queued for the CRM: they appear there "
+                "once the outbox is next drained."
+            )
             return redirect(url_for("web.upload_escreen"))
     return render_template("upload_escreen.html")
@@ -1,18 +1,56 @@
 // static/js/main.js
 
-document.addEventListener("DOMContentLoaded", () => {
+// Worklist columns, in table order
+const WORKLIST_FIELDS = [
+  "ccfid", "company_name", "company_code", "first_name", "last_name",
+  "collection_date", "test_type", "test_reason", "test_result", "location",
+  "laboratory", "regulation", "collection_site",
+];
+
+// Fetch every page of the worklist API. The browser revalidates each page
+// with its ETag, so unchanged pages come back as 304s from its cache.
+async function loadWorklist(api) {
+  const items = [];
+  for (let page = 1; ; page++) {
+    const resp = await fetch(`${api}?page=${page}`);
+    if (!resp.ok) throw new Error(`${api} answered ${resp.status}`);
+    const data = await resp.json();
+    items.push(...data.items);
+    if (data.items.length < data.per_page || items.length >= data.count) {
+      return items;
+    }
+  }
+}
+
+function worklistRow(item, detailUrl) {
+  const row = document.createElement("tr");
+  WORKLIST_FIELDS.forEach(field => {
+    const td = document.createElement("td");
+    td.textContent = item[field] ?? "";
+    // 1) Highlight truly empty cells
+    if (!td.textContent.trim()) td.classList.add("missing");
+    row.appendChild(td);
+  });
+  const action = document.createElement("td");
+  const link = document.createElement("a");
+  link.href = detailUrl.replace("__ccfid__", encodeURIComponent(item.ccfid));
+  link.textContent = "Resolve";
+  action.appendChild(link);
+  row.appendChild(action);
+  return row;
+}
+
+document.addEventListener("DOMContentLoaded", async () => {
   const table = document.getElementById("worklist-table");
   const input = document.getElementById("worklist-search");
 
   if (table) {
-    const rows = Array.from(table.tBodies[0].rows);
-
-    // 1) Highlight truly empty cells
-    rows.forEach(row => {
-      row.querySelectorAll("td").forEach(td => {
-        if (!td.innerText.trim()) td.classList.add("missing");
-      });
-    });
+    const items = await loadWorklist(table.dataset.api);
+    const body = table.tBodies[0];
+    const rows = items.map(item => worklistRow(item, table.dataset.detailUrl));
+    body.replaceChildren(...rows);
+    document.getElementById("worklist-empty").hidden = rows.length > 0;
+    table.closest(".table-container").hidden = rows.length === 0;
 
     // 2) Simple client-side search/filter
     if (input) {
@@ -0,0 +1,367 @@
+"""
+Pipeline worker: claims jobs from the pipeline_jobs queue and runs them.
+
+`easy-import-pipeline --enqueue` queues one scrape job per portal account;
+the jobs then fan out:
+
+- scrape:    download the account's export, archive it as a snapshot and,
+             unless it is unchanged since the last successful run, queue a
+             normalize job for it,
+- normalize: detect changed rows, normalize them, stage incomplete rows and
+             queue the complete ones in the Zoho outbox. It holds the
+             source's advisory lock (db.locks), like a pipeline run does;
+             a job whose source is busy is put back without using an
+             attempt.
+
+Run any number of workers on any number of machines; each claims one job
+at a time with FOR UPDATE SKIP LOCKED and heartbeats while it works, and
+jobs of a worker that stops heartbeating are reclaimed by the others.
+Snapshots are handed between jobs by path, so every worker must see the
+same SNAPSHOT_DIR.
+
+Workers that take "push" drain the Zoho outbox (services.outbox) a batch at
+a time whenever no job is waiting; `--kinds push` makes a dedicated pusher.
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import signal
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, List
+
+import pandas as pd
+from sqlalchemy import Text, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from config import (
+    JOB_HEARTBEAT_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_SECONDS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_STALE_SECONDS,
+    LOG_LEVEL,
+    OUTBOX_BATCH_INTERVAL_SECONDS,
+)
+from db.locks import source_locks
+from db.migrations import check_schema
+from db.models import UploadedCcfid
+from db.repository import (
+    JobRepo,
+    OutboxRepo,
+    RowFingerprintRepo,
+    SourceRunRepo,
+    WatermarkRepo,
+    WorklistStagingRepo,
+)
+from db.session import SessionLocal, engine
+from pipeline import SOURCES, changed_batches, scrape_since
+from scrapers.accounts import load_accounts
+from scrapers.browsers import install_browsers
+from services import snapshots
+from services.outbox import advance_watermark, drain_batch, queue_records
+from services.zoho import sync_collection_sites_to_crm
+from services.zoho_payload import build_payload, load_lookup_maps
+from utils import is_complete, to_staging_rows
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("scrape", "normalize")
+# "push" is not a job: it drains the outbox between jobs
+KINDS = JOB_KINDS + ("push",)
+
+# source → (download function, normalizer)
+SOURCE_STEPS = {name: (scrape_fn, norm_fn) for name, scrape_fn, norm_fn, _ in SOURCES}
+
+
+def _no_stage(source, name):
+    return nullcontext()
+
+
+def uploaded_among(db, ccfids: Iterable[str]) -> set:
+    """The given CCFIDs that are already in the uploaded ledger."""
+    ids = list(ccfids)
+    if not ids:
+        return set()
+    stmt = select(UploadedCcfid.ccfid).where(
+        UploadedCcfid.ccfid == any_(bindparam("ids", ids, type_=ARRAY(Text)))
+    )
+    return set(db.scalars(stmt))
+
+
+def handle_scrape(db, job) -> Dict:
+    payload = job.payload
+    source, key = payload["source"], payload["key"]
+    account = next(
+        (a for a in load_accounts(db, [source]) if a.key == key),
+        None,
+    )
+    if account is None:
+        logger.warning("[%s] account is no longer configured; dropping job", key)
+        return {"skipped": "account not configured"}
+
+    since = payload.get("since")
+    since = scrape_since(
+        WatermarkRepo(db).get(key),
+        datetime.date.fromisoformat(since) if since else None,
+    )
+    download, _ = SOURCE_STEPS[source]
+    raw_path = download(since, account)
+
+    snapshot = snapshots.archive(key, raw_path)
+    if not payload.get("force") and (
+        snapshot.sha256 == SourceRunRepo(db).last_success_hash(key)
+    ):
+        logger.info("[%s] export unchanged since last successful run", key)
+        return {"unchanged": snapshot.sha256}
+    JobRepo(db).enqueue(
+        "normalize",
+        {
+            "source": source,
+            "key": key,
+            "sha256": snapshot.sha256,
+            "snapshot_path": snapshot.path,
+            "force": bool(payload.get("force")),
+        },
+        JOB_MAX_ATTEMPTS,
+    )
+    return {"snapshot": snapshot.path}
+
+
+class SourceBusy(Exception):
+    """The job's source is locked by another worker or a pipeline run."""
+
+
+def handle_normalize(db, job) -> Dict:
+    # Two normalize jobs, or a job and a pipeline run (which locks whole
+    # sources), must not race on an account's fingerprints and watermark
+    source = job.payload["source"]
+    with source_locks(engine, [source]) as locked:
+        if not locked:
+            raise SourceBusy(source)
+        return _normalize(db, job)
+
+
+def _normalize(db, job) -> Dict:
+    payload = job.payload
+    source, key = payload["source"], payload["key"]
+    _, norm_fn = SOURCE_STEPS[source]
+    runs = SourceRunRepo(db)
+    fingerprints = RowFingerprintRepo(db)
+    staging = WorklistStagingRepo(db)
+
+    run = runs.start(key, payload["sha256"], payload["snapshot_path"])
+    job.run_id = run.id
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            ext = snapshots.original_extension(payload["snapshot_path"])
+            raw_path = snapshots.restore(
+                payload["snapshot_path"], os.path.join(workdir, f"raw{ext}")
+            )
+            batches = changed_batches(
+                source,
+                key,
+                raw_path,
+                fingerprints,
+                _no_stage,
+                force=payload.get("force", False),
+            )
+            changed_df, keys, hashes, raw_rows = next(batches)
+        logger.info(
+            "%s: %d of %d raw rows new or changed", key, len(changed_df), raw_rows
+        )
+        if changed_df.empty:
+            runs.finish(run, "success")
+            return {"changed": 0}
+
+        clean_df = norm_fn(changed_df)
+        done = uploaded_among(db, clean_df["CCFID"])
+        pending_df = clean_df[~clean_df["CCFID"].isin(done)]
+        records = pending_df.to_dict(orient="records")
+        flags = [is_complete(rec) for rec in records]
+        complete_df = pending_df[pd.Series(flags, index=pending_df.index, dtype=bool)]
+
+        existing = staging.ccfids()
+        staging_new = [
+            rec
+            for rec, ok in zip(records, flags)
+            if not ok and rec.get("CCFID") not in existing
+        ]
+        mapped = to_staging_rows(staging_new, datetime.datetime.utcnow())
+
+        queued = OutboxRepo(db).unsent_ccfids()
+        complete_df = complete_df[~complete_df["CCFID"].isin(queued)]
+        # Every collection site seen is synced, as process_sources does
+        site_cols = ["Collection_Site", "Collection_Site_ID"]
+        sites = {}
+        if all(col in clean_df.columns for col in site_cols):
+            sites = sync_collection_sites_to_crm(clean_df[site_cols].drop_duplicates())
+        payload_records = []
+        if not complete_df.empty:
+            payload_records = build_payload(
+                complete_df, load_lookup_maps(db, sites=sites)
+            )
+
+        # Staging rows, outbox records and the fingerprints of rows not
+        # waiting on Zoho commit together, with the run's outcome
+        seen = hashes[hashes.index.isin(keys[changed_df.index])]
+        staging.add_many(mapped, commit=False)
+        queue_records(db, key, payload_records, seen)
+        fingerprints.save(
+            key,
+            seen.drop(complete_df["CCFID"], errors="ignore").to_dict(),
+            commit=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        runs.finish(run, "failed")
+        raise
+
+    dates = pd.to_datetime(clean_df["Collection_Date"], errors="coerce")
+    if dates.notna().any():
+        advance_watermark(db, key, dates.max().date())
+    runs.finish(run, "success")
+    logger.info(
+        "%s: staged %d, queued %d for Zoho", key, len(mapped), len(payload_records)
+    )
+    return {"staged": len(mapped), "queued": len(payload_records)}
+
+
+HANDLERS = {
+    "scrape": handle_scrape,
+    "normalize": handle_normalize,
+}
+
+
+@contextmanager
+def heartbeat(job_id: int, worker: str, interval: float):
+    """Keep a claimed job's heartbeat fresh from a background thread."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            db = SessionLocal()
+            try:
+                if not JobRepo(db).heartbeat(job_id, worker):
+                    logger.warning("Job %d was reclaimed from this worker", job_id)
+                    return
+            except Exception as e:
+                logger.warning("Heartbeat for job %d failed: %s", job_id, e)
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def reclaim(db) -> None:
+    """Requeue the jobs of workers that stopped heartbeating."""
+    for job in JobRepo(db).reclaim_stale(JOB_STALE_SECONDS):
+        logger.warning(
+            "Reclaimed %s job %d from a stopped worker (%s)",
+            job.kind,
+            job.id,
+            job.status,
+        )
+
+
+def run_job(db, job, worker: str) -> None:
+    queue = JobRepo(db)
+    logger.info("Running %s job %d (attempt %d)", job.kind, job.id, job.attempts)
+    try:
+        with heartbeat(job.id, worker, JOB_HEARTBEAT_SECONDS):
+            result = HANDLERS[job.kind](db, job)
+    except SourceBusy as e:
+        db.rollback()
+        logger.info("[%s] busy; %s job %d put back", e, job.kind, job.id)
+        if not queue.defer(job, worker, JOB_POLL_SECONDS):
+            logger.warning("Job %d was reclaimed while deferred", job.id)
+        return
+    except Exception as e:
+        db.rollback()
+        logger.exception("%s job %d failed", job.kind, job.id)
+        status = queue.fail(job, worker, repr(e), JOB_RETRY_BACKOFF_SECONDS)
+        if status == "dead":
+            logger.error(
+                "%s job %d is dead after %d attempts", job.kind, job.id, job.attempts
+            )
+        return
+    if not queue.complete(job, worker, result):
+        logger.warning("Job %d finished after it was reclaimed", job.id)
+
+
+def work(kinds: List[str], poll: float, stopping: threading.Event) -> None:
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Worker %s taking %s jobs", worker, ", ".join(kinds))
+    db = SessionLocal()
+    queue = JobRepo(db)
+    job_kinds = [kind for kind in kinds if kind in JOB_KINDS]
+    pushing = "push" in kinds
+    last_reclaim = float("-inf")
+    try:
+        while not stopping.is_set():
+            now = time.monotonic()
+            if now - last_reclaim >= JOB_HEARTBEAT_SECONDS:
+                reclaim(db)
+                last_reclaim = now
+            job = queue.claim(worker, job_kinds) if job_kinds else None
+            if job is not None:
+                run_job(db, job, worker)
+            elif not (pushing and drain_batch(db).attempted):
+                stopping.wait(poll)
+            elif OUTBOX_BATCH_INTERVAL_SECONDS:
+                stopping.wait(OUTBOX_BATCH_INTERVAL_SECONDS)
+    finally:
+        db.close()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Run pipeline jobs from the work queue")
+    p.add_argument(
+        "--kinds",
+        default=",".join(KINDS),
+        help="Comma-separated job kinds to take (default: all)",
+    )
+    p.add_argument(
+        "--poll",
+        type=float,
+        default=JOB_POLL_SECONDS,
+        metavar="SECONDS",
+        help="Wait between polls of an empty queue (default: JOB_POLL_SECONDS)",
+    )
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise SystemExit(f"Unknown job kinds: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(
+        level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    logger.info("Schema at version %d", check_schema(engine))
+    if "scrape" in kinds:
+        install_browsers()
+
+    stopping = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stopping.set())
+    work(kinds, args.poll, stopping)
+
+
+if __name__ == "__main__":
+    main()
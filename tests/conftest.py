@@ -0,0 +1,11 @@
+import os
+
+# Importing config needs the database settings, not a database
+for name, value in {
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+}.items():
+    os.environ.setdefault(name, value)
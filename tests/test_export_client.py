@@ -0,0 +1,177 @@
+"""
+Direct export downloads against a local server that mimics the portals'
+export endpoints: an authenticated session gets the file streamed in
+chunks, an expired one is redirected to an HTML login page, and a report
+with no rows comes back as an empty body.
+"""
+
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+from scrapers import crl, i3
+from scrapers.export_client import ExportClient, ExportError, try_direct_export
+from services.run_report import report
+
+SESSION = {"name": "SESSION", "value": "valid", "domain": "127.0.0.1", "path": "/"}
+
+# Several times the client's chunk size, so the body arrives in pieces
+EXPORT_BODY = b"CCFID,Collection Date\n" + b"".join(
+    b"%08d,2024-05-01\n" % i for i in range(20000)
+)
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.server.requests.append((url.path, dict(parse_qsl(url.query))))
+        if url.path == "/login":
+            return self._send(b"<html><form>Sign in</form></html>", "text/html")
+        if "SESSION=valid" not in self.headers.get("Cookie", ""):
+            self.send_response(302)
+            self.send_header("Location", "/login")
+            self.end_headers()
+            return
+        if url.path == "/export":
+            return self._stream(EXPORT_BODY)
+        if url.path == "/export/empty":
+            return self._send(b"", "text/csv")
+        self.send_error(404)
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, body, chunk=8192):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(body), chunk):
+            part = body[i : i + chunk]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakePage:
+    """The two things ExportClient.from_page reads from a Playwright page."""
+
+    def __init__(self, cookies):
+        self.context = self
+        self._cookies = cookies
+
+    def cookies(self):
+        return self._cookies
+
+    def evaluate(self, script):
+        return "fixture-agent"
+
+
+@pytest.fixture
+def portal():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PortalHandler)
+    server.protocol_version = "HTTP/1.1"
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def clean_report():
+    report.clear()
+    yield
+    report.clear()
+
+
+def test_streams_export_with_portal_params(portal, tmp_path):
+    server, base = portal
+    dest = str(tmp_path / "export.csv")
+    since = date(2024, 5, 1)
+
+    with ExportClient([SESSION]) as client:
+        assert (
+            client.download(f"{base}/export", crl._export_params(since), dest) == dest
+        )
+
+    assert (tmp_path / "export.csv").read_bytes() == EXPORT_BODY
+    assert not (tmp_path / "export.csv.part").exists()
+    path, params = server.requests[-1]
+    assert path == "/export"
+    assert params["dateType"] == "EventDate"
+    assert params["startDate"] == "2024-05-01"
+    assert params["endDate"] == date.today().isoformat()
+    assert params["format"] == "csv"
+
+
+def test_i3_params_reach_the_endpoint(portal, tmp_path):
+    server, base = portal
+    since = date(2024, 5, 1)
+
+    with ExportClient([SESSION]) as client:
+        client.download(f"{base}/export", i3._export_params(since), str(tmp_path / "x"))
+
+    assert server.requests[-1][1] == {
+        "format": "csv",
+        "startDate": "05/01/2024",
+        "endDate": date.today().strftime("%m/%d/%Y"),
+    }
+
+
+def test_login_bounce_falls_back_to_click_through(portal, tmp_path):
+    server, base = portal
+    dest = tmp_path / "export.csv"
+
+    page = FakePage([dict(SESSION, value="expired")])
+    assert not try_direct_export("crl", page, f"{base}/export", {}, str(dest))
+
+    assert [path for path, _ in server.requests] == ["/export", "/login"]
+    assert not dest.exists()
+    assert report.sources["crl"]["export"] == "click-through"
+
+
+def test_empty_export_is_an_error(portal, tmp_path):
+    _, base = portal
+    dest = tmp_path / "export.csv"
+
+    with ExportClient([SESSION]) as client:
+        with pytest.raises(ExportError, match="empty"):
+            client.download(f"{base}/export/empty", {}, str(dest))
+
+    assert list(tmp_path.iterdir()) == []
+    page = FakePage([SESSION])
+    assert not try_direct_export("i3", page, f"{base}/export/empty", {}, str(dest))
+    assert report.sources["i3"]["export"] == "click-through"
+
+
+def test_direct_export_reports_success(portal, tmp_path):
+    _, base = portal
+    dest = tmp_path / "export.csv"
+
+    assert try_direct_export(
+        "crl", FakePage([SESSION]), f"{base}/export", {}, str(dest)
+    )
+    assert dest.read_bytes() == EXPORT_BODY
+    assert report.sources["crl"]["export"] == "direct"
+
+
+def test_unset_url_skips_the_request(portal, tmp_path):
+    server, _ = portal
+
+    assert not try_direct_export(
+        "i3", FakePage([SESSION]), None, {}, str(tmp_path / "x")
+    )
+
+    assert server.requests == []
+    assert "i3" not in report.sources
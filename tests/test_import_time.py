@@ -0,0 +1,73 @@
+"""
+Cold-start budget for the web app and the pipeline CLI.
+
+``import web`` is what every gunicorn worker pays at boot and
+``main.py --help`` what every CLI invocation pays before argument parsing.
+Each is run in fresh interpreters: it must not load the modules that only a
+pipeline run, an upload or a Zoho push needs, and its median time must stay
+under a budget set well above today's (about 0.6 s and 0.1 s), so a heavy
+module-level import fails the suite instead of creeping in.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+REPEAT = 5
+
+# name → (command, median budget in seconds, modules it must not load)
+CHECKS = {
+    "import web": (
+        "import web",
+        1.5,
+        ("pandas", "pyarrow", "playwright", "normalize", "requests"),
+    ),
+    "main.py --help": (
+        "import runpy, sys\n"
+        "sys.argv = ['main.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('main.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass",
+        0.5,
+        ("pandas", "playwright", "sqlalchemy", "flask"),
+    ),
+}
+
+
+def run(code: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": SRC}
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize("name", CHECKS)
+def test_heavy_modules_load_lazily(name):
+    code, _, banned = CHECKS[name]
+    probe = f"{code}\nimport sys\nprint(' '.join(sorted(sys.modules)))"
+    modules = run(probe).stdout.splitlines()[-1].split()
+    loaded = {module.split(".")[0] for module in modules}
+    assert not loaded & set(banned)
+
+
+@pytest.mark.parametrize("name", CHECKS)
+def test_cold_start_within_budget(name):
+    code, budget, _ = CHECKS[name]
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run(code)
+        timings.append(time.perf_counter() - start)
+    assert statistics.median(timings) <= budget, f"{name}: {timings}"